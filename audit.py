@@ -0,0 +1,406 @@
+# audit.py
+# The booking audit log: lookups, retention and an optional app-side writer.
+#
+# booking_audit_log is append-only. Triggers on bookings add a row for every
+# booking made, cancelled or deleted; reports.py folds new rows into its
+# summaries by log_id. On MySQL the table is range-partitioned by month of
+# change_date (migrations/009_audit_log.sql), so retention drops whole months
+# instead of deleting rows; SQLite deletes them in log_id batches. Either way
+# rows are only removed once the reports have folded them in, and their
+# counts are rolled up into booking_audit_daily first.
+#
+#   python audit.py --booking 123                        # one booking's history
+#   python audit.py --since 2026-01-01 --until 2026-02-01
+#   python audit.py --daily --since 2026-01-01
+#   python audit.py --purge --retain-days 400            # roll up and drop older history
+#   python audit.py --partitions                         # MySQL: add partitions for the coming months
+#
+# AuditWriter (AIRLINE_APP_AUDIT=1) takes over the status-change and delete
+# rows from the triggers: services report them after commit, and they are
+# written with one multi-row INSERT per flush instead of one trigger INSERT per
+# booking row. Events still in the buffer when the process dies are lost, and
+# change_date is the flush time (at most FLUSH_INTERVAL late), which is why it
+# is off by default. Booking inserts are always logged by their trigger.
+import argparse
+import atexit
+import logging
+import threading
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from db_utils import add_connect_hook, get_backend, get_connection
+from instrumentation import timed
+from services import ServiceError, set_audit_sink
+
+RETAIN_DAYS = 400         # audit history kept row by row; older rows survive as daily rollups
+PURGE_BATCH = 5000        # rows rolled up and deleted per transaction
+PARTITIONS_AHEAD = 3      # months of empty partitions kept ahead of today
+QUERY_LIMIT = 1000        # rows per between() page
+FLUSH_ROWS = 500          # AuditWriter: events per INSERT, and buffer size that triggers a flush
+FLUSH_INTERVAL = 1.0      # AuditWriter: seconds between background flushes
+
+DEFERRING_TRIGGERS = ("audit_booking_changes", "audit_booking_deletes")
+
+AuditEvent = namedtuple("AuditEvent", "log_id booking_id flight_id old_status new_status change_date action")
+AuditDay = namedtuple("AuditDay", "day events booked cancelled")
+PurgeResult = namedtuple("PurgeResult", "rows partitions")
+
+log = logging.getLogger(__name__)
+
+_EVENT_COLS = "log_id, booking_id, flight_id, old_status, new_status, change_date, action_performed"
+
+# counts per (day, flight) of a set of audit rows, in booking_audit_daily's column order
+_ROLLUP_SQL = """
+    SELECT DATE(a.change_date), COALESCE(a.flight_id, 0), COUNT(*),
+           SUM(CASE WHEN a.new_status = 'Confirmed' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN a.old_status = 'Confirmed' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN a.action_performed = 'Booked'
+                     AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+                     AND NOT EXISTS (SELECT 1 FROM bookings_archive r WHERE r.booking_id = a.booking_id)
+                    THEN 1 ELSE 0 END)
+    FROM booking_audit_log a {source} WHERE {where}
+    GROUP BY DATE(a.change_date), COALESCE(a.flight_id, 0)
+"""
+
+
+def _marks(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _stamp(value):
+    # DATETIME parameter that compares the same way on both engines
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return datetime.combine(value if isinstance(value, date) else date.fromisoformat(str(value)[:10]),
+                            time.min).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _add_rollup(cur, rows):
+    # rows: (day, flight_id, events, booked, cancelled, booked_gone); update-else-insert like reports._add_counts
+    for day, fid, *counts in rows:
+        cur.execute("UPDATE booking_audit_daily SET events = events + %s, booked = booked + %s, "
+                    "cancelled = cancelled + %s, booked_gone = booked_gone + %s WHERE day=%s AND flight_id=%s",
+                    (*counts, day, fid))
+        if cur.rowcount == 0:
+            cur.execute("INSERT INTO booking_audit_daily (day, flight_id, events, booked, cancelled, booked_gone) "
+                        "VALUES (%s, %s, %s, %s, %s, %s)", (day, fid, *counts))
+
+
+def _month_after(d):
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+class AuditLog:
+    def __init__(self, connection=get_connection):
+        self.connection = connection
+
+    # --- queries ---
+    @timed("audit.history")
+    def history(self, booking_id):
+        """Every audit row of one booking, oldest first (idx_audit_booking)."""
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {_EVENT_COLS} FROM booking_audit_log WHERE booking_id=%s ORDER BY log_id",
+                        (booking_id,))
+            return [AuditEvent(*r) for r in cur.fetchall()]
+
+    @timed("audit.between")
+    def between(self, since, until, after=None, limit=QUERY_LIMIT):
+        """Audit rows with since <= change_date < until, in time order, ``limit`` at a time.
+
+        Pass the last AuditEvent of a page as ``after`` to get the next one
+        (keyset paging on idx_audit_date).
+        """
+        params = [_stamp(since), _stamp(until)]
+        cond = ""
+        if after is not None:
+            cond = " AND (change_date > %s OR (change_date = %s AND log_id > %s))"
+            params += [_stamp(after.change_date) if isinstance(after.change_date, datetime)
+                       else str(after.change_date)] * 2 + [after.log_id]
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {_EVENT_COLS} FROM booking_audit_log "
+                        f"WHERE change_date >= %s AND change_date < %s{cond} "
+                        f"ORDER BY change_date, log_id LIMIT %s", tuple(params) + (limit,))
+            return [AuditEvent(*r) for r in cur.fetchall()]
+
+    @timed("audit.daily")
+    def daily(self, since, until):
+        """Events per day, purged history included: AuditDay rows in day order."""
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("""
+                SELECT day, SUM(events), SUM(booked), SUM(cancelled) FROM (
+                    SELECT DATE(change_date) AS day, COUNT(*) AS events,
+                           SUM(CASE WHEN new_status = 'Confirmed' THEN 1 ELSE 0 END) AS booked,
+                           SUM(CASE WHEN old_status = 'Confirmed' THEN 1 ELSE 0 END) AS cancelled
+                    FROM booking_audit_log WHERE change_date >= %s AND change_date < %s
+                    GROUP BY DATE(change_date)
+                    UNION ALL
+                    SELECT day, SUM(events), SUM(booked), SUM(cancelled) FROM booking_audit_daily
+                    WHERE day >= %s AND day < %s GROUP BY day
+                ) x GROUP BY day ORDER BY day
+            """, (_stamp(since), _stamp(until), str(since)[:10], str(until)[:10]))
+            return [AuditDay(str(d)[:10], int(e), int(b), int(c)) for d, e, b, c in cur.fetchall()]
+
+    # --- partitions (MySQL) ---
+    @staticmethod
+    def _partitions(cur):
+        # [(name, upper bound as a datetime, or None for MAXVALUE)] in range order
+        cur.execute("SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'booking_audit_log' "
+                    "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION")
+        return [(name, None if desc == "MAXVALUE" else datetime.fromisoformat(desc.strip("'")))
+                for name, desc in cur.fetchall()]
+
+    @timed("audit.partitions")
+    def ensure_partitions(self, months_ahead=PARTITIONS_AHEAD, today=None):
+        """Split the MAXVALUE partition so whole months up to ``months_ahead`` have their own; returns the new names."""
+        if get_backend().name != "mysql":
+            return []
+        with self.connection() as con:
+            cur = con.cursor()
+            parts = self._partitions(cur)
+            if not parts or parts[-1][1] is not None:
+                raise ServiceError("booking_audit_log is not partitioned; run migrations/009_audit_log.sql.",
+                                   title="Audit Log")
+            upper = max((b.date() for _, b in parts if b is not None), default=None)
+            end = (today or date.today()).replace(day=1)
+            for _ in range(months_ahead + 1):
+                end = _month_after(end)
+            upper = upper or end
+            new = []
+            while upper < end:
+                new.append((f"p{upper:%Y%m}", _month_after(upper)))
+                upper = _month_after(upper)
+            if new:
+                spec = ", ".join(f"PARTITION {name} VALUES LESS THAN ('{bound}')" for name, bound in new)
+                cur.execute(f"ALTER TABLE booking_audit_log REORGANIZE PARTITION {parts[-1][0]} INTO "
+                            f"({spec}, PARTITION {parts[-1][0]} VALUES LESS THAN (MAXVALUE))")
+        return [name for name, _ in new]
+
+    # --- retention ---
+    @staticmethod
+    def _report_watermark(cur):
+        # rows above it are not in the report summaries yet and must stay; also serialises purges
+        cur.execute("SELECT last_log_id FROM report_state WHERE name='audit' FOR UPDATE")
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+    def _drop_partitions(self, cutoff):
+        # whole months before the cutoff: roll up in one transaction, then drop (DDL commits by itself)
+        dropped, rows = [], 0
+        with self.connection() as con:
+            parts = self._partitions(con.cursor())
+        for i, (name, bound) in enumerate(parts):
+            if bound is None or bound > cutoff:
+                break
+            with self.connection() as con:
+                cur = con.cursor()
+                watermark = self._report_watermark(cur)
+                cur.execute(f"SELECT COUNT(*), COALESCE(MAX(log_id), 0) FROM booking_audit_log PARTITION ({name})")
+                count, top = cur.fetchone()
+                if top > watermark:
+                    break
+                cur.execute("SELECT 1 FROM audit_retention WHERE partition_name=%s", (name,))
+                if cur.fetchone() is None:
+                    cur.execute(_ROLLUP_SQL.format(source=f"PARTITION ({name})", where="1=1"))
+                    _add_rollup(cur, cur.fetchall())
+                    # a crash before the drop below must not roll this partition up twice
+                    cur.execute("INSERT INTO audit_retention (partition_name) VALUES (%s)", (name,))
+                con.commit()
+                # the lowest partition stays (emptied) so rows dated before every bound still have a home
+                cur.execute(f"ALTER TABLE booking_audit_log {'TRUNCATE' if i == 0 else 'DROP'} PARTITION {name}")
+                cur.execute("DELETE FROM audit_retention WHERE partition_name=%s", (name,))
+                con.commit()
+            dropped.append(name)
+            rows += count
+        return dropped, rows
+
+    @timed("audit.purge")
+    def purge(self, retain_days=RETAIN_DAYS, today=None):
+        """Roll up and remove audit rows older than ``retain_days``; returns a PurgeResult."""
+        from reports import ReportService     # numpy only for the retention job
+        ReportService(self.connection).refresh_summaries()
+        cutoff = datetime.combine((today or date.today()) - timedelta(days=retain_days), time.min)
+        dropped, total = [], 0
+        if get_backend().name == "mysql":
+            dropped, total = self._drop_partitions(cutoff)
+        while True:
+            with self.connection() as con:
+                cur = con.cursor()
+                watermark = self._report_watermark(cur)
+                # idx_audit_date; rows a report has not folded in yet are left for next time
+                cur.execute("SELECT log_id FROM booking_audit_log WHERE change_date < %s AND log_id <= %s "
+                            "ORDER BY change_date, log_id LIMIT %s FOR UPDATE",
+                            (_stamp(cutoff), watermark, PURGE_BATCH))
+                ids = [r[0] for r in cur.fetchall()]
+                if not ids:
+                    con.rollback()
+                    break
+                cur.execute(_ROLLUP_SQL.format(source="", where=f"a.log_id IN ({_marks(ids)})"), tuple(ids))
+                _add_rollup(cur, cur.fetchall())
+                cur.execute(f"DELETE FROM booking_audit_log WHERE log_id IN ({_marks(ids)})", tuple(ids))
+                con.commit()
+            total += len(ids)
+            if len(ids) < PURGE_BATCH:
+                break
+        return PurgeResult(total, dropped)
+
+
+class AuditWriter:
+    """Writes booking status-change and delete rows in batches instead of per-row triggers.
+
+    services report committed changes through set_audit_sink(); they are
+    buffered and written by a background thread every ``flush_interval``
+    seconds, or as soon as ``flush_rows`` are waiting. Every connection
+    opened after install() tells the deferring triggers to stand down.
+    """
+
+    def __init__(self, connection=get_connection, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.connection = connection
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()     # one flush at a time keeps log_ids in event order
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _mark_session(con):
+        cur = con.cursor()
+        if get_backend().name == "sqlite":
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS app_audit (x INT)")
+        else:
+            cur.execute("SET @airline_app_audit = 1")
+        cur.close()
+
+    def _triggers_defer(self):
+        with self.connection() as con:
+            cur = con.cursor()
+            if get_backend().name == "sqlite":
+                cur.execute(f"SELECT sql FROM sqlite_master WHERE type='trigger' "
+                            f"AND name IN ({_marks(DEFERRING_TRIGGERS)})", DEFERRING_TRIGGERS)
+            else:
+                cur.execute(f"SELECT ACTION_STATEMENT FROM information_schema.TRIGGERS "
+                            f"WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN ({_marks(DEFERRING_TRIGGERS)})",
+                            DEFERRING_TRIGGERS)
+            bodies = [r[0] for r in cur.fetchall()]
+        return len(bodies) == len(DEFERRING_TRIGGERS) and all("app_audit" in b for b in bodies)
+
+    def install(self):
+        """Take over the status-change and delete rows from the triggers; returns self."""
+        if not self._triggers_defer():
+            # both would log: the triggers don't know about the writer yet
+            raise ServiceError("The audit triggers predate the app-side writer; "
+                               "run migrations/009_audit_log.sql first.", title="Audit Log")
+        add_connect_hook(self._mark_session)
+        set_audit_sink(self.record)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def record(self, events):
+        """Queue (booking_id, flight_id, old_status, new_status, action) events."""
+        with self._lock:
+            self._buffer.extend(events)
+            full = len(self._buffer) >= self.flush_rows
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("audit flush failed; will retry")
+
+    @timed("audit.flush")
+    def flush(self):
+        """Write everything buffered so far; returns how many rows."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return 0
+            try:
+                with self.connection() as con:
+                    cur = con.cursor()
+                    for i in range(0, len(events), self.flush_rows):
+                        chunk = events[i:i + self.flush_rows]
+                        cur.execute("INSERT INTO booking_audit_log "
+                                    "(booking_id, flight_id, old_status, new_status, action_performed) VALUES "
+                                    + ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk)),
+                                    tuple(v for e in chunk for v in e))
+                    con.commit()
+            except BaseException:
+                with self._lock:
+                    self._buffer[:0] = events     # keep them, in order, for the next attempt
+                raise
+        return len(events)
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.flush()
+
+
+_writer = None
+
+
+def get_writer():
+    """The installed AuditWriter (installed on first call)."""
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter().install()
+    return _writer
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query and maintain the booking audit log.")
+    ap.add_argument("--booking", type=int, help="print one booking's history")
+    ap.add_argument("--since", help="YYYY-MM-DD (default: 7 days ago)")
+    ap.add_argument("--until", help="YYYY-MM-DD, exclusive (default: tomorrow)")
+    ap.add_argument("--daily", action="store_true", help="events per day instead of rows")
+    ap.add_argument("--purge", action="store_true", help="roll up and remove rows older than --retain-days")
+    ap.add_argument("--retain-days", type=int, default=RETAIN_DAYS)
+    ap.add_argument("--partitions", action="store_true", help="MySQL: add monthly partitions ahead of today")
+    ap.add_argument("--months-ahead", type=int, default=PARTITIONS_AHEAD)
+    args = ap.parse_args(argv)
+
+    audit = AuditLog()
+    if args.partitions:
+        print("added partitions:", ", ".join(audit.ensure_partitions(args.months_ahead)) or "none")
+    if args.purge:
+        r = audit.purge(args.retain_days)
+        print(f"purged {r.rows} rows" + (f" ({', '.join(r.partitions)} dropped)" if r.partitions else ""))
+    if args.booking is not None:
+        for e in audit.history(args.booking):
+            print(f"{e.change_date}  #{e.log_id}  {e.action:<14} {e.old_status or '-'} -> {e.new_status or '-'}")
+    elif not (args.partitions or args.purge):
+        since = args.since or (date.today() - timedelta(days=7)).isoformat()
+        until = args.until or (date.today() + timedelta(days=1)).isoformat()
+        if args.daily:
+            for d in audit.daily(since, until):
+                print(f"{d.day}  {d.events:>7} events  {d.booked:>6} booked  {d.cancelled:>6} cancelled")
+            return
+        after = None
+        while True:
+            page = audit.between(since, until, after)
+            for e in page:
+                print(f"{e.change_date}  #{e.log_id}  booking {e.booking_id}  flight {e.flight_id}  "
+                      f"{e.action:<14} {e.old_status or '-'} -> {e.new_status or '-'}")
+            if len(page) < QUERY_LIMIT:
+                break
+            after = page[-1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# benchmarks/bench_booking.py
+# Booking throughput/latency and table-load latency at several data sizes.
+#
+#   python benchmarks/bench_booking.py --backend sqlite --rows 1000,100000 --workers 1,4,8 --out bench.json
+#   python benchmarks/bench_booking.py --backend mysql --reset ...   # wipes the configured MySQL database!
+#
+# Every size starts from an empty database filled by datagen.generate(). The
+# JSON report carries the git commit so runs can be compared across commits.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import datagen  # noqa: E402
+from db_utils import get_connection, get_pool, set_backend  # noqa: E402
+from services import BookingService, BookingRequest, ServiceError  # noqa: E402
+
+MANAGERS = {
+    "flights": ("flight_manager", "FlightManager"),
+    # a second flights window in a new process: maps the snapshot the first one saved
+    "flights_mapped": ("flight_manager", "FlightManager"),
+    "passengers": ("passenger_manager", "PassengerManager"),
+    "bookings": ("booking_manager", "BookingManager"),
+}
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KiB on Linux
+
+
+def use_backend(backend, path):
+    if backend == "sqlite":
+        set_backend("sqlite", path=path)
+    else:
+        set_backend(backend)
+
+
+def _new_passengers(n):
+    rows = [(f"Bench {i}", "X", 30, f"BN{time.time_ns() % 10 ** 9:09d}{i:07d}") for i in range(n)]
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT COALESCE(MAX(passenger_id), 0) FROM passengers")
+        p0 = cur.fetchone()[0]
+        cur.executemany("INSERT INTO passengers (name, gender, age, passport_no) VALUES (%s, %s, %s, %s)", rows)
+        con.commit()
+        cur.execute("SELECT passenger_id FROM passengers WHERE passenger_id > %s ORDER BY passenger_id", (p0,))
+        return [r[0] for r in cur.fetchall()]
+
+
+# --- booking throughput ---
+def bench_bookings(workers, attempts, flight_ids, seed=1):
+    """``attempts`` single bookings spread over ``workers`` threads."""
+    get_pool().size = max(get_pool().size, workers)
+    pids = _new_passengers(attempts)
+    rng = random.Random(seed)
+    jobs = [(pid, rng.randint(*flight_ids)) for pid in pids]
+    service = BookingService()
+    latencies, errors = [], []
+    lock = threading.Lock()
+    gate = threading.Barrier(workers)
+
+    def worker(my_jobs):
+        mine, bad = [], 0
+        gate.wait()
+        for pid, fid in my_jobs:
+            t = time.perf_counter()
+            try:
+                service.book(pid, fid)
+            except ServiceError:          # full flight / duplicate: counted, not fatal
+                bad += 1
+            mine.append(time.perf_counter() - t)
+        with lock:
+            latencies.extend(mine)
+            errors.append(bad)
+
+    threads = [threading.Thread(target=worker, args=(jobs[i::workers],)) for i in range(workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return {
+        "workers": workers,
+        "attempts": attempts,
+        "failed": sum(errors),
+        "bookings_per_s": round(attempts / elapsed, 1),
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+    }
+
+
+def bench_book_many(batch, batches, flight_ids, seed=2):
+    pids = _new_passengers(batch * batches)
+    rng = random.Random(seed)
+    service = BookingService()
+    latencies, ok = [], 0
+    t0 = time.perf_counter()
+    for b in range(batches):
+        reqs = [BookingRequest(pid, rng.randint(*flight_ids)) for pid in pids[b * batch:(b + 1) * batch]]
+        t = time.perf_counter()
+        ok += sum(r.ok for r in service.book_many(reqs))
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - t0
+    return {
+        "batch": batch,
+        "batches": batches,
+        "booked": ok,
+        "bookings_per_s": round(batch * batches / elapsed, 1),
+        "batch_p50_ms": _ms(percentile(latencies, 0.50)),
+        "batch_p99_ms": _ms(percentile(latencies, 0.99)),
+    }
+
+
+# --- table load (one child process per manager, so peak RSS is its own) ---
+def _table_load_child(kind, backend, path, queue):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import QEventLoop, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    use_backend(backend, path)
+    app = QApplication.instance() or QApplication([])
+    rss_before = _peak_rss_kb()
+    module, cls = MANAGERS[kind]
+    t0 = time.perf_counter()
+    Manager = getattr(__import__(module), cls)
+    loop = QEventLoop()
+    first = {}
+
+    def on_first():
+        first["t"] = time.perf_counter() - t0
+        loop.quit()
+
+    win = Manager()
+    constructed = time.perf_counter() - t0
+    win.model.first_page_loaded.connect(on_first)
+    if win.model.rowCount() and "t" not in first:
+        first["t"] = constructed      # synchronous model: already loaded
+    else:
+        QTimer.singleShot(60000, loop.quit)
+        loop.exec_()
+    win.show()
+    app.processEvents()
+    # scroll through 20 pages, the way a user paging down would
+    t1 = time.perf_counter()
+    for _ in range(20):
+        if not win.model.canFetchMore():
+            break
+        pending = QEventLoop()
+        win.model.rowsInserted.connect(pending.quit)
+        win.model.fetchMore()
+        if win.model.executor is not None:
+            QTimer.singleShot(60000, pending.quit)
+            pending.exec_()
+        win.model.rowsInserted.disconnect(pending.quit)
+    scroll = time.perf_counter() - t1
+    queue.put({
+        "table": kind,
+        "construct_ms": _ms(constructed),
+        "time_to_first_row_ms": _ms(first.get("t")),
+        "rows_after_20_pages": win.model.rowCount(),
+        "20_pages_ms": _ms(scroll),
+        "peak_rss_mb": round(_peak_rss_kb() / 1024, 1),
+        "rss_growth_mb": round((_peak_rss_kb() - rss_before) / 1024, 1),
+    })
+    app.processEvents()
+
+
+def bench_table_load(kind, backend, path):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_table_load_child, args=(kind, backend, path, queue))
+    proc.start()
+    try:
+        return queue.get(timeout=300)
+    finally:
+        proc.join(10)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "sizes": [],
+    }
+    for rows in args.rows:
+        path = None
+        if args.backend == "sqlite":
+            path = os.path.join(args.workdir, f"bench_{rows}.db")
+            for suffix in ("", "-wal", "-shm", ".snap"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        use_backend(args.backend, path)
+        if args.backend != "sqlite":
+            datagen.reset()
+
+        print(f"[{rows}] generating data", file=sys.stderr)
+        t = time.perf_counter()
+        info = datagen.generate(rows)
+        size = {"rows": rows, "generate_s": round(time.perf_counter() - t, 2),
+                "flights": info["flights"], "passengers": info["passengers"]}
+
+        size["booking"] = []
+        for w in args.workers:
+            print(f"[{rows}] booking with {w} worker(s)", file=sys.stderr)
+            size["booking"].append(bench_bookings(w, args.attempts, info["flight_ids"]))
+        print(f"[{rows}] book_many", file=sys.stderr)
+        size["book_many"] = bench_book_many(args.batch, max(args.attempts // args.batch, 1), info["flight_ids"])
+
+        size["table_load"] = []
+        if not args.no_gui:
+            get_pool().close()
+            for kind in MANAGERS:
+                print(f"[{rows}] loading {kind} table", file=sys.stderr)
+                size["table_load"].append(bench_table_load(kind, args.backend, path))
+        report["sizes"].append(size)
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark booking throughput and table load latency.")
+    ap.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    ap.add_argument("--rows", default="1000,10000,100000",
+                    help="comma-separated booking counts to generate (10^3..10^7)")
+    ap.add_argument("--workers", default="1,2,4,8", help="comma-separated concurrent booker counts")
+    ap.add_argument("--attempts", type=int, default=500, help="bookings per worker-count run")
+    ap.add_argument("--batch", type=int, default=100, help="book_many batch size")
+    ap.add_argument("--workdir", default=os.environ.get("TMPDIR", "/tmp"), help="where SQLite files go")
+    ap.add_argument("--no-gui", action="store_true", help="skip the Qt table-load measurements")
+    ap.add_argument("--reset", action="store_true", help="required for mysql: allows wiping its tables")
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args(argv)
+    args.rows = [int(x) for x in args.rows.split(",")]
+    args.workers = [int(x) for x in args.workers.split(",")]
+    if args.backend != "sqlite" and not args.reset:
+        ap.error("--reset is required for non-SQLite backends: the benchmark deletes every row")
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
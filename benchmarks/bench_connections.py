@@ -0,0 +1,99 @@
+# benchmarks/bench_connections.py
+# Connection search on a synthetic schedule (no database needed).
+#
+#   python benchmarks/bench_connections.py --flights 100000 --airports 300 --queries 2000
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connections import ConnectionFinder  # noqa: E402
+
+
+def synthetic_schedule(n_flights, n_airports, days, seed=1):
+    rng = random.Random(seed)
+    airports = [f"AP{i:03d}" for i in range(n_airports)]
+    # a few hubs carry most of the traffic, like a real network
+    weights = [1.0 / (i + 1) ** 0.8 for i in range(n_airports)]
+    base = datetime(2030, 1, 1).timestamp()
+    rows = []
+    for fid in range(1, n_flights + 1):
+        src, dest = rng.choices(airports, weights, k=2)
+        while dest == src:
+            dest = rng.choices(airports, weights)[0]
+        dep = base + rng.randrange(days * 86400 // 300) * 300
+        arr = dep + rng.randrange(45, 600) * 60
+        rows.append((fid, f"SX{fid}", src, dest, dep, arr))
+    return airports, rows, base
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(n_flights, n_airports, days, n_queries, seed=1):
+    airports, rows, base = synthetic_schedule(n_flights, n_airports, days, seed)
+    finder = ConnectionFinder(min_connection=timedelta(minutes=45))
+
+    t0 = time.perf_counter()
+    finder.load(rows)
+    build = time.perf_counter() - t0
+
+    rng = random.Random(seed + 1)
+    latencies, found, stops = [], 0, [0, 0, 0]
+    for _ in range(n_queries):
+        a, b = rng.sample(airports, 2)
+        when = base + rng.randrange((days - 1) * 86400)
+        t = time.perf_counter()
+        its = finder.itineraries(a, b, when, max_stops=2)
+        latencies.append(time.perf_counter() - t)
+        if its:
+            found += 1
+            stops[its[-1].stops] += 1
+
+    # incremental maintenance
+    t0 = time.perf_counter()
+    extra = [(n_flights + i + 1, "NEW", rng.choice(airports), rng.choice(airports),
+              base + rng.randrange(days * 86400), base + days * 86400) for i in range(1000)]
+    for row in extra:
+        finder.add_flight(*row)
+    add_us = (time.perf_counter() - t0) / len(extra) * 1e6
+    t0 = time.perf_counter()
+    for row in extra:
+        finder.remove_flight(row[0])
+    remove_us = (time.perf_counter() - t0) / len(extra) * 1e6
+
+    return {
+        "flights": n_flights,
+        "airports": n_airports,
+        "days": days,
+        "build_s": round(build, 4),
+        "queries": n_queries,
+        "found": found,
+        "best_by_stops": stops,
+        "query_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "query_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "add_flight_us": round(add_us, 2),
+        "remove_flight_us": round(remove_us, 2),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the in-memory connection finder.")
+    ap.add_argument("--flights", type=int, default=100000)
+    ap.add_argument("--airports", type=int, default=300)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    print(json.dumps(run(args.flights, args.airports, args.days, args.queries, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_startup.py
+# Cold-start time of the main window, measured in fresh processes.
+#
+#   python benchmarks/bench_startup.py --runs 10 --out startup.json
+#
+# Each run starts `main.py --measure-startup` offscreen; the app prints the
+# time from its first line to the first event-loop turn after the main window
+# is shown, and the wall time around the whole process (interpreter start and
+# teardown included) is recorded next to it.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def run_once(env):
+    t = time.perf_counter()
+    out = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--measure-startup"], cwd=ROOT,
+                         env=env, capture_output=True, text=True, timeout=120)
+    wall = (time.perf_counter() - t) * 1000
+    for line in out.stdout.splitlines():
+        if line.startswith("startup_ms="):
+            return float(line.split("=", 1)[1]), wall
+    raise RuntimeError(f"main.py did not report its startup time:\n{out.stderr}")
+
+
+def _stats(values):
+    return {"median_ms": round(statistics.median(values), 1), "min_ms": round(min(values), 1),
+            "max_ms": round(max(values), 1)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Measure main window startup time.")
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    run_once(env)   # warm the OS file cache; the first run is not representative
+    app, wall = [], []
+    for i in range(args.runs):
+        a, w = run_once(env)
+        app.append(a)
+        wall.append(w)
+        print(f"run {i + 1}: {a:.1f} ms in-app, {w:.1f} ms wall", file=sys.stderr)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "startup": _stats(app),
+        "process_wall": _stats(wall),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/datagen.py
+# Synthetic flights/passengers/bookings shaped like dataset.sql, written in
+# chunked executemany batches so 10^7 rows never sit in memory at once.
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import get_connection  # noqa: E402
+
+CHUNK = 5000
+AIRPORTS = ["Kathmandu", "Delhi", "Mumbai", "Dubai", "Doha", "Bangkok", "Singapore", "Kuala Lumpur",
+            "Dhaka", "Colombo", "Pokhara", "Bhadrapur", "Biratnagar", "Lhasa", "Chengdu", "Hong Kong"]
+
+
+def _chunks(it, size=CHUNK):
+    buf = []
+    for item in it:
+        buf.append(item)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def reset(tables=("report_state", "report_gaps", "report_daily_bookings", "report_route_bookings",
+                  "booking_audit_daily", "booking_audit_log", "bookings_archive", "waitlist", "bookings",
+                  "passengers", "flights")):
+    with get_connection() as con:
+        cur = con.cursor()
+        for t in tables:
+            cur.execute(f"DELETE FROM {t}")
+        con.commit()
+
+
+def generate(bookings, seed=1, passengers=None, flights=None, progress=None):
+    """Insert ``bookings`` confirmed bookings plus the flights/passengers they need.
+
+    Defaults: one passenger per booking and ~150 bookings per flight, with
+    capacity to spare so the benchmarks can keep booking afterwards.
+    """
+    rng = random.Random(seed)
+    passengers = passengers or max(bookings, 1)
+    flights = flights or max(bookings // 150, 1)
+    base = datetime(2030, 1, 1)
+
+    def flight_rows():
+        for i in range(flights):
+            src, dest = rng.sample(AIRPORTS, 2)
+            dep = base + timedelta(minutes=5 * rng.randrange(365 * 24 * 12))
+            arr = dep + timedelta(minutes=rng.randrange(45, 600))
+            yield (f"BX{i % 100000:05d}", src, dest, dep.strftime("%Y-%m-%d %H:%M:%S"),
+                   arr.strftime("%Y-%m-%d %H:%M:%S"), 400)
+
+    def passenger_rows():
+        for i in range(passengers):
+            yield (f"Passenger {i}", rng.choice(("M", "F")), rng.randrange(1, 90), f"PX{i:09d}")
+
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT COALESCE(MAX(flight_id), 0) FROM flights")
+        f0 = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(MAX(passenger_id), 0) FROM passengers")
+        p0 = cur.fetchone()[0]
+        for chunk in _chunks(flight_rows()):
+            cur.executemany("INSERT INTO flights (flight_number, source, destination, departure_time, "
+                            "arrival_time, seats) VALUES (%s, %s, %s, %s, %s, %s)", chunk)
+            con.commit()
+        for chunk in _chunks(passenger_rows()):
+            cur.executemany("INSERT INTO passengers (name, gender, age, passport_no) VALUES (%s, %s, %s, %s)",
+                            chunk)
+            con.commit()
+        cur.execute("SELECT MIN(flight_id), MAX(flight_id) FROM flights WHERE flight_id > %s", (f0,))
+        fmin, fmax = cur.fetchone()
+        cur.execute("SELECT MIN(passenger_id) FROM passengers WHERE passenger_id > %s", (p0,))
+        pmin = cur.fetchone()[0]
+
+        # passenger k books flight k mod F in seat k // F + 1: unique pairs and seats,
+        # at most ceil(B/F) per flight
+        span = fmax - fmin + 1
+        done = 0
+        rows = ((pmin + k % passengers, fmin + k % span, k // span + 1) for k in range(bookings))
+        for chunk in _chunks(rows):
+            cur.executemany("INSERT INTO bookings (passenger_id, flight_id, seat_no) VALUES (%s, %s, %s)", chunk)
+            con.commit()
+            done += len(chunk)
+            if progress:
+                progress(done)
+        # seats 1..n are taken on a flight holding n bookings
+        maps = []
+        for i in range(span):
+            n = bookings // span + (1 if i < bookings % span else 0)
+            maps.append((((1 << n) - 1).to_bytes((n + 7) // 8, "little"), fmin + i))
+        for chunk in _chunks(maps):
+            cur.executemany("UPDATE flights SET seat_map = %s WHERE flight_id = %s", chunk)
+            con.commit()
+    return {"flights": flights, "passengers": passengers, "bookings": bookings,
+            "flight_ids": (fmin, fmax), "first_passenger": pmin}
@@ -0,0 +1,114 @@
+# benchmarks/stress_booking.py
+# N parallel bookers race for the seats of one flight. Exits non-zero if the
+# flight is oversold, two bookings share a seat, or seats_booked / the seat map
+# disagree with the confirmed bookings.
+#
+#   python benchmarks/stress_booking.py --workers 16 --seats 50 --attempts 200
+#   python benchmarks/stress_booking.py --backend sqlite --sqlite-path /tmp/stress.db
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import get_connection, get_pool, set_backend  # noqa: E402
+from seat_map import SeatMap  # noqa: E402
+from services import BookingService, ServiceError  # noqa: E402
+
+
+def setup(seats, passengers):
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute("""
+            INSERT INTO flights (flight_number, source, destination, departure_time, arrival_time, seats)
+            VALUES ('STRESS', 'Stress', 'Test', '2030-01-01 10:00:00', '2030-01-01 12:00:00', %s)
+        """, (seats,))
+        flight_id = cur.lastrowid
+        pids = []
+        for i in range(passengers):
+            cur.execute("INSERT INTO passengers (name, gender, age, passport_no) VALUES (%s, 'X', 30, %s)",
+                        (f"Stress {i}", f"ST{flight_id:06d}{i:06d}"))
+            pids.append(cur.lastrowid)
+        con.commit()
+    return flight_id, pids
+
+
+def run(workers, seats, attempts):
+    get_pool().size = max(get_pool().size, workers)
+    flight_id, pids = setup(seats, attempts)
+    service = BookingService()
+    outcomes = {"ok": 0, "rejected": 0, "error": 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(workers)
+
+    def worker(my_pids):
+        start_gate.wait()
+        for pid in my_pids:
+            try:
+                service.book(pid, flight_id)
+                kind = "ok"
+            except ServiceError:
+                kind = "rejected"
+            except Exception:
+                # trigger-raised "fully booked" and lock timeouts land here
+                kind = "error"
+            with lock:
+                outcomes[kind] += 1
+
+    threads = [threading.Thread(target=worker, args=(pids[i::workers],)) for i in range(workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT seats, seats_booked, seat_map FROM flights WHERE flight_id=%s", (flight_id,))
+        capacity, booked, seat_bits = cur.fetchone()
+        cur.execute("SELECT seat_no FROM bookings WHERE flight_id=%s AND status='Confirmed'", (flight_id,))
+        seat_nos = [r[0] for r in cur.fetchall()]
+        confirmed = len(seat_nos)
+    mapped = SeatMap(capacity, seat_bits)
+
+    print(f"flight {flight_id}: capacity={capacity} seats_booked={booked} confirmed={confirmed} "
+          f"outcomes={outcomes} in {elapsed:.2f}s")
+    failures = []
+    if confirmed > capacity:
+        failures.append(f"oversold: {confirmed} confirmed bookings for {capacity} seats")
+    if booked != confirmed:
+        failures.append(f"seats_booked={booked} but {confirmed} confirmed bookings")
+    if len(set(seat_nos)) != confirmed or None in seat_nos:
+        failures.append(f"{confirmed} confirmed bookings hold only {len(set(seat_nos) - {None})} distinct seats")
+    if sorted(n for n in range(1, capacity + 1) if mapped.is_taken(n)) != sorted(n for n in seat_nos if n):
+        failures.append("seat_map does not match the seats held by confirmed bookings")
+    if outcomes["ok"] != confirmed:
+        failures.append(f"{outcomes['ok']} successful calls but {confirmed} rows")
+    if attempts >= capacity and confirmed != capacity:
+        failures.append(f"undersold: {confirmed} of {capacity} seats taken")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Race N bookers for the seats of one flight.")
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--seats", type=int, default=50)
+    ap.add_argument("--attempts", type=int, default=200)
+    ap.add_argument("--backend", choices=["mysql", "sqlite"])
+    ap.add_argument("--sqlite-path")
+    args = ap.parse_args(argv)
+    if args.backend == "sqlite":
+        set_backend("sqlite", path=args.sqlite_path)
+    elif args.backend:
+        set_backend(args.backend)
+    failures = run(args.workers, args.seats, args.attempts)
+    for f in failures:
+        print("FAIL:", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# booking_client.py
+# BookingService look-alike that talks to booking_server.py over HTTP, so the
+# booking window can run as a thin client of a shared server:
+#
+#   AIRLINE_SERVER_URL=http://10.0.0.5:8080 python main.py
+#
+# Errors come back as the same ServiceError subclasses the local service
+# raises, and successful writes are announced through notify_change so the
+# shared table models update exactly as they do for local writes.
+import json
+import os
+import threading
+import uuid
+from http.client import HTTPConnection, HTTPException
+from urllib.parse import urlsplit
+
+import services
+from seat_map import SeatMap
+from services import CancelResult, ServiceError, WaitlistEntry, notify_change
+
+SERVER_URL = os.environ.get("AIRLINE_SERVER_URL", "")
+TIMEOUT = 30
+
+
+class BookingClient:
+    def __init__(self, url=None, timeout=TIMEOUT):
+        parts = urlsplit(url or SERVER_URL)
+        self.host, self.port = parts.hostname or "127.0.0.1", parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()     # one keep-alive connection per worker thread
+
+    def _connection(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return con
+
+    def _call(self, method, path, body=None, retry=None):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        for attempt in (1, 2):
+            con = self._connection()
+            try:
+                con.request(method, path, body=data, headers=headers)
+                resp = con.getresponse()
+                raw = resp.read()
+                break
+            except (HTTPException, OSError):
+                # the server closed an idle keep-alive connection; reconnect once, but
+                # only when repeating is safe - a write may already have been applied
+                con.close()
+                self._local.con = None
+                if attempt == 2 or not (retry if retry is not None else method == "GET"):
+                    raise ServiceError(f"Booking server at {self.host}:{self.port} is not reachable.",
+                                       title="Server Unavailable")
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            raise ServiceError(f"Booking server at {self.host}:{self.port} sent a reply that is not JSON "
+                               f"(HTTP {resp.status}).", title="Server Error")
+        if not isinstance(payload, dict):
+            raise ServiceError(f"Booking server at {self.host}:{self.port} sent an unexpected reply "
+                               f"(HTTP {resp.status}).", title="Server Error")
+        if resp.status >= 400:
+            kind = getattr(services, payload.get("kind", ""), ServiceError)
+            if not (isinstance(kind, type) and issubclass(kind, ServiceError)):
+                kind = ServiceError
+            raise kind(payload.get("error", f"HTTP {resp.status}"), title=payload.get("title"))
+        return payload
+
+    # --- BookingService interface used by the booking window ---
+    def seat_map(self, flight_id):
+        try:
+            d = self._call("GET", f"/flights/{int(flight_id)}/availability")
+        except ServiceError as e:
+            if e.title == "Unknown Flight":
+                return None
+            raise
+        return SeatMap(d["seats"], bytes.fromhex(d["seat_map"]))
+
+    def _booked(self, d):
+        notify_change("bookings", "insert", d["booking_ids"])
+        notify_change("flights", "update", d["flight_ids"])
+        return d
+
+    def book(self, passenger_id, flight_id, return_flight_id=None, seat=None, return_seat=None):
+        segments = [(flight_id, seat)] + ([(return_flight_id, return_seat)] if return_flight_id is not None else [])
+        return self.book_itinerary(passenger_id, segments)[1]
+
+    def book_itinerary(self, passenger_id, segments, itinerary_id=None):
+        # the id is chosen here, so a retried request is answered with the bookings it already made
+        d = self._booked(self._call("POST", "/itineraries", {
+            "passenger_id": passenger_id, "itinerary_id": itinerary_id or str(uuid.uuid4()),
+            "segments": [{"flight_id": s[0], "seat": s[1]} if isinstance(s, (tuple, list)) else s
+                         for s in segments]}, retry=True))
+        return d["itinerary_id"], d["booking_ids"]
+
+    def book_group(self, passenger_ids, flight_id):
+        return self._booked(self._call("POST", "/bookings", {
+            "passenger_ids": list(passenger_ids), "flight_id": flight_id}))["booking_ids"]
+
+    def cancel(self, booking_id):
+        d = self._call("POST", f"/bookings/{int(booking_id)}/cancel")
+        notify_change("bookings", "update", [d["booking_id"]] + d["reseated"])
+        notify_change("bookings", "insert", d["promoted"])
+        notify_change("flights", "update", [d["flight_id"]])
+        return CancelResult(d["flight_id"], d["promoted"], d["reseated"])
+
+    def cancel_flight(self, flight_id):
+        d = self._call("POST", f"/flights/{int(flight_id)}/cancel-bookings")
+        if d["booking_ids"]:
+            notify_change("bookings", "update", d["booking_ids"])
+            notify_change("flights", "update", [d["flight_id"]])
+        return d["booking_ids"]
+
+    def join_waitlist(self, passenger_id, flight_id, priority=0):
+        d = self._call("POST", f"/flights/{int(flight_id)}/waitlist",
+                       {"passenger_id": passenger_id, "priority": priority})
+        notify_change("waitlist", "insert", [d["waitlist_id"]])
+        return WaitlistEntry(**d)
+
+    def leave_waitlist(self, passenger_id, flight_id):
+        return self._call("DELETE", f"/flights/{int(flight_id)}/waitlist/{int(passenger_id)}")["removed"]
+
+    def waitlist(self, flight_id, limit=services.WAITLIST_LIMIT):
+        d = self._call("GET", f"/flights/{int(flight_id)}/waitlist?limit={int(limit)}")
+        return [WaitlistEntry(**e) for e in d["waitlist"]]
+
+
+def booking_service():
+    """The BookingService to use: the shared server when AIRLINE_SERVER_URL is set, else the local DB."""
+    if SERVER_URL:
+        return BookingClient()
+    return services.BookingService()
@@ -1,12 +1,21 @@
 # booking_manager.py
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QGroupBox,
-    QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QMessageBox,
-    QHeaderView, QRadioButton, QButtonGroup, QLabel
+    QLineEdit, QPushButton, QTableView, QAbstractItemView, QMessageBox,
+    QHeaderView, QRadioButton, QButtonGroup, QLabel, QCompleter, QScrollArea
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QStringListModel
 from PyQt5.QtGui import QPalette, QColor, QFont
-from db_utils import db_connect
+from db_worker import DbExecutor, BusyIndicator, LoadingPlaceholder
+from data_store import get_store
+from booking_client import booking_service
+from services import BookingRejected, ServiceError
+from instrumentation import span
+from passenger_search import get_passenger_search
+from seat_map import parse_seat, seat_label
+from seat_map_view import SeatMapView
+
+SEARCH_DEBOUNCE_MS = 150
 
 BTN_CSS = """
 QPushButton {
@@ -47,13 +56,35 @@ class BookingManager(QWidget):
         title.setStyleSheet("color:#0d47a1;")
         root.addWidget(title, alignment=Qt.AlignLeft)
 
+        self.executor = DbExecutor(self)
+        self.service = booking_service()
+        self.store = get_store()
+        root.addWidget(BusyIndicator(self.executor, self.store.executor))
+
         # Form
         form_card = QGroupBox("Create Booking"); form_card.setStyleSheet(CARD_CSS)
         form_layout = QFormLayout()
         form_layout.setLabelAlignment(Qt.AlignRight)
 
+        # Find passenger: debounced search-as-you-type that fills in the ID
+        self.find_passenger = QLineEdit(); self.find_passenger.setPlaceholderText("Type a name or passport number")
+        self._matches = QStringListModel(self)
+        self._match_ids = {}
+        completer = QCompleter(self._matches, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)   # the search already filtered
+        completer.activated[str].connect(self._passenger_chosen)
+        self.find_passenger.setCompleter(completer)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._search_passengers)
+        self.find_passenger.textEdited.connect(lambda _: self._search_timer.start())
+        self.passenger_search = get_passenger_search()
+        self.executor.submit(self.passenger_search.warm)
+
         self.passenger_id = QLineEdit(); self.passenger_id.setPlaceholderText("Passenger ID (number)")
-        self.flight_id = QLineEdit(); self.flight_id.setPlaceholderText("Outbound Flight ID (number)")
+        self.flight_id = QLineEdit(); self.flight_id.setPlaceholderText("Flight ID (12, or 12, 40 for connections)")
+        self.seat = QLineEdit(); self.seat.setPlaceholderText("Seat, e.g. 12C (blank = next free)")
 
         # Trip type
         trip_row = QHBoxLayout()
@@ -68,32 +99,60 @@ class BookingManager(QWidget):
         self.return_flight_id.setVisible(False)
         self.roundtrip_radio.toggled.connect(lambda checked: self.return_flight_id.setVisible(checked))
 
+        form_layout.addRow("Find Passenger", self.find_passenger)
         form_layout.addRow("Passenger ID", self.passenger_id)
         form_layout.addRow("Outbound Flight ID", self.flight_id)
+        form_layout.addRow("Seat", self.seat)
         form_layout.addRow("Trip Type", trip_row)
         form_layout.addRow("", self.return_flight_id)
 
         btn_row = QHBoxLayout()
         add_btn = QPushButton("Book"); add_btn.setStyleSheet(BTN_CSS)
         del_btn = QPushButton("Cancel Selected"); del_btn.setStyleSheet(BTN_CSS)
-        btn_row.addWidget(add_btn); btn_row.addWidget(del_btn)
+        cancel_flight_btn = QPushButton("Cancel All On Flight"); cancel_flight_btn.setStyleSheet(BTN_CSS)
+        btn_row.addWidget(add_btn); btn_row.addWidget(del_btn); btn_row.addWidget(cancel_flight_btn)
         form_layout.addRow(btn_row)
 
         form_card.setLayout(form_layout)
-        root.addWidget(form_card)
+
+        # Seat map of the outbound flight, side by side with the form
+        seat_card = QGroupBox("Seat Map"); seat_card.setStyleSheet(CARD_CSS)
+        seat_layout = QVBoxLayout()
+        self.seat_view = SeatMapView()
+        self.seat_view.seat_clicked.connect(lambda n: self.seat.setText(seat_label(n)))
+        scroll = QScrollArea(); scroll.setWidget(self.seat_view); scroll.setWidgetResizable(False)
+        scroll.setMinimumWidth(self.seat_view.sizeHint().width() + 24)
+        self.seat_status = QLabel("Enter a flight ID to see its seats.")
+        self.seat_status.setStyleSheet("color:#607d8b;")
+        seat_layout.addWidget(self.seat_status)
+        seat_layout.addWidget(scroll)
+        seat_card.setLayout(seat_layout)
+        self._seat_timer = QTimer(self)
+        self._seat_timer.setSingleShot(True)
+        self._seat_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._seat_timer.timeout.connect(self.load_seat_map)
+        self.flight_id.textChanged.connect(lambda _: self._seat_timer.start())
+        self.seat.textEdited.connect(self._seat_typed)
+        self.store.changed.connect(self._store_changed)
+
+        cards = QHBoxLayout()
+        cards.addWidget(form_card, stretch=3)
+        cards.addWidget(seat_card, stretch=2)
+        root.addLayout(cards)
 
         # Table
         table_card = QGroupBox("Bookings List"); table_card.setStyleSheet(CARD_CSS)
         table_layout = QVBoxLayout()
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Booking ID", "Passenger ID", "Flight ID", "Date"])
+        self.model = self.store.model("bookings")
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setAlternatingRowColors(True)
         header: QHeaderView = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.Interactive)
         header.setStretchLastSection(True)
-        self.table.setSelectionBehavior(self.table.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
         table_layout.addWidget(self.table)
         table_card.setLayout(table_layout)
@@ -104,20 +163,77 @@ class BookingManager(QWidget):
         # signals
         add_btn.clicked.connect(self.book_flight)
         del_btn.clicked.connect(self.cancel_booking)
-
-        self.load_bookings()
+        cancel_flight_btn.clicked.connect(self.cancel_flight_bookings)
+        self.model.first_page_loaded.connect(self.table.resizeColumnsToContents)
+        self.loading = LoadingPlaceholder(self.table, self.model)
+        self.model.load_failed.connect(self._show_error)
+        if self.model.rowCount():
+            # shared model already loaded by an earlier window: nothing to fetch
+            self.table.resizeColumnsToContents()
 
     def load_bookings(self):
-        self.table.setRowCount(0)
-        con = db_connect(); cur = con.cursor()
-        cur.execute("SELECT * FROM bookings ORDER BY booking_id DESC")
-        rows = cur.fetchall()
-        for r, row in enumerate(rows):
-            self.table.insertRow(r)
-            for c, val in enumerate(row):
-                self.table.setItem(r, c, QTableWidgetItem(str(val)))
-        con.close()
-        self.table.resizeColumnsToContents()
+        with span("bookings.load"):
+            self.model.reset()
+
+    def _show_error(self, e):
+        if isinstance(e, ServiceError):
+            QMessageBox.warning(self, e.title, str(e))
+        else:
+            QMessageBox.critical(self, "Error", str(e))
+
+    # --- passenger lookup ---
+    def _search_passengers(self):
+        text = self.find_passenger.text().strip()
+        if not text:
+            self.executor.cancel("passenger-search")
+            self._show_matches([])
+            return
+        self.executor.submit(self.passenger_search.search, text, key="passenger-search",
+                             on_done=self._show_matches, on_error=self._show_error)
+
+    def _show_matches(self, rows):
+        self._match_ids = {f"{name} · {passport} (#{pid})": pid for pid, name, passport in rows}
+        self._matches.setStringList(list(self._match_ids))
+        if rows and self.find_passenger.hasFocus():
+            self.find_passenger.completer().complete()
+
+    def _passenger_chosen(self, text):
+        pid = self._match_ids.get(text)
+        if pid is not None:
+            self.passenger_id.setText(str(pid))
+            self.flight_id.setFocus()
+
+    # --- seat map ---
+    def _shown_flight(self):
+        text = self.flight_id.text().split(",")[0].strip()
+        return int(text) if text.isdigit() else None
+
+    def load_seat_map(self):
+        fid = self._shown_flight()
+        if fid is None:
+            self.executor.cancel("seat-map")
+            self._show_seat_map(None)
+            return
+        self.executor.submit(self.service.seat_map, fid, key="seat-map",
+                             on_done=self._show_seat_map, on_error=self._show_error)
+
+    def _show_seat_map(self, seat_map):
+        self.seat_view.set_map(seat_map)
+        if seat_map is None:
+            self.seat_status.setText("Enter a flight ID to see its seats." if self._shown_flight() is None
+                                     else "No such flight.")
+        else:
+            self.seat_status.setText(f"{seat_map.free_count()} of {seat_map.capacity} seats free")
+
+    def _seat_typed(self, text):
+        try:
+            self.seat_view.set_selected(parse_seat(text))
+        except ValueError:
+            self.seat_view.set_selected(None)
+
+    def _store_changed(self, table, op, keys, version):
+        if table == "flights" and self._shown_flight() in keys:
+            self.load_seat_map()
 
     def book_flight(self):
         try:
@@ -125,61 +241,97 @@ class BookingManager(QWidget):
             flight_id = self.flight_id.text().strip()
             is_roundtrip = self.roundtrip_radio.isChecked()
 
-            if not (passenger_id.isdigit() and flight_id.isdigit()):
+            # "12, 13, 14" as passengers books a group in adjacent seats;
+            # as flights, one passenger's connecting itinerary
+            passenger_ids = [p.strip() for p in passenger_id.split(",")]
+            flight_ids = [f.strip() for f in flight_id.split(",")]
+            if not all(x.isdigit() for x in passenger_ids + flight_ids):
                 QMessageBox.warning(self, "Invalid Input", "Enter valid numeric Passenger ID and Flight ID.")
                 return
+            try:
+                seat = parse_seat(self.seat.text())
+            except ValueError as e:
+                QMessageBox.warning(self, "Invalid Input", str(e))
+                return
+            if len(passenger_ids) > 1:
+                if is_roundtrip or seat is not None or len(flight_ids) > 1:
+                    QMessageBox.warning(self, "Invalid Input",
+                                        "Group bookings are one-way on one flight and get adjacent seats "
+                                        "automatically.")
+                    return
+                self.executor.submit(self.service.book_group, [int(p) for p in passenger_ids], int(flight_id),
+                                     on_done=self._booked, on_error=self._show_error)
+                return
 
-            con = db_connect(); cur = con.cursor()
-
-            # Outbound seat check
-            cur.execute("SELECT seats FROM flights WHERE flight_id=%s", (flight_id,))
-            r = cur.fetchone()
-            if not r or r[0] < 1:
-                QMessageBox.warning(self, "No Seats", "No seats available for outbound flight.")
-                con.close(); return
-
-            # Book outbound
-            cur.execute("INSERT INTO bookings (passenger_id, flight_id) VALUES (%s, %s)",
-                        (int(passenger_id), int(flight_id)))
-            cur.execute("UPDATE flights SET seats = seats - 1 WHERE flight_id=%s", (flight_id,))
-
-            # Round-trip
+            # the seat, if given, is for the first flight (the one the seat map shows)
+            segments = [(int(flight_ids[0]), seat)] + [int(f) for f in flight_ids[1:]]
             if is_roundtrip:
-                return_flight_id = self.return_flight_id.text().strip()
-                if not return_flight_id.isdigit():
+                return_ids = [f.strip() for f in self.return_flight_id.text().split(",")]
+                if not all(f.isdigit() for f in return_ids):
                     QMessageBox.warning(self, "Invalid Input", "Enter valid Return Flight ID.")
-                    con.rollback(); con.close(); return
-
-                cur.execute("SELECT seats FROM flights WHERE flight_id=%s", (return_flight_id,))
-                rr = cur.fetchone()
-                if not rr or rr[0] < 1:
-                    QMessageBox.warning(self, "No Seats", "No seats available for return flight.")
-                    con.rollback(); con.close(); return
-
-                cur.execute("INSERT INTO bookings (passenger_id, flight_id) VALUES (%s, %s)",
-                            (int(passenger_id), int(return_flight_id)))
-                cur.execute("UPDATE flights SET seats = seats - 1 WHERE flight_id=%s", (return_flight_id,))
-
-            con.commit(); con.close()
-            self.passenger_id.clear(); self.flight_id.clear(); self.return_flight_id.clear()
-            self.load_bookings()
-            QMessageBox.information(self, "Success", "Booking created.")
+                    return
+                segments += [int(f) for f in return_ids]
+
+            # one full flight: offer its waitlist instead
+            waitlist_flight = int(flight_ids[0]) if len(segments) == 1 else None
+            self.executor.submit(self.service.book_itinerary, int(passenger_id), segments,
+                                 on_done=lambda result: self._booked(result[1]),
+                                 on_error=lambda e: self._booking_failed(e, int(passenger_id), waitlist_flight))
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def _booked(self, booking_ids):
+        self.passenger_id.clear(); self.return_flight_id.clear(); self.seat.clear()
+        self.find_passenger.clear()
+        # the flight id stays, so the seat map keeps showing the flight just booked
+        n = len(booking_ids)
+        QMessageBox.information(self, "Success", "Booking created." if n == 1 else f"{n} bookings created.")
+
+    def _booking_failed(self, e, passenger_id, flight_id):
+        if not (isinstance(e, BookingRejected) and e.title == "No Seats" and flight_id is not None):
+            self._show_error(e)
+            return
+        answer = QMessageBox.question(
+            self, "Flight Full",
+            f"{e}\n\nPut passenger {passenger_id} on the waitlist for flight {flight_id}? "
+            f"They are booked automatically when a seat frees up."
+        )
+        if answer == QMessageBox.Yes:
+            self.executor.submit(self.service.join_waitlist, passenger_id, flight_id,
+                                 on_done=self._waitlisted, on_error=self._show_error)
+
+    def _waitlisted(self, entry):
+        self.passenger_id.clear(); self.find_passenger.clear()
+        QMessageBox.information(self, "Waitlisted", f"Passenger {entry.passenger_id} is number {entry.position} "
+                                                    f"on the waitlist for flight {entry.flight_id}.")
+
     def cancel_booking(self):
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row < 0:
             QMessageBox.warning(self, "No Selection", "Select a booking row to cancel.")
             return
-        booking_id = self.table.item(row, 0).text()
-        flight_id = self.table.item(row, 2).text()
-        try:
-            con = db_connect(); cur = con.cursor()
-            cur.execute("DELETE FROM bookings WHERE booking_id=%s", (booking_id,))
-            cur.execute("UPDATE flights SET seats = seats + 1 WHERE flight_id=%s", (flight_id,))
-            con.commit(); con.close()
-            self.load_bookings()
-            QMessageBox.information(self, "Cancelled", "Booking cancelled.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        booking_id = self.model.row_key(row)
+        self.executor.submit(self.service.cancel, booking_id,
+                             on_done=lambda r: self._cancelled([booking_id], r.promoted), on_error=self._show_error)
+
+    def cancel_flight_bookings(self):
+        row = self.table.currentIndex().row()
+        flight_id = self.model.row_value(row, "flight_id") if row >= 0 else None
+        if flight_id is None:
+            QMessageBox.warning(self, "No Selection", "Select a booking on the flight to cancel.")
+            return
+        answer = QMessageBox.question(
+            self, "Cancel Flight Bookings",
+            f"Cancel every confirmed booking on flight {flight_id}?"
+        )
+        if answer != QMessageBox.Yes:
+            return
+        self.executor.submit(self.service.cancel_flight, flight_id,
+                             on_done=self._cancelled, on_error=self._show_error)
+
+    def _cancelled(self, booking_ids, promoted=()):
+        n = len(booking_ids)
+        text = "Booking cancelled." if n == 1 else f"{n} bookings cancelled."
+        if promoted:
+            text += " The place went to the next passenger on the waitlist."
+        QMessageBox.information(self, "Cancelled", text)
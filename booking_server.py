@@ -0,0 +1,421 @@
+# booking_server.py
+# Headless HTTP/JSON front end to the flight/passenger/booking services, so
+# many agent terminals can work on one inventory.
+#
+#   python booking_server.py --port 8080                                   # MySQL (DB_CONFIG)
+#   python booking_server.py --backend sqlite --sqlite-path airline.db
+#
+# asyncio owns the sockets. Service calls, which hold the row-locking logic,
+# run on a thread pool no wider than the DB connection pool, so a slow
+# transaction never stalls the other requests. Seat-availability reads for a
+# flight that arrive while one for the same flight is in flight share its
+# query. With aiomysql installed and the MySQL backend selected those reads
+# go through an aiomysql pool instead of a thread.
+#
+# Routes (JSON bodies and responses):
+#   GET    /flights?before=&limit=            GET    /flights/search?source=&destination=&date=&seats=
+#   GET    /flights/connections?source=&destination=&departure=&stops=
+#   POST   /flights                           DELETE /flights/<id>
+#   GET    /flights/<id>/availability         POST   /flights/<id>/cancel-bookings
+#   GET    /flights/<id>/waitlist             POST   /flights/<id>/waitlist
+#   DELETE /flights/<id>/waitlist/<passenger> POST   /flights/<id>/overbook
+#   GET    /passengers?before=&limit=         GET    /passengers/search?q=
+#   POST   /passengers                        DELETE /passengers/<id>
+#   GET    /bookings?before=&limit=           POST   /bookings
+#   POST   /itineraries                       POST   /bookings/<id>/cancel
+#   GET    /health                            GET    /metrics
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from db_utils import POOL_SIZE, get_backend, get_connection, pool_metrics, set_backend
+from flight_search import get_search
+from instrumentation import metrics, span
+from passenger_search import get_passenger_search
+from services import (SEARCH_LIMIT, WAITLIST_LIMIT, BookingService, FlightService, PassengerService, ServiceError,
+                      ValidationError)
+
+log = logging.getLogger("airline.server")
+
+MAX_BODY = 1 << 20
+PAGE_LIMIT = 500
+
+# keyset pages, newest first (same queries as the table models)
+PAGES = {
+    "flights": ("flight_id", ["flight_id", "flight_number", "source", "destination", "departure_time",
+                              "arrival_time", "seats", "seats_booked", "overbook"], None),
+    "passengers": ("passenger_id", ["passenger_id", "name", "gender", "age", "passport_no"], None),
+    "bookings": ("booking_id", ["booking_id", "passenger_id", "flight_id", "seat_no", "itinerary_id",
+                                "booking_date"], "status='Confirmed'"),
+}
+AVAILABILITY_SQL = "SELECT seats, overbook, seats_booked, seat_map FROM flights WHERE flight_id=%s"
+
+
+def _page(table, before, limit):
+    key, cols, where = PAGES[table]
+    sql = (f"SELECT {', '.join(cols)} FROM {table} WHERE {where + ' AND ' if where else ''}{key} < %s "
+           f"ORDER BY {key} DESC LIMIT %s")
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute(sql, (before, limit))
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+
+def _fetchone(sql, params):
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute(sql, params)
+        return cur.fetchone()
+
+
+class AsyncDb:
+    """Blocking DB work on a bounded thread pool; plain reads on aiomysql when it is available."""
+
+    def __init__(self, workers=POOL_SIZE):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="db")
+        self.aio_pool = None
+
+    async def start(self):
+        backend = get_backend()
+        if backend.name != "mysql":
+            return
+        try:
+            import aiomysql
+        except ImportError:
+            log.info("aiomysql not installed; reads share the service thread pool")
+            return
+        cfg = backend.config
+        self.aio_pool = await aiomysql.create_pool(
+            host=cfg.get("host", "localhost"), port=cfg.get("port", 3306), user=cfg.get("user"),
+            password=cfg.get("password", ""), db=cfg.get("database"), autocommit=True,
+            minsize=1, maxsize=POOL_SIZE)
+
+    async def close(self):
+        if self.aio_pool is not None:
+            self.aio_pool.close()
+            await self.aio_pool.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def fetchone(self, sql, params):
+        if self.aio_pool is None:
+            return await self.run(_fetchone, sql, params)
+        t = time.perf_counter()
+        async with self.aio_pool.acquire() as con:
+            async with con.cursor() as cur:
+                await cur.execute(sql, params)
+                row = await cur.fetchone()
+        metrics.record_sql(sql, "execute", time.perf_counter() - t, 1)
+        return row
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share the one already running."""
+
+    def __init__(self):
+        self._running = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key, make):
+        fut = self._running.get(key)
+        if fut is None:
+            self.started += 1
+            fut = self._running[key] = asyncio.ensure_future(make())
+            fut.add_done_callback(lambda f: self._running.pop(key, None) if self._running.get(key) is f else None)
+        else:
+            self.shared += 1
+        # shielded: a client hanging up must not cancel the query the others wait on
+        return await asyncio.shield(fut)
+
+
+def _json_body(body):
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ValidationError("Request body is not valid JSON.")
+    if not isinstance(data, dict):
+        raise ValidationError("Request body must be a JSON object.")
+    return data
+
+
+def _int_arg(query, name, default):
+    value = query.get(name, [None])[0]
+    if value is None or value == "":
+        return default
+    if not value.isdigit():
+        raise ValidationError(f"{name} must be a number.")
+    return int(value)
+
+
+class BookingServer:
+    def __init__(self):
+        self.db = AsyncDb()
+        self.flights = FlightService()
+        self.passengers = PassengerService()
+        self.bookings = BookingService()
+        self.availability = SingleFlight()
+        self.routes = []
+        route = self.routes.append
+        route(("GET", r"/health", self.health))
+        route(("GET", r"/metrics", self.show_metrics))
+        route(("GET", r"/flights/search", self.search_flights))
+        route(("GET", r"/flights/connections", self.flight_connections))
+        route(("GET", r"/flights/(\d+)/availability", self.flight_availability))
+        route(("POST", r"/flights/(\d+)/cancel-bookings", self.cancel_flight_bookings))
+        route(("GET", r"/flights/(\d+)/waitlist", self.flight_waitlist))
+        route(("POST", r"/flights/(\d+)/waitlist", self.join_waitlist))
+        route(("DELETE", r"/flights/(\d+)/waitlist/(\d+)", self.leave_waitlist))
+        route(("POST", r"/flights/(\d+)/overbook", self.set_overbook))
+        route(("GET", r"/(flights|passengers|bookings)", self.page))
+        route(("POST", r"/flights", self.add_flight))
+        route(("DELETE", r"/flights/(\d+)", self.delete_flight))
+        route(("GET", r"/passengers/search", self.search_passengers))
+        route(("POST", r"/passengers", self.add_passenger))
+        route(("DELETE", r"/passengers/(\d+)", self.delete_passenger))
+        route(("POST", r"/bookings", self.book))
+        route(("POST", r"/itineraries", self.book_itinerary))
+        route(("POST", r"/bookings/(\d+)/cancel", self.cancel_booking))
+        self.routes = [(m, re.compile(p + r"/?$"), h) for m, p, h in self.routes]
+
+    # --- handlers: (match args, query, body) -> (status, payload) ---
+    async def health(self, query, body):
+        return 200, {"ok": True, "backend": get_backend().name}
+
+    async def show_metrics(self, query, body):
+        return 200, metrics.snapshot(pool=pool_metrics(), availability={
+            "queries": self.availability.started, "coalesced": self.availability.shared})
+
+    async def page(self, table, query, body):
+        before = _int_arg(query, "before", 2 ** 62)
+        limit = min(_int_arg(query, "limit", 100), PAGE_LIMIT)
+        return 200, {table: await self.db.run(_page, table, before, limit)}
+
+    async def search_flights(self, query, body):
+        q = {k: v[0] for k, v in query.items()}
+        if not (q.get("source") and q.get("destination") and q.get("date")):
+            raise ValidationError("source, destination and date are required.")
+        rows = await self.db.run(get_search().search, q["source"], q["destination"], q["date"],
+                                 _int_arg(query, "seats", 1))
+        return 200, {"flights": [dict(zip(PAGES["flights"][1], r)) for r in rows]}
+
+    async def flight_connections(self, query, body):
+        q = {k: v[0] for k, v in query.items()}
+        if not (q.get("source") and q.get("destination") and q.get("departure")):
+            raise ValidationError("source, destination and departure are required.")
+        found = await self.db.run(self.flights.connections, q["source"], q["destination"], q["departure"],
+                                  q.get("stops", 2))
+        return 200, {"itineraries": [
+            {"stops": it.stops, "flight_ids": [leg.flight_id for leg in it.legs],
+             "flight_numbers": [leg.flight_number for leg in it.legs],
+             "departure": datetime.fromtimestamp(it.departure).isoformat(sep=" "),
+             "arrival": datetime.fromtimestamp(it.arrival).isoformat(sep=" ")} for it in found]}
+
+    async def flight_availability(self, flight_id, query, body):
+        fid = int(flight_id)
+        row = await self.availability.do(fid, lambda: self.db.fetchone(AVAILABILITY_SQL, (fid,)))
+        if row is None:
+            return 404, {"error": f"Flight {fid} does not exist.", "title": "Unknown Flight"}
+        seats, overbook, booked, seat_map = row
+        return 200, {"flight_id": fid, "seats": seats, "overbook": overbook, "booked": booked,
+                     "free": seats + overbook - booked,
+                     "seat_map": bytes(seat_map or b"").hex()}
+
+    async def add_flight(self, query, body):
+        d = _json_body(body)
+        fid = await self.db.run(self.flights.add, d.get("flight_number"), d.get("source"), d.get("destination"),
+                                d.get("departure"), d.get("arrival"), d.get("seats"))
+        return 201, {"flight_id": fid}
+
+    async def delete_flight(self, flight_id, query, body):
+        r = await self.db.run(self.flights.delete, int(flight_id))
+        return 200, {"flight_id": int(flight_id), **r._asdict()}
+
+    async def search_passengers(self, query, body):
+        rows = await self.db.run(get_passenger_search().search, query.get("q", [""])[0],
+                                 min(_int_arg(query, "limit", SEARCH_LIMIT), PAGE_LIMIT))
+        return 200, {"passengers": [dict(zip(("passenger_id", "name", "passport_no"), r)) for r in rows]}
+
+    async def add_passenger(self, query, body):
+        d = _json_body(body)
+        pid = await self.db.run(self.passengers.add, d.get("name"), d.get("gender"), d.get("age"),
+                                d.get("passport_no"))
+        return 201, {"passenger_id": pid}
+
+    async def delete_passenger(self, passenger_id, query, body):
+        r = await self.db.run(self.passengers.delete, int(passenger_id))
+        return 200, {"passenger_id": int(passenger_id), **r._asdict()}
+
+    async def book(self, query, body):
+        d = _json_body(body)
+        if "passenger_ids" in d:
+            if not isinstance(d["passenger_ids"], list):
+                raise ValidationError("passenger_ids must be a list.")
+            ids = await self.db.run(self.bookings.book_group, d["passenger_ids"], d.get("flight_id"))
+            return 201, {"booking_ids": ids, "flight_ids": [d.get("flight_id")]}
+        ids = await self.db.run(self.bookings.book, d.get("passenger_id"), d.get("flight_id"),
+                                d.get("return_flight_id"), d.get("seat"), d.get("return_seat"))
+        flights = [f for f in (d.get("flight_id"), d.get("return_flight_id")) if f is not None]
+        return 201, {"booking_ids": ids, "flight_ids": flights}
+
+    async def book_itinerary(self, query, body):
+        d = _json_body(body)
+        segments = d.get("segments")
+        if not isinstance(segments, list):
+            raise ValidationError("segments must be a list.")
+        legs = [(s.get("flight_id"), s.get("seat")) if isinstance(s, dict) else s for s in segments]
+        itinerary_id, ids = await self.db.run(self.bookings.book_itinerary, d.get("passenger_id"), legs,
+                                              d.get("itinerary_id"))
+        return 201, {"itinerary_id": itinerary_id, "booking_ids": ids,
+                     "flight_ids": [leg[0] if isinstance(leg, tuple) else leg for leg in legs]}
+
+    async def cancel_booking(self, booking_id, query, body):
+        r = await self.db.run(self.bookings.cancel, int(booking_id))
+        return 200, {"booking_id": int(booking_id), **r._asdict()}
+
+    async def cancel_flight_bookings(self, flight_id, query, body):
+        ids = await self.db.run(self.bookings.cancel_flight, int(flight_id))
+        return 200, {"flight_id": int(flight_id), "booking_ids": ids}
+
+    async def flight_waitlist(self, flight_id, query, body):
+        limit = min(_int_arg(query, "limit", WAITLIST_LIMIT), PAGE_LIMIT)
+        entries = await self.db.run(self.bookings.waitlist, int(flight_id), limit)
+        return 200, {"flight_id": int(flight_id), "waitlist": [e._asdict() for e in entries]}
+
+    async def join_waitlist(self, flight_id, query, body):
+        d = _json_body(body)
+        entry = await self.db.run(self.bookings.join_waitlist, d.get("passenger_id"), int(flight_id),
+                                  d.get("priority", 0))
+        return 201, entry._asdict()
+
+    async def leave_waitlist(self, flight_id, passenger_id, query, body):
+        removed = await self.db.run(self.bookings.leave_waitlist, int(passenger_id), int(flight_id))
+        return 200, {"flight_id": int(flight_id), "passenger_id": int(passenger_id), "removed": removed}
+
+    async def set_overbook(self, flight_id, query, body):
+        d = _json_body(body)
+        promoted = await self.db.run(self.flights.set_overbook, int(flight_id), d.get("allowance"))
+        return 200, {"flight_id": int(flight_id), "overbook": d.get("allowance"), "promoted": promoted}
+
+    # --- HTTP ---
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        allowed = False
+        for m, pattern, handler in self.routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            if m != method:
+                allowed = True
+                continue
+            try:
+                with span(f"http.{handler.__name__}"):
+                    return await handler(*match.groups(), parse_qs(url.query), body)
+            except ServiceError as e:
+                status = 400 if isinstance(e, ValidationError) else 409
+                return status, {"error": str(e), "title": e.title, "kind": type(e).__name__}
+            except get_backend().integrity_errors as e:
+                return 409, {"error": str(e), "title": "Conflict", "kind": "ServiceError"}
+            except Exception:
+                log.exception("%s %s failed", method, target)
+                return 500, {"error": "Internal server error", "title": "Error", "kind": "ServiceError"}
+        if allowed:
+            return 405, {"error": f"{method} not allowed on {url.path}", "title": "Error"}
+        return 404, {"error": f"No route for {url.path}", "title": "Error"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, keep=False)
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length") or "0"
+                if not length.isdigit():
+                    await self._respond(writer, 400, {"error": "Malformed Content-Length"}, keep=False)
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, keep=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.dispatch(method.upper(), target, body)
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep):
+        data = json.dumps(payload, default=str).encode()
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                + ("" if keep else "Connection: close\r\n") + "\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080, ready=None):
+        await self.db.start()
+        asyncio.ensure_future(self.db.run(get_passenger_search().warm))   # SQL search until it is built
+        server = await asyncio.start_server(self.handle, host, port)
+        log.info("booking server on %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.db.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HTTP/JSON booking service.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--backend", choices=["mysql", "sqlite"])
+    ap.add_argument("--sqlite-path")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    if args.backend == "sqlite":
+        set_backend("sqlite", path=args.sqlite_path)
+    elif args.backend:
+        set_backend(args.backend)
+    if os.environ.get("AIRLINE_APP_AUDIT") == "1":
+        import audit
+        audit.get_writer()
+    try:
+        asyncio.run(BookingServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
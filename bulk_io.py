@@ -0,0 +1,262 @@
+# bulk_io.py
+# Streaming bulk import/export for flights, passengers and bookings.
+#
+#   python bulk_io.py import flights schedule.csv --rejects rejects.csv
+#   python bulk_io.py import bookings manifest.jsonl --chunk 2000
+#   python bulk_io.py export bookings bookings.jsonl
+#
+# Files are read one record at a time and written in chunks of --chunk rows,
+# one transaction per chunk, so memory and lock time stay bounded however big
+# the file is. Rows that fail to parse or validate go to the reject file with
+# "line" and "error" columns instead of stopping the run.
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+from db_utils import get_connection
+from services import (
+    BookingService, ServiceError, notify_change,
+    validate_flight, validate_passenger,
+)
+
+CHUNK_SIZE = 1000
+EXPORT_FETCH = 5000
+
+ImportReport = namedtuple("ImportReport", "read accepted rejected chunks")
+
+TABLES = {
+    # table -> (key column, insertable columns, exported columns)
+    "flights": ("flight_id",
+                ["flight_number", "source", "destination", "departure_time", "arrival_time", "seats"],
+                ["flight_id", "flight_number", "source", "destination", "departure_time", "arrival_time",
+                 "seats", "seats_booked"]),
+    "passengers": ("passenger_id",
+                   ["name", "gender", "age", "passport_no"],
+                   ["passenger_id", "name", "gender", "age", "passport_no"]),
+    "bookings": ("booking_id",
+                 ["passenger_id", "flight_id"],
+                 ["booking_id", "passenger_id", "flight_id", "seat_no", "booking_date", "status"]),
+}
+
+
+def _format_of(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+# --- reading ---
+def iter_records(path):
+    """Yield ``(line_no, record, error)`` lazily from a CSV (with header) or JSON-lines file.
+
+    A JSON line that does not parse to an object comes back as
+    ``{"record": <text>}`` with ``error`` set, so the import can reject it and
+    carry on; ``error`` is None for every other record.
+    """
+    if _format_of(path) == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError as e:
+                    yield line_no, {"record": line}, f"Invalid JSON: {e}"
+                    continue
+                if isinstance(rec, dict):
+                    yield line_no, rec, None
+                else:
+                    yield line_no, {"record": line}, "Each line must be a JSON object."
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for rec in reader:
+                yield reader.line_num, rec, None
+
+
+def _datetime(value):
+    return datetime.fromisoformat(str(value).strip()).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _validate(table, rec):
+    if table == "flights":
+        values = validate_flight(rec.get("flight_number"), rec.get("source"), rec.get("destination"),
+                                 rec.get("departure_time"), rec.get("arrival_time"), rec.get("seats"))
+        try:
+            return values[:3] + (_datetime(values[3]), _datetime(values[4])) + values[5:]
+        except ValueError:
+            raise ServiceError("Departure/arrival must be YYYY-MM-DD HH:MM:SS.")
+    if table == "passengers":
+        return validate_passenger(rec.get("name"), rec.get("gender"), rec.get("age"), rec.get("passport_no"))
+    return rec.get("passenger_id"), rec.get("flight_id")
+
+
+class _RejectWriter:
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+        self._csv = None
+
+    def write(self, line_no, rec, error):
+        if self.path is None:
+            return
+        row = {"line": line_no, **rec, "error": error}
+        if self._f is None:
+            self._f = open(self.path, "w", newline="", encoding="utf-8")
+            if _format_of(self.path) == "csv":
+                self._csv = csv.DictWriter(self._f, fieldnames=list(row), extrasaction="ignore")
+                self._csv.writeheader()
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self._f.write(json.dumps(row, default=str) + "\n")
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+
+
+# --- writing ---
+def _insert_chunk(table, rows):
+    key, cols, _ = TABLES[table]
+    marks = ", ".join(["%s"] * len(cols))
+    with get_connection() as con:
+        cur = con.cursor()
+        cur.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+        floor = cur.fetchone()[0]
+        cur.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({marks})", rows)
+        con.commit()
+        # new ids for the change listeners; may include rows other clients added meanwhile
+        cur.execute(f"SELECT {key} FROM {table} WHERE {key} > %s", (floor,))
+        ids = [r[0] for r in cur.fetchall()]
+    notify_change(table, "insert", ids)
+
+
+def import_file(table, path, chunk_size=CHUNK_SIZE, reject_path=None, progress=None):
+    """Stream ``path`` into ``table``; ``progress(read, accepted, rejected)`` is called per chunk."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r}")
+    rejects = _RejectWriter(reject_path)
+    booking = BookingService() if table == "bookings" else None
+    read = accepted = rejected = chunks = 0
+    pending = []    # (line_no, record, values)
+
+    def flush():
+        nonlocal accepted, rejected, chunks
+        if not pending:
+            return
+        if booking is not None:
+            # bookings go through the seat-checked batch path
+            for (line_no, rec, _), res in zip(pending, booking.book_many([v for _, _, v in pending])):
+                if res.ok:
+                    accepted += 1
+                else:
+                    rejected += 1
+                    rejects.write(line_no, rec, res.error)
+        else:
+            try:
+                _insert_chunk(table, [v for _, _, v in pending])
+                accepted += len(pending)
+            except Exception as e:
+                # one bad row (e.g. a trigger) fails the chunk; retry row by row to isolate it
+                for line_no, rec, values in pending:
+                    try:
+                        _insert_chunk(table, [values])
+                        accepted += 1
+                    except Exception as row_error:
+                        rejected += 1
+                        rejects.write(line_no, rec, str(row_error) or str(e))
+        chunks += 1
+        pending.clear()
+        if progress:
+            progress(read, accepted, rejected)
+
+    try:
+        for line_no, rec, error in iter_records(path):
+            read += 1
+            if error is None:
+                try:
+                    pending.append((line_no, rec, _validate(table, rec)))
+                except ServiceError as e:
+                    error = str(e)
+            if error is not None:
+                rejected += 1
+                rejects.write(line_no, rec, error)
+            if len(pending) >= chunk_size:
+                flush()
+        flush()
+    finally:
+        rejects.close()
+    if progress and not chunks:
+        progress(read, accepted, rejected)
+    return ImportReport(read, accepted, rejected, chunks)
+
+
+# --- export ---
+def export_table(table, path, fetch_size=EXPORT_FETCH, progress=None):
+    """Stream a whole table to CSV/JSONL without holding it in memory; returns the row count."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r}")
+    key, _, cols = TABLES[table]
+    fmt = _format_of(path)
+    written = 0
+    with get_connection() as con, open(path, "w", newline="", encoding="utf-8") as f:
+        # mysql.connector cursors are unbuffered unless asked otherwise, so
+        # fetchmany pulls rows off the wire fetch_size at a time
+        cur = con.cursor()
+        cur.execute(f"SELECT {', '.join(cols)} FROM {table} ORDER BY {key}")
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer:
+            writer.writerow(cols)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                if writer:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(dict(zip(cols, row)), default=str) + "\n")
+            written += len(rows)
+            if progress:
+                progress(written)
+    return written
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk import/export for the airline database.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="load a CSV/JSONL file")
+    imp.add_argument("table", choices=sorted(TABLES))
+    imp.add_argument("path")
+    imp.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    imp.add_argument("--rejects", help="file for rejected rows (default: <path>.rejects.<ext>)")
+    exp = sub.add_parser("export", help="dump a table to CSV/JSONL")
+    exp.add_argument("table", choices=sorted(TABLES))
+    exp.add_argument("path")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "import":
+        root, ext = os.path.splitext(args.path)
+        rejects = args.rejects or f"{root}.rejects{ext or '.csv'}"
+        report = import_file(
+            args.table, args.path, args.chunk, rejects,
+            progress=lambda r, a, j: print(f"\rread {r}  accepted {a}  rejected {j}", end="", file=sys.stderr),
+        )
+        print(file=sys.stderr)
+        print(f"{report.accepted} of {report.read} rows imported, {report.rejected} rejected"
+              + (f" (see {rejects})" if report.rejected else ""))
+        return 1 if report.rejected else 0
+
+    n = export_table(args.table, args.path,
+                     progress=lambda w: print(f"\rexported {w}", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    print(f"{n} rows written to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# connections.py
+# Multi-leg itinerary search over the flights table, done in memory instead of
+# with self-joins. The schedule is kept as a time-sorted departure list per
+# airport and searched round by round (round k = itineraries with k legs),
+# which gives the earliest arrival for every number of stops in one pass.
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from db_utils import get_backend, get_connection
+from services import add_change_listener
+
+MIN_CONNECTION = timedelta(minutes=45)
+MAX_WAIT = timedelta(hours=24)     # longest layover (and first-departure window) considered
+
+Leg = namedtuple("Leg", "departure arrival flight_id flight_number source destination")
+Itinerary = namedtuple("Itinerary", "legs departure arrival stops")
+
+_FLIGHT_COLS = "flight_id, flight_number, source, destination, departure_time, arrival_time"
+
+
+def _ts(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _seconds(value):
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+def _next_free(nxt, i):
+    # first index >= i not yet expanded; nxt maps expanded indices forward
+    root = i
+    while root in nxt:
+        root = nxt[root]
+    while i != root:
+        nxt[i], i = root, nxt[i]
+    return root
+
+
+class ConnectionFinder:
+    def __init__(self, min_connection=MIN_CONNECTION, max_wait=MAX_WAIT):
+        self.min_connection = _seconds(min_connection)
+        self.max_wait = _seconds(max_wait)
+        self._departures = {}   # airport -> sorted list of Leg (ordered by departure, then id)
+        self._legs = {}         # flight_id -> Leg
+        self._lock = threading.RLock()
+
+    # --- schedule maintenance ---
+    def add_flight(self, flight_id, flight_number, source, destination, departure, arrival):
+        leg = Leg(_ts(departure), _ts(arrival), flight_id, flight_number, source, destination)
+        with self._lock:
+            if flight_id in self._legs:
+                self._remove(flight_id)
+            self._legs[flight_id] = leg
+            insort(self._departures.setdefault(source, []), leg)
+
+    def remove_flight(self, flight_id):
+        with self._lock:
+            self._remove(flight_id)
+
+    def _remove(self, flight_id):
+        leg = self._legs.pop(flight_id, None)
+        if leg is None:
+            return
+        deps = self._departures[leg.source]
+        i = bisect_left(deps, leg)
+        if i < len(deps) and deps[i].flight_id == flight_id:
+            del deps[i]
+
+    def load(self, rows):
+        # bulk build: append then sort once per airport
+        with self._lock:
+            self._departures.clear()
+            self._legs.clear()
+            for fid, fn, src, dest, dep, arr in rows:
+                leg = Leg(_ts(dep), _ts(arr), fid, fn, src, dest)
+                self._legs[fid] = leg
+                self._departures.setdefault(src, []).append(leg)
+            for deps in self._departures.values():
+                deps.sort()
+
+    def load_from_db(self):
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {_FLIGHT_COLS} FROM flights")
+            self.load(cur.fetchall())
+
+    def watch(self):
+        """Follow committed flight inserts/deletes made through the services."""
+        add_change_listener(self._on_change)
+
+    def _on_change(self, table, op, keys):
+        if table != "flights":
+            return
+        if op == "delete":
+            for fid in keys:
+                self.remove_flight(fid)
+        elif op == "insert":
+            marks = ", ".join(["%s"] * len(keys))
+            with get_connection() as con:
+                cur = con.cursor()
+                cur.execute(f"SELECT {_FLIGHT_COLS} FROM flights WHERE flight_id IN ({marks})", tuple(keys))
+                for row in cur.fetchall():
+                    self.add_flight(*row)
+
+    def __len__(self):
+        return len(self._legs)
+
+    # --- search ---
+    def itineraries(self, origin, destination, earliest_departure, max_stops=2):
+        """Earliest-arriving itinerary for each number of stops (0..max_stops) that beats fewer stops.
+
+        Round k extends the itineraries kept in round k-1 by one leg. Where a
+        leg goes next does not depend on when the traveller reached its
+        departure airport, so each departure is expanded at most once, by the
+        first (fewest-stop) itinerary whose connection window covers it; later
+        itineraries at that airport only pick up the departures left over.
+        Arriving earlier is not enough to drop an itinerary, because the
+        MAX_WAIT cap closes an earlier arrival's window sooner.
+        """
+        start = _ts(earliest_departure)
+        taken = {}                            # airport -> {index: next unexpanded index} (path-compressed)
+        frontier = [(origin, start, ())]      # (airport, ready, path) kept in the last round
+        results = []
+        best = float("inf")                   # earliest arrival at destination so far
+        with self._lock:
+            for k in range(max_stops + 1):
+                improved = []
+                arrived = None
+                for airport, ready, path in frontier:
+                    deps = self._departures.get(airport)
+                    if not deps:
+                        continue
+                    earliest = ready + (self.min_connection if path else 0.0)
+                    lo = bisect_left(deps, (earliest,))
+                    hi = bisect_right(deps, (earliest + self.max_wait, float("inf")))
+                    nxt = taken.setdefault(airport, {})
+                    visited = {leg.source for leg in path}
+                    i = _next_free(nxt, lo)
+                    while i < hi:
+                        leg = deps[i]
+                        to = leg.destination
+                        if to in visited:
+                            # another itinerary may still use this leg
+                            i = _next_free(nxt, i + 1)
+                            continue
+                        nxt[i] = i + 1
+                        i = _next_free(nxt, i + 1)
+                        if to == origin or leg.arrival >= best:
+                            continue
+                        if to == destination:
+                            if arrived is None or leg.arrival < arrived[-1].arrival:
+                                arrived = path + (leg,)
+                            continue
+                        improved.append((to, leg.arrival, path + (leg,)))
+                if arrived is not None:
+                    best = arrived[-1].arrival
+                    results.append(Itinerary(arrived, arrived[0].departure, best, k))
+                    improved = [item for item in improved if item[1] < best]
+                if not improved:
+                    break
+                frontier = improved
+        return results
+
+    def earliest_arrival(self, origin, destination, earliest_departure, max_stops=2):
+        found = self.itineraries(origin, destination, earliest_departure, max_stops)
+        return found[-1] if found else None
+
+
+_finder = None
+_finder_backend = None
+_finder_lock = threading.Lock()
+
+
+def get_finder():
+    """The shared finder over the current database's flights, loaded on first use and then kept current."""
+    global _finder, _finder_backend
+    with _finder_lock:
+        if _finder is None:
+            _finder = ConnectionFinder()
+            _finder.watch()
+        if _finder_backend is not get_backend():
+            # first use, or set_backend() switched databases
+            _finder.load_from_db()
+            _finder_backend = get_backend()
+        return _finder
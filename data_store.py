@@ -0,0 +1,107 @@
+# data_store.py
+# One set of table models for the whole app, kept current from the service
+# layer's change notifications.
+#
+# Every manager window shows the same PagedTableModel for its table, so
+# reopening a window reuses rows already in memory instead of re-querying,
+# and a write made in one window (a booking changing a flight's seat count,
+# say) is patched into every open view.
+import os
+import threading
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from db_worker import DbExecutor
+from instrumentation import span
+from seat_map import seat_label
+from services import add_change_listener
+from table_model import PagedTableModel, SnapshotTableModel
+
+# table -> (columns, headers, where, display formatters)
+TABLES = {
+    "flights": (["flight_id", "flight_number", "source", "destination", "departure_time", "arrival_time",
+                 "seats", "seats_booked", "overbook"],
+                ["ID", "Flight#", "Source", "Destination", "Departure", "Arrival", "Seats", "Booked",
+                 "Overbook"],
+                None, None),
+    "passengers": (["passenger_id", "name", "gender", "age", "passport_no"],
+                   ["ID", "Name", "Gender", "Age", "Passport No"],
+                   None, None),
+    "bookings": (["booking_id", "passenger_id", "flight_id", "seat_no", "booking_date"],
+                 ["Booking ID", "Passenger ID", "Flight ID", "Seat", "Date"],
+                 "status='Confirmed'", {"seat_no": seat_label}),
+}
+
+# Flights are shown from the memory-mapped flight snapshot (flight_snapshot.py) unless this is 0
+FLIGHT_SNAPSHOT = os.environ.get("AIRLINE_FLIGHT_SNAPSHOT", "1") != "0"
+SNAPSHOT_REFRESH_MS = 60000   # other clients' changes show up after this at the latest, as in flight_search
+
+
+class DataStore(QObject):
+    """Shared models plus a per-table version stamp bumped on every committed write.
+
+    Service listeners fire on whichever thread made the write; they are
+    re-emitted through a queued signal so models are only touched on the GUI
+    thread.
+    """
+
+    changed = pyqtSignal(str, str, object, int)   # table, op, keys, new version
+    _incoming = pyqtSignal(str, str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.executor = DbExecutor(self)
+        self._models = {}
+        self.versions = dict.fromkeys(TABLES, 0)
+        self._incoming.connect(self._apply, Qt.QueuedConnection)
+        add_change_listener(self._on_change)
+
+    def model(self, table):
+        """The app-wide model for ``table``; first use starts loading it."""
+        model = self._models.get(table)
+        if model is None:
+            columns, headers, where, formatters = TABLES[table]
+            if table == "flights" and FLIGHT_SNAPSHOT:
+                model = self._models[table] = SnapshotTableModel(headers, executor=self.executor,
+                                                                 refresh_ms=SNAPSHOT_REFRESH_MS, parent=self)
+                return model
+            model = self._models[table] = PagedTableModel(table, columns, headers, where=where,
+                                                          formatters=formatters, executor=self.executor,
+                                                          parent=self)
+            model.fetchMore()
+        return model
+
+    def version(self, table):
+        return self.versions[table]
+
+    def _on_change(self, table, op, keys):
+        # any thread
+        if table in TABLES:
+            self._incoming.emit(table, op, keys)
+
+    def _apply(self, table, op, keys):
+        self.versions[table] += 1
+        model = self._models.get(table)
+        if model is not None:
+            with span(f"store.{table}.{op}"):
+                if op == "insert":
+                    model.refresh_since()      # new rows plus anything else added since
+                elif op == "delete":
+                    model.remove_keys(keys)
+                else:
+                    model.refresh_keys(keys)   # re-read; rows leaving the filter drop out
+        self.changed.emit(table, op, keys, self.versions[table])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    # created on the GUI thread the first time a window asks for it
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DataStore()
+    return _store
@@ -9,8 +9,11 @@ CREATE TABLE flights (
     destination VARCHAR(30),
     departure_time DATETIME,
     arrival_time DATETIME,
-    seats INT,
-    seats_booked INT DEFAULT 0 
+    seats INT,                  -- capacity; never changed by bookings
+    seats_booked INT DEFAULT 0, -- confirmed bookings, maintained only by the triggers below
+    seat_map BLOB NULL,         -- bitset of taken seats (bit n-1 = seat n), maintained by BookingService
+    overbook SMALLINT NOT NULL DEFAULT 0,  -- bookings sold beyond seats; they get a seat when one frees up
+    INDEX idx_flights_route (source, destination, departure_time)  -- route/date search
 );
 
 CREATE TABLE passengers (
@@ -18,7 +21,9 @@ CREATE TABLE passengers (
     name VARCHAR(50),
     gender VARCHAR(10),
     age INT,
-    passport_no VARCHAR(20)
+    passport_no VARCHAR(20),
+    UNIQUE INDEX uq_passengers_passport (passport_no),  -- one record per passport; passport lookup
+    INDEX idx_passengers_name (name)  -- name-prefix search
 );
 
 CREATE TABLE bookings (
@@ -27,37 +32,123 @@ CREATE TABLE bookings (
     flight_id INT,
     booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
     status ENUM('Confirmed', 'Cancelled') DEFAULT 'Confirmed', 
+    seat_no SMALLINT NULL,      -- 1..seats, shown as 1A, 1B, ...
+    itinerary_id CHAR(36) NULL, -- client UUID shared by the segments of one BookingService.book_itinerary
+    -- 1 while confirmed, NULL once cancelled: NULLs never collide in a UNIQUE index,
+    -- so a passenger can hold at most one confirmed booking per flight
+    active_flag TINYINT AS (IF(status = 'Confirmed', 1, NULL)) STORED,
     FOREIGN KEY (passenger_id) REFERENCES passengers(passenger_id),
-    FOREIGN KEY (flight_id) REFERENCES flights(flight_id)
+    FOREIGN KEY (flight_id) REFERENCES flights(flight_id),
+    UNIQUE INDEX uq_bookings_active (passenger_id, flight_id, active_flag),  -- replaces prevent_double_booking
+    UNIQUE INDEX uq_bookings_seat (flight_id, seat_no, active_flag),  -- one confirmed booking per seat
+    INDEX idx_bookings_flight_status (flight_id, status),  -- per-flight counts and bulk cancel
+    INDEX idx_bookings_status_id (status, booking_id),  -- confirmed listings, newest first
+    INDEX idx_bookings_itinerary (itinerary_id)  -- segments of an itinerary (replayed bookings)
 );
 
 
+-- Passengers waiting for a seat on a full flight. Higher priority first, then
+-- in joining order; BookingService promotes the first in line when a seat frees up.
+CREATE TABLE waitlist (
+    waitlist_id INT PRIMARY KEY AUTO_INCREMENT,
+    flight_id INT NOT NULL,
+    passenger_id INT NOT NULL,
+    priority INT NOT NULL DEFAULT 0,
+    requested_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (flight_id) REFERENCES flights(flight_id),
+    FOREIGN KEY (passenger_id) REFERENCES passengers(passenger_id),
+    UNIQUE INDEX uq_waitlist_passenger (passenger_id, flight_id),  -- once per flight; a passenger's entries
+    INDEX idx_waitlist_flight (flight_id, waitlist_id)  -- entries added since a process last read the flight
+);
+
+-- Bookings removed together with their flight or passenger (services.DeletionService).
+-- No foreign keys: the rows they pointed at are gone.
+CREATE TABLE bookings_archive (
+    booking_id INT PRIMARY KEY,
+    passenger_id INT,
+    flight_id INT,
+    booking_date DATETIME,
+    status ENUM('Confirmed', 'Cancelled'),
+    seat_no SMALLINT NULL,
+    itinerary_id CHAR(36) NULL,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_archive_passenger (passenger_id),
+    INDEX idx_archive_flight (flight_id)
+);
+
+-- Append-only change stream of bookings, one partition per month of change_date so
+-- audit.AuditLog.purge() can drop old history instead of deleting it row by row.
+-- The partition key has to be part of every unique key, hence (log_id, change_date).
+-- `python audit.py --partitions` adds the months ahead.
 CREATE TABLE booking_audit_log (
-    log_id INT PRIMARY KEY AUTO_INCREMENT,
+    log_id INT AUTO_INCREMENT,
     booking_id INT,
+    flight_id INT,              -- copied from the booking so reports need no join back to bookings
     old_status ENUM('Confirmed', 'Cancelled'),
     new_status ENUM('Confirmed', 'Cancelled'),
-    change_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    action_performed VARCHAR(50)
+    change_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    action_performed VARCHAR(50),
+    PRIMARY KEY (log_id, change_date),
+    INDEX idx_audit_booking (booking_id, log_id),   -- history of one booking
+    INDEX idx_audit_date (change_date, log_id)      -- time-range queries and retention
+)
+PARTITION BY RANGE COLUMNS (change_date) (
+    PARTITION p_old VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
 );
 
--- Trigger 1: Prevent double bookings for the same passenger on the same flight
-DELIMITER $$
-CREATE TRIGGER prevent_double_booking
-BEFORE INSERT ON bookings
-FOR EACH ROW
-BEGIN
-    IF EXISTS (
-        SELECT 1 FROM bookings 
-        WHERE passenger_id = NEW.passenger_id 
-        AND flight_id = NEW.flight_id
-        AND status = 'Confirmed' 
-    ) THEN
-        SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'Passenger already has a confirmed booking on this flight.';
-    END IF;
-END$$
-DELIMITER ;
+-- Per-day, per-flight counts of audit rows removed by retention (audit.AuditLog.purge),
+-- so reports.rebuild_summaries and AuditLog.daily still see the history they summarise.
+CREATE TABLE booking_audit_daily (
+    day DATE,
+    flight_id INT NOT NULL DEFAULT 0,      -- 0: rows that carried no flight id
+    events INT NOT NULL DEFAULT 0,
+    booked INT NOT NULL DEFAULT 0,         -- entered 'Confirmed'
+    cancelled INT NOT NULL DEFAULT 0,      -- left 'Confirmed'
+    booked_gone INT NOT NULL DEFAULT 0,    -- bookings counted nowhere else: gone when purged, or deleted unlogged
+    PRIMARY KEY (day, flight_id)
+);
+
+-- Partitions whose rows are already in booking_audit_daily; purge() drops them next
+CREATE TABLE audit_retention (
+    partition_name VARCHAR(16) PRIMARY KEY,
+    rolled_up_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Report summaries, advanced from booking_audit_log by reports.ReportService.refresh_summaries.
+-- booked counts bookings entering 'Confirmed', cancelled counts confirmed bookings leaving it.
+CREATE TABLE report_daily_bookings (
+    day DATE PRIMARY KEY,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE report_route_bookings (
+    source VARCHAR(30),
+    destination VARCHAR(30),
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, destination)
+);
+
+CREATE TABLE report_state (
+    name VARCHAR(30) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0   -- highest booking_audit_log row folded into the summaries
+);
+INSERT INTO report_state (name, last_log_id) VALUES ('audit', 0);
+
+-- Holes in booking_audit_log ids a refresh is waiting on (reports.ReportService._fold_limit).
+-- Shared by every process, so a hole left by a rolled-back insert is skipped after GAP_GRACE_S.
+CREATE TABLE report_gaps (
+    log_id INT PRIMARY KEY,
+    first_seen DOUBLE NOT NULL   -- unix time the hole was first seen
+);
+
+-- Trigger 1 (prevent_double_booking) was replaced by the uq_bookings_active
+-- unique index on bookings, which does the same check without a table scan.
 
 -- Trigger 2: Automatically increment the seats_booked counter when a new booking is made
 DELIMITER $$
@@ -73,7 +164,7 @@ BEGIN
 END$$
 DELIMITER ;
 
--- Trigger 3: Prevent overbooking (ensure seats_booked never exceeds total seats)
+-- Trigger 3: Prevent overbooking (seats_booked never exceeds seats plus the flight's overbooking allowance)
 DELIMITER $$
 CREATE TRIGGER prevent_overbooking
 BEFORE INSERT ON bookings
@@ -82,10 +173,12 @@ BEGIN
     DECLARE total_seats INT;
     DECLARE booked_seats INT;
     
-    -- Get the total seats and currently booked seats for the flight
-    SELECT seats, seats_booked INTO total_seats, booked_seats
+    -- Get the capacity (overbooking allowance included) and currently booked seats for the flight
+    -- Lock the flight row so concurrent inserts queue up behind this check
+    SELECT seats + overbook, seats_booked INTO total_seats, booked_seats
     FROM flights 
-    WHERE flight_id = NEW.flight_id;
+    WHERE flight_id = NEW.flight_id
+    FOR UPDATE;
     
     -- Check if the new booking would exceed capacity
     IF (booked_seats >= total_seats) THEN
@@ -110,15 +203,53 @@ BEGIN
 END$$
 DELIMITER ;
 
+-- Trigger 4b: Free the seat when a confirmed booking row is removed outright
+DELIMITER $$
+CREATE TRIGGER after_booking_deleted
+AFTER DELETE ON bookings
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'Confirmed' THEN
+        UPDATE flights 
+        SET seats_booked = seats_booked - 1 
+        WHERE flight_id = OLD.flight_id;
+    END IF;
+END$$
+DELIMITER ;
+
 -- Trigger 5: Audit log trigger - tracks status changes in bookings
 DELIMITER $$
 CREATE TRIGGER audit_booking_changes
 AFTER UPDATE ON bookings
 FOR EACH ROW
 BEGIN
-    IF OLD.status != NEW.status THEN
-        INSERT INTO booking_audit_log (booking_id, old_status, new_status, action_performed)
-        VALUES (OLD.booking_id, OLD.status, NEW.status, 'Status Update');
+    -- sessions using audit.AuditWriter set @airline_app_audit and write these rows in batches
+    IF OLD.status != NEW.status AND @airline_app_audit IS NULL THEN
+        INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+        VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+    END IF;
+END$$
+DELIMITER ;
+
+-- Trigger 5b: Audit new and removed bookings too, so the log is a complete change stream for the reports
+DELIMITER $$
+CREATE TRIGGER audit_booking_inserts
+AFTER INSERT ON bookings
+FOR EACH ROW
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, change_date, action_performed)
+    VALUES (NEW.booking_id, NEW.flight_id, NULL, NEW.status, COALESCE(NEW.booking_date, CURRENT_TIMESTAMP), 'Booked');
+END$$
+DELIMITER ;
+
+DELIMITER $$
+CREATE TRIGGER audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW
+BEGIN
+    IF @airline_app_audit IS NULL THEN
+        INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+        VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
     END IF;
 END$$
 DELIMITER ;
@@ -1,12 +1,559 @@
 # db_utils.py
-import mysql.connector
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from instrumentation import instrument_connection, metrics
+
+# mysql.connector takes longer to import than the rest of the app put together,
+# so it is only loaded when a MySQL backend is actually created
+mysql = None
 
 DB_CONFIG = {
     "host": "localhost",
     "user": "root",      # Write your own username
-    "password": "root",  # and password    
-    "database": "dataset.sql"
+    "password": "root",  # and password
+    "database": "AirlineDB"
 }
 
+# Which engine to use: "mysql" (default) or "sqlite" for local runs, tests and
+# benchmarks without a server. Both can also be chosen at runtime with set_backend().
+DB_BACKEND = os.environ.get("AIRLINE_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("AIRLINE_DB_PATH", "airline.db")
+
+# Pool sizing: connections are opened lazily up to POOL_SIZE and kept alive
+# between clicks instead of paying the TCP + auth handshake every time.
+POOL_SIZE = 5
+POOL_TIMEOUT = 10.0        # seconds to wait for a free connection
+HEALTH_CHECK_IDLE = 30.0   # ping connections that sat idle longer than this
+
+FETCH_ROWS = 10000         # rows per fetchmany when fetch_columns fills column arrays
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# SQLite files record their schema version in PRAGMA user_version. New files
+# get schema_sqlite.sql and the latest version; older ones run the scripts in
+# migrations/sqlite/ (numbered like the MySQL migrations) above their version.
+# Files from before versioning have user_version 0 and start at 3, the schema
+# SQLite support shipped with.
+SQLITE_MIGRATIONS = os.path.join(_HERE, "migrations", "sqlite")
+SQLITE_BASE_VERSION = 3
+SQLITE_MIN_VERSION = (3, 31, 0)   # generated columns (bookings.active_flag)
+
+
+def _load_mysql():
+    global mysql
+    if mysql is None:
+        try:
+            import mysql.connector
+        except ImportError:     # SQLite-only installs
+            raise RuntimeError("mysql-connector-python is not installed") from None
+    return mysql
+
+
+# --- backends ---
+# Each backend names its driver's errors: ``is_disconnect(exc)`` (drop the
+# connection) and ``integrity_errors`` (a UNIQUE index such as
+# uq_bookings_active rejected a row).
+class MySQLBackend:
+    name = "mysql"
+    paramstyle = "format"
+    schema_path = os.path.join(_HERE, "dataset.sql")
+
+    def __init__(self, config=None):
+        errors = _load_mysql().connector.errors
+        self.config = dict(config or DB_CONFIG)
+        self.disconnect_errors = (errors.OperationalError, errors.InterfaceError)
+        self.integrity_errors = (errors.IntegrityError,)
+
+    def connect(self):
+        return _load_mysql().connector.connect(**self.config)
+
+    def is_disconnect(self, exc):
+        return isinstance(exc, self.disconnect_errors)
+
+    def identity(self):
+        """Which database this is, for caches kept outside it."""
+        return f"mysql://{self.config.get('host', 'localhost')}:{self.config.get('port', 3306)}/" \
+               f"{self.config.get('database')}"
+
+    @staticmethod
+    def inserted_ids(cur, n):
+        # LAST_INSERT_ID() is the first row of a multi-row INSERT; InnoDB gives
+        # the rows of one fixed-count INSERT consecutive ids in every lock mode
+        return list(range(cur.lastrowid, cur.lastrowid + n))
+
+    def explain(self, cur, sql, params):
+        """Plan steps as (table, access, full_scan)."""
+        cur.execute("EXPLAIN " + sql, params)
+        cols = [d[0] for d in cur.description]
+        steps = [dict(zip(cols, row)) for row in cur.fetchall()]
+        return [(st["table"], f"{st.get('type')} key={st.get('key')}", st.get("type") == "ALL") for st in steps]
+
+    def init_schema(self):
+        # dataset.sql is written for the mysql client (DELIMITER blocks); split it here
+        config = {k: v for k, v in self.config.items() if k != "database"}
+        con = _load_mysql().connector.connect(**config)
+        try:
+            cur = con.cursor()
+            cur.execute("SHOW DATABASES LIKE %s", (self.config["database"],))
+            if cur.fetchall():
+                return False
+            for stmt in _split_mysql_script(open(self.schema_path, encoding="utf-8").read()):
+                cur.execute(stmt)
+            con.commit()
+            return True
+        finally:
+            con.close()
+
+
+def _split_mysql_script(text):
+    delimiter, buf = ";", []
+    for line in text.splitlines():
+        if line.strip().upper().startswith("DELIMITER"):
+            delimiter = line.split()[1]
+            continue
+        buf.append(line)
+        if line.rstrip().endswith(delimiter):
+            stmt = "\n".join(buf).rstrip()[:-len(delimiter)].strip()
+            buf = []
+            if stmt and not all(l.strip().startswith("--") or not l.strip() for l in stmt.splitlines()):
+                yield stmt
+
+
+_WRITE_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.I)
+
+
+@lru_cache(maxsize=1024)
+def _sqlite_sql(sql):
+    # -> (sqlite sql, needs write lock)
+    locking = bool(_FOR_UPDATE_RE.search(sql)) or bool(_WRITE_RE.match(sql))
+    sql = _FOR_UPDATE_RE.sub("", sql).replace("%s", "?")
+    return sql, locking
+
+
+class SQLiteCursor:
+    def __init__(self, owner):
+        self._owner = owner
+        self._cur = owner.raw.cursor()
+
+    def execute(self, sql, params=()):
+        sql, locking = _sqlite_sql(sql)
+        if locking:
+            self._owner.begin()
+        self._cur.execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq):
+        sql, locking = _sqlite_sql(sql)
+        if locking:
+            self._owner.begin()
+        self._cur.executemany(sql, seq)
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._cur.fetchmany(size or self._cur.arraysize)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection that accepts the app's MySQL-flavoured SQL.
+
+    ``%s`` placeholders become ``?`` and ``FOR UPDATE`` is dropped. SQLite
+    has no row locks, so the first write or ``SELECT ... FOR UPDATE`` in a
+    transaction opens it with BEGIN IMMEDIATE (the database write lock),
+    which gives the same no-lost-update guarantee. Plain reads run in
+    autocommit mode and never block writers under WAL.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def begin(self):
+        if not self.raw.in_transaction:
+            self.raw.execute("BEGIN IMMEDIATE")
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def close(self):
+        self.raw.close()
+
+
+_ADD_COLUMN_RE = re.compile(r"^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)", re.I | re.M)
+
+
+def _sql_statements(script):
+    # split a script for execute(); complete_statement knows about trigger bodies and comments
+    sql = ""
+    for line in script.splitlines(keepends=True):
+        sql += line
+        if sqlite3.complete_statement(sql):
+            yield sql
+            sql = ""
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    paramstyle = "format"     # accepts the same %s SQL as MySQL; translated per statement
+    schema_path = os.path.join(_HERE, "schema_sqlite.sql")
+    integrity_errors = (sqlite3.IntegrityError,)
+    # OperationalError also covers "database is locked", bad SQL and the like,
+    # which leave the connection fine; only these mean the handle is unusable
+    _DISCONNECT_MESSAGES = ("closed database", "disk i/o error", "unable to open database",
+                            "database disk image is malformed", "file is not a database")
+
+    def __init__(self, path=None):
+        if sqlite3.sqlite_version_info < SQLITE_MIN_VERSION:
+            raise RuntimeError(f"SQLite {'.'.join(map(str, SQLITE_MIN_VERSION))} or newer is needed; "
+                               f"this Python has {sqlite3.sqlite_version}")
+        self.path = path or SQLITE_PATH
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self):
+        uri = self.path.startswith("file:")
+        raw = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                              check_same_thread=False, uri=uri)
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._upgrade(raw)
+                    self._schema_ready = True
+        raw.execute("PRAGMA foreign_keys=ON")
+        return SQLiteConnection(raw)
+
+    def identity(self):
+        """Which database this is, for caches kept outside it."""
+        if self.path == ":memory:" or self.path.startswith("file:"):
+            return f"sqlite:{self.path}"
+        return f"sqlite:{os.path.realpath(self.path)}"
+
+    def is_disconnect(self, exc):
+        if not isinstance(exc, (sqlite3.OperationalError, sqlite3.ProgrammingError)):
+            return False
+        message = str(exc).lower()
+        return any(m in message for m in self._DISCONNECT_MESSAGES)
+
+    @staticmethod
+    def migrations():
+        """[(version, path)] of the SQLite migration scripts, in order."""
+        found = []
+        for name in os.listdir(SQLITE_MIGRATIONS):
+            m = re.match(r"(\d+)_.*\.sql$", name)
+            if m:
+                found.append((int(m.group(1)), os.path.join(SQLITE_MIGRATIONS, name)))
+        return sorted(found)
+
+    def _upgrade(self, raw):
+        # runs with foreign keys off: a migration may have to copy a table
+        migrations = self.migrations()
+        latest = migrations[-1][0] if migrations else SQLITE_BASE_VERSION
+        version = raw.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            if not raw.execute("SELECT 1 FROM sqlite_master WHERE name = 'flights'").fetchone():
+                script = open(self.schema_path, encoding="utf-8").read()
+                raw.executescript(f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {latest};\nCOMMIT;")
+                return
+            version = SQLITE_BASE_VERSION
+        for number, path in migrations:
+            if number > version:
+                self._migrate(raw, number, path)
+
+    @staticmethod
+    def _migrate(raw, number, path):
+        raw.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have got here first
+            if raw.execute("PRAGMA user_version").fetchone()[0] < number:
+                for sql in _sql_statements(open(path, encoding="utf-8").read()):
+                    # files from before versioning may already have the column
+                    m = _ADD_COLUMN_RE.search(sql)
+                    if m and any(col[1] == m.group(2) for col in raw.execute(f"PRAGMA table_info({m.group(1)})")):
+                        continue
+                    raw.execute(sql)
+                if raw.execute("PRAGMA foreign_key_check").fetchone():
+                    raise sqlite3.IntegrityError(f"{os.path.basename(path)} broke a foreign key")
+                raw.execute(f"PRAGMA user_version = {number}")
+            raw.execute("COMMIT")
+        except BaseException as e:
+            raw.execute("ROLLBACK")
+            if isinstance(e, sqlite3.Error):
+                raise sqlite3.DatabaseError(f"migration {os.path.basename(path)} failed: {e}") from e
+            raise
+
+    @staticmethod
+    def inserted_ids(cur, n):
+        # lastrowid is the last row of a multi-row INSERT; one writer at a time keeps them consecutive
+        return list(range(cur.lastrowid - n + 1, cur.lastrowid + 1))
+
+    def explain(self, cur, sql, params):
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+        steps = []
+        for row in cur.fetchall():
+            detail = row[-1]
+            words = detail.split()
+            table = words[1] if len(words) > 1 else ""
+            # "SCAN t" is a full table scan; "SCAN t USING INDEX" / "SEARCH t ..." are not
+            steps.append((table, detail, words[0] == "SCAN" and "USING" not in words))
+        return steps
+
+    def init_schema(self):
+        self.connect().close()
+        return True
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[DB_BACKEND]()
+    return _backend
+
+
+def set_backend(backend, **kwargs):
+    """Switch engine (``"mysql"``, ``"sqlite"`` or a backend object) and start a fresh pool."""
+    global _backend, _pool
+    _backend = BACKENDS[backend](**kwargs) if isinstance(backend, str) else backend
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+    return _backend
+
+
+# fn(connection) run on every new connection, e.g. session settings (see audit.AuditWriter)
+_connect_hooks = []
+
+
+def add_connect_hook(fn):
+    """Run fn on every connection opened from now on; pooled connections are reopened."""
+    _connect_hooks.append(fn)
+    set_backend(get_backend())
+
+
 def db_connect():
-    return mysql.connector.connect(**DB_CONFIG)
+    with metrics.span("db.connect"):
+        con = get_backend().connect()
+        for fn in _connect_hooks:
+            fn(con)
+    return instrument_connection(con)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect=db_connect, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_idle=HEALTH_CHECK_IDLE):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self._idle = []     # (connection, last_used), used as a stack: LIFO keeps hot connections warm
+        # guards _idle, _open and _closed; notified whenever a connection is returned or a slot frees up
+        self._cond = threading.Condition()
+        self._open = 0
+        self._closed = False
+        self.stats = {
+            "checkouts": 0,
+            "wait_time": 0.0,
+            "max_wait": 0.0,
+            "created": 0,
+            "reconnects": 0,
+            "discarded": 0,
+        }
+
+    # --- checkout / checkin ---
+    def acquire(self):
+        start = time.perf_counter()
+        con = self._take(start)
+        waited = time.perf_counter() - start
+        with self._cond:
+            self.stats["checkouts"] += 1
+            self.stats["wait_time"] += waited
+            self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+        return con
+
+    def _take(self, start):
+        while True:
+            with self._cond:
+                while True:
+                    if self._idle:
+                        con, last_used = self._idle.pop()
+                        break
+                    if self._open < self.size:
+                        # reserve the slot; connect outside the lock
+                        self._open += 1
+                        con = None
+                        break
+                    remaining = self.timeout - (time.perf_counter() - start)
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No database connection available after {self.timeout:.1f}s")
+                    # woken by release() or _discard(): look again for an idle connection or a free slot
+                    self._cond.wait(remaining)
+            if con is None:
+                return self._open_reserved()
+            if time.monotonic() - last_used < self.health_check_idle or self._healthy(con):
+                return con
+            # dead connection: drop it and loop round to reconnect
+            self._discard(con)
+            with self._cond:
+                self.stats["reconnects"] += 1
+
+    def _open_reserved(self):
+        try:
+            con = self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+        with self._cond:
+            self.stats["created"] += 1
+        return con
+
+    def _free_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _healthy(self, con):
+        try:
+            if hasattr(con, "ping"):
+                con.ping(reconnect=False)
+            else:
+                cur = con.cursor(); cur.execute("SELECT 1"); cur.fetchall(); cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, con):
+        try:
+            con.close()
+        except Exception:
+            pass
+        with self._cond:
+            self.stats["discarded"] += 1
+        self._free_slot()
+
+    def release(self, con, broken=False):
+        if broken:
+            self._discard(con)
+            return
+        try:
+            # never hand out a connection with a half-finished transaction
+            con.rollback()
+        except Exception:
+            self._discard(con)
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append((con, time.monotonic()))
+                self._cond.notify()
+                return
+        # checked out when the pool was closed (e.g. set_backend): nobody will take it again
+        self._discard(con)
+
+    @contextmanager
+    def connection(self):
+        con = self.acquire()
+        try:
+            yield con
+        except BaseException as e:
+            self.release(con, broken=get_backend().is_disconnect(e))
+            raise
+        else:
+            self.release(con)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for con, _ in idle:
+            self._discard(con)
+
+    def metrics(self):
+        with self._cond:
+            m = dict(self.stats)
+            m["open"] = self._open
+            m["idle"] = len(self._idle)
+        m["avg_wait"] = m["wait_time"] / m["checkouts"] if m["checkouts"] else 0.0
+        return m
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_connection():
+    """Check out a pooled connection: ``with get_connection() as con: ...``"""
+    return get_pool().connection()
+
+
+def pool_metrics():
+    return get_pool().metrics()
+
+
+def fetch_columns(cur, sql, params, columns):
+    """Run ``sql`` and return {name: 1-D array} for ``columns``, a list of (name, dtype)."""
+    import numpy as np    # only the report and snapshot code paths need it
+    cur.execute(sql, params)
+    parts = {name: [] for name, _ in columns}
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        for (name, dtype), values in zip(columns, zip(*rows)):
+            parts[name].append(np.array(values, dtype=dtype))
+    return {name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype) for name, dtype in columns}
@@ -0,0 +1,159 @@
+# db_worker.py
+import itertools
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QRunnable, QThreadPool, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QLabel, QProgressBar
+
+from db_utils import POOL_SIZE
+from instrumentation import metrics
+
+_thread_pool = None
+
+
+def thread_pool():
+    # one pool for the whole app, no wider than the DB connection pool
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        _thread_pool.setMaxThreadCount(POOL_SIZE)
+    return _thread_pool
+
+
+class _TaskSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+
+class DbTask(QRunnable):
+    def __init__(self, task_id, fn, args, kwargs):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = _TaskSignals()
+        self.queued = time.perf_counter()
+
+    def run(self):
+        # time spent waiting for a pool thread: the first suspect when the UI feels stuck
+        metrics.record_span("executor.queue_wait", time.perf_counter() - self.queued)
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.task_id, e)
+        else:
+            self.signals.finished.emit(self.task_id, result)
+
+
+class DbExecutor(QObject):
+    """Runs DB callables on the shared thread pool and hands results back on the GUI thread.
+
+    Tasks submitted under a ``key`` supersede earlier tasks with the same key:
+    a superseded task is pulled from the queue if it has not started yet, and
+    its result is dropped if it has.
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    _ids = itertools.count(1)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = {}      # task_id -> (task, on_done, on_error, key)
+        self._latest = {}     # key -> task_id
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        if key is not None:
+            self.cancel(key)
+        task_id = next(self._ids)
+        task = DbTask(task_id, fn, args, kwargs)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        was_idle = not self._tasks
+        self._tasks[task_id] = (task, on_done, on_error, key)
+        if key is not None:
+            self._latest[key] = task_id
+        thread_pool().start(task)
+        if was_idle:
+            self.busy_changed.emit(True)
+        return task_id
+
+    def cancel(self, key):
+        task_id = self._latest.pop(key, None)
+        if task_id is None or task_id not in self._tasks:
+            return
+        task = self._tasks[task_id][0]
+        if thread_pool().tryTake(task):
+            self._finish(task_id)
+        else:
+            # already running: let it complete but forget its callbacks
+            t, _, _, k = self._tasks[task_id]
+            self._tasks[task_id] = (t, None, None, k)
+
+    def is_busy(self):
+        return bool(self._tasks)
+
+    def _finish(self, task_id):
+        entry = self._tasks.pop(task_id, None)
+        if entry is not None and entry[3] is not None and self._latest.get(entry[3]) == task_id:
+            del self._latest[entry[3]]
+        if not self._tasks:
+            self.busy_changed.emit(False)
+        return entry
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, task_id, result):
+        entry = self._finish(task_id)
+        if entry and entry[1]:
+            entry[1](result)
+
+    @pyqtSlot(int, object)
+    def _on_failed(self, task_id, error):
+        entry = self._finish(task_id)
+        if entry and entry[2]:
+            entry[2](error)
+
+
+class BusyIndicator(QProgressBar):
+    # thin indeterminate bar that is only visible while any of the executors has work in flight
+    def __init__(self, *executors, parent=None):
+        super().__init__(parent)
+        self._executors = executors
+        self.setRange(0, 0)
+        self.setTextVisible(False)
+        self.setFixedHeight(6)
+        self.setStyleSheet("QProgressBar { border: none; background: transparent; }"
+                           "QProgressBar::chunk { background-color: #1976d2; }")
+        for executor in executors:
+            executor.busy_changed.connect(self._update)
+        self._update()
+
+    def _update(self, *_):
+        self.setVisible(any(e.is_busy() for e in self._executors))
+
+
+class LoadingPlaceholder(QLabel):
+    # "Loading…" over a table view's viewport until its model's first page arrives,
+    # so a window can be shown straight away and fill in as rows stream in
+    def __init__(self, view, model, text="Loading…"):
+        super().__init__(text, view.viewport())
+        self._model = model
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("color:#90a4ae; font-size:14px; background: transparent;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        view.viewport().installEventFilter(self)
+        self.resize(view.viewport().size())
+        model.first_page_loaded.connect(self.hide)
+        model.load_failed.connect(self.hide)
+        model.modelReset.connect(self._update)
+        self._update()
+
+    def _update(self):
+        self.setVisible(self._model.is_loading())
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Resize:
+            self.resize(event.size())
+        return False
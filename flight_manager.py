@@ -1,12 +1,17 @@
 # flight_manager.py
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QGroupBox,
-    QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QMessageBox,
-    QHeaderView, QDateTimeEdit, QLabel
+    QLineEdit, QPushButton, QTableView, QAbstractItemView, QMessageBox,
+    QHeaderView, QDateTimeEdit, QDateEdit, QSpinBox, QLabel, QInputDialog
 )
-from PyQt5.QtCore import Qt, QDateTime
+from PyQt5.QtCore import Qt, QDateTime, QDate
 from PyQt5.QtGui import QPalette, QColor, QFont
-from db_utils import db_connect
+from db_worker import DbExecutor, BusyIndicator, LoadingPlaceholder
+from data_store import get_store
+from table_model import ListTableModel
+from services import DeletionService, FlightService, ServiceError, validate_flight
+from flight_search import get_search
+from instrumentation import span
 
 
 BTN_CSS = """
@@ -50,6 +55,13 @@ class FlightManager(QWidget):
         title.setStyleSheet("color:#0d47a1;")
         root.addWidget(title, alignment=Qt.AlignLeft)
 
+        # DB work runs on the worker pool; the bar shows while anything is in flight
+        self.executor = DbExecutor(self)
+        self.service = FlightService()
+        self.deletion = DeletionService()
+        self.store = get_store()
+        root.addWidget(BusyIndicator(self.executor, self.store.executor))
+
         # --- Form Card ---
         form_card = QGroupBox("Add Flight")
         form_card.setStyleSheet(CARD_CSS)
@@ -80,28 +92,60 @@ class FlightManager(QWidget):
         btn_row = QHBoxLayout()
         add_btn = QPushButton("Add Flight"); add_btn.setStyleSheet(BTN_CSS)
         del_btn = QPushButton("Delete Selected"); del_btn.setStyleSheet(BTN_CSS)
-        btn_row.addWidget(add_btn); btn_row.addWidget(del_btn)
+        overbook_btn = QPushButton("Set Overbooking"); overbook_btn.setStyleSheet(BTN_CSS)
+        btn_row.addWidget(add_btn); btn_row.addWidget(del_btn); btn_row.addWidget(overbook_btn)
         form_layout.addRow(btn_row)
 
         form_card.setLayout(form_layout)
-        root.addWidget(form_card)
+
+        # --- Search Card ---
+        search_card = QGroupBox("Search Flights")
+        search_card.setStyleSheet(CARD_CSS)
+        search_layout = QFormLayout()
+        search_layout.setLabelAlignment(Qt.AlignRight)
+
+        self.search_source = QLineEdit(); self.search_source.setPlaceholderText("e.g., Kathmandu")
+        self.search_destination = QLineEdit(); self.search_destination.setPlaceholderText("e.g., Delhi")
+        self.search_date = QDateEdit(QDate.currentDate())
+        self.search_date.setDisplayFormat("yyyy-MM-dd")
+        self.search_date.setCalendarPopup(True)
+        self.search_seats = QSpinBox(); self.search_seats.setRange(1, 999); self.search_seats.setValue(1)
+
+        search_layout.addRow("From", self.search_source)
+        search_layout.addRow("To", self.search_destination)
+        search_layout.addRow("Date", self.search_date)
+        search_layout.addRow("Min Seats", self.search_seats)
+
+        search_btn_row = QHBoxLayout()
+        search_btn = QPushButton("Search"); search_btn.setStyleSheet(BTN_CSS)
+        show_all_btn = QPushButton("Show All"); show_all_btn.setStyleSheet(BTN_CSS)
+        search_btn_row.addWidget(search_btn); search_btn_row.addWidget(show_all_btn)
+        search_layout.addRow(search_btn_row)
+        search_card.setLayout(search_layout)
+
+        cards = QHBoxLayout()
+        cards.setSpacing(14)
+        cards.addWidget(form_card, stretch=3)
+        cards.addWidget(search_card, stretch=2)
+        root.addLayout(cards)
 
         # --- Table Card ---
         table_card = QGroupBox("Flights List")
         table_card.setStyleSheet(CARD_CSS)
         table_layout = QVBoxLayout()
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(
-            ["ID", "Flight#", "Source", "Destination", "Departure", "Arrival", "Seats"]
-        )
+        self.model = self.store.model("flights")
+        self.search = get_search()
+        self.search_model = ListTableModel(self.model.headers)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setAlternatingRowColors(True)
         header: QHeaderView = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.Interactive)
         header.setStretchLastSection(True)
-        self.table.setSelectionBehavior(self.table.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
         table_layout.addWidget(self.table)
         table_card.setLayout(table_layout)
@@ -112,21 +156,63 @@ class FlightManager(QWidget):
         # signals
         add_btn.clicked.connect(self.add_flight)
         del_btn.clicked.connect(self.delete_flight)
-
-        self.load_flights()
+        overbook_btn.clicked.connect(self.set_overbook)
+        search_btn.clicked.connect(self.search_flights)
+        show_all_btn.clicked.connect(self.show_all_flights)
+        self.search_source.returnPressed.connect(self.search_flights)
+        self.search_destination.returnPressed.connect(self.search_flights)
+        self.model.first_page_loaded.connect(self.table.resizeColumnsToContents)
+        self.loading = LoadingPlaceholder(self.table, self.model)
+        self.store.changed.connect(self._store_changed)
+        if hasattr(self.model, "updated"):
+            # snapshot-backed: searches read the snapshot, so re-ask once a newer one is showing
+            self.model.updated.connect(self._snapshot_updated)
+        self.model.load_failed.connect(self._show_error)
+        if self.model.rowCount():
+            # shared model already loaded by an earlier window: nothing to fetch
+            self.table.resizeColumnsToContents()
 
     def load_flights(self):
-        self.table.setRowCount(0)
-        con = db_connect()
-        cur = con.cursor()
-        cur.execute("SELECT * FROM flights ORDER BY flight_id DESC")
-        rows = cur.fetchall()
-        for r, row in enumerate(rows):
-            self.table.insertRow(r)
-            for c, val in enumerate(row):
-                self.table.setItem(r, c, QTableWidgetItem(str(val)))
-        con.close()
-        self.table.resizeColumnsToContents()
+        with span("flights.load"):
+            self.model.reset()
+
+    def search_flights(self):
+        src = self.search_source.text().strip()
+        dest = self.search_destination.text().strip()
+        if not (src and dest):
+            QMessageBox.warning(self, "Invalid Input", "Enter both source and destination.")
+            return
+        day = self.search_date.date().toString("yyyy-MM-dd")
+        seats = self.search_seats.value()
+        self._last_search = (src, dest, day, seats)
+        self.table.setModel(self.search_model)
+        self.loading.hide()
+        self._run_search(*self._last_search)
+
+    def _run_search(self, src, dest, day, seats):
+        rows = self.search.cached(src, dest, day, seats)
+        if rows is not None:
+            self.search_model.set_rows(rows)
+            return
+        self.executor.submit(self.search.search, src, dest, day, seats, key="search",
+                             on_done=self.search_model.set_rows, on_error=self._show_error)
+
+    def _store_changed(self, table, op, keys, version):
+        # the store patches self.model; search results are re-asked (the search cache was invalidated)
+        if table == "flights" and self.table.model() is self.search_model:
+            self._run_search(*self._last_search)
+
+    def _snapshot_updated(self):
+        if self.table.model() is self.search_model:
+            self._run_search(*self._last_search)
+
+    def show_all_flights(self):
+        self.executor.cancel("search")
+        self.table.setModel(self.model)
+        self.loading.setVisible(self.model.is_loading())
+
+    def _show_error(self, e):
+        QMessageBox.critical(self, "Error", str(e))
 
     def add_flight(self):
         try:
@@ -137,37 +223,66 @@ class FlightManager(QWidget):
             arr = self.arrival.dateTime().toString("yyyy-MM-dd HH:mm:ss")
             seats = self.seats.text().strip()
 
-            if not (fn and src and dest and seats.isdigit()):
-                QMessageBox.warning(self, "Invalid Input", "Please fill all fields correctly.")
+            try:
+                values = validate_flight(fn, src, dest, dep, arr, seats)
+            except ServiceError as e:
+                QMessageBox.warning(self, e.title, str(e))
                 return
 
-            con = db_connect()
-            cur = con.cursor()
-            cur.execute("""
-                INSERT INTO flights (flight_number, source, destination, departure_time, arrival_time, seats)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (fn, src, dest, dep, arr, int(seats)))
-            con.commit(); con.close()
-
-            self.flight_number.clear(); self.source.clear(); self.destination.clear(); self.seats.clear()
-            self.departure.setDateTime(QDateTime.currentDateTime())
-            self.arrival.setDateTime(QDateTime.currentDateTime().addSecs(3600))
-            self.load_flights()
-            QMessageBox.information(self, "Success", "Flight added.")
+            self.executor.submit(self.service.add, *values, on_done=self._flight_added, on_error=self._show_error)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def _flight_added(self, _):
+        self.flight_number.clear(); self.source.clear(); self.destination.clear(); self.seats.clear()
+        self.departure.setDateTime(QDateTime.currentDateTime())
+        self.arrival.setDateTime(QDateTime.currentDateTime().addSecs(3600))
+        # the row itself reaches every open view through the data store
+        QMessageBox.information(self, "Success", "Flight added.")
+
     def delete_flight(self):
-        row = self.table.currentRow()
+        view_model = self.table.model()
+        ids = sorted({view_model.row_key(i.row()) for i in self.table.selectionModel().selectedRows()})
+        if not ids:
+            QMessageBox.warning(self, "No Selection", "Select one or more flight rows to delete.")
+            return
+        # count the bookings that go with them before asking
+        self.executor.submit(self.deletion.impact, "flights", ids, key="delete",
+                             on_done=lambda impact: self._confirm_delete(ids, impact), on_error=self._show_error)
+
+    def _confirm_delete(self, ids, impact):
+        if not impact.found:
+            QMessageBox.information(self, "Deleted", "The selected flights were already deleted.")
+            return
+        text = f"Delete {impact.found} flight(s)?"
+        if impact.confirmed or impact.cancelled:
+            text += (f"\n\n{impact.confirmed} confirmed booking(s) will be cancelled, and all "
+                     f"{impact.confirmed + impact.cancelled} booking(s) moved to the archive.")
+        if QMessageBox.question(self, "Delete Flights", text) != QMessageBox.Yes:
+            return
+        self.executor.submit(self.deletion.delete, "flights", ids,
+                             on_done=self._flight_deleted, on_error=self._show_error)
+
+    def set_overbook(self, _=None):
+        row = self.table.currentIndex().row()
         if row < 0:
-            QMessageBox.warning(self, "No Selection", "Select a flight row to delete.")
+            QMessageBox.warning(self, "No Selection", "Select a flight row first.")
             return
-        flight_id = self.table.item(row, 0).text()
-        try:
-            con = db_connect(); cur = con.cursor()
-            cur.execute("DELETE FROM flights WHERE flight_id=%s", (flight_id,))
-            con.commit(); con.close()
-            self.load_flights()
-            QMessageBox.information(self, "Deleted", "Flight deleted.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        fid = self.table.model().row_key(row)
+        # at most the flight's seat count; the service says so if the number is too high
+        allowance, ok = QInputDialog.getInt(
+            self, "Set Overbooking", f"Bookings flight {fid} may sell beyond its seats:", 0, 0, 10000)
+        if ok:
+            self.executor.submit(self.service.set_overbook, fid, allowance,
+                                 on_done=lambda promoted: self._overbook_set(fid, allowance, promoted),
+                                 on_error=self._show_error)
+
+    def _overbook_set(self, fid, allowance, promoted):
+        text = f"Flight {fid} may now sell {allowance} booking(s) beyond its seats."
+        if promoted:
+            text += f"\n\n{len(promoted)} waitlisted passenger(s) were booked."
+        QMessageBox.information(self, "Overbooking", text)
+
+    def _flight_deleted(self, result):
+        QMessageBox.information(self, "Deleted", f"{result.deleted} flight(s) deleted, "
+                                                 f"{result.cancelled} booking(s) cancelled.")
@@ -0,0 +1,143 @@
+# flight_search.py
+import threading
+import time
+from collections import OrderedDict
+
+import flight_snapshot
+from services import FlightService, add_change_listener
+
+CACHE_SIZE = 256       # route/date entries
+CACHE_TTL = 60.0       # seconds; bookings made by other clients show up after this at the latest
+
+SEATS_COL = 6          # positions in FlightService.search rows
+BOOKED_COL = 7
+OVERBOOK_COL = 8
+
+
+def _sellable(rows, min_seats):
+    return [r for r in rows if r[SEATS_COL] + r[OVERBOOK_COL] - r[BOOKED_COL] >= min_seats]
+
+
+class SearchCache:
+    """LRU + TTL cache of route/date results, indexed by flight id for invalidation.
+
+    ``generation`` goes up on every invalidation; a caller reads it before
+    querying and hands it to ``put`` so a result that raced an invalidation
+    is dropped instead of cached.
+    """
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()   # key -> (expires_at, rows)
+        self._by_flight = {}            # flight_id -> set of keys holding it
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < self.clock():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, rows, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return      # invalidated while the rows were being read; they may be stale
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl, rows)
+            for row in rows:
+                self._by_flight.setdefault(row[0], set()).add(key)
+            while len(self._entries) > self.size:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, rows = self._entries.pop(key)
+        for row in rows:
+            keys = self._by_flight.get(row[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_flight[row[0]]
+
+    def invalidate_flights(self, flight_ids):
+        with self._lock:
+            self.generation += 1
+            for fid in flight_ids:
+                for key in list(self._by_flight.get(fid, ())):
+                    if key in self._entries:
+                        self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_flight.clear()
+
+
+class FlightSearch:
+    """Route/date search over FlightService.search with cached availability.
+
+    One cache entry holds every flight on a route and day; the min-seats
+    filter is applied in memory, so asking again with a different seat count
+    does not go back to the DB. Once the GUI has published a flight snapshot
+    (see flight_snapshot.py) searches are answered from it instead, without
+    the DB.
+    """
+
+    def __init__(self, service=None, cache=None):
+        self.service = service or FlightService()
+        self.cache = cache or SearchCache()
+        add_change_listener(self._on_change)
+
+    @staticmethod
+    def _key(source, destination, day):
+        return source.strip().casefold(), destination.strip().casefold(), str(day)[:10]
+
+    def cached(self, source, destination, day, min_seats=1):
+        """Return the cached answer, or None if the DB has to be asked."""
+        snapshot = flight_snapshot.current()
+        if snapshot is not None:
+            return snapshot.search(source, destination, day, min_seats)
+        rows = self.cache.get(self._key(source, destination, day))
+        if rows is None:
+            return None
+        return _sellable(rows, min_seats)
+
+    def search(self, source, destination, day, min_seats=1):
+        rows = self.cached(source, destination, day, min_seats)
+        if rows is not None:
+            return rows
+        generation = self.cache.generation
+        rows = self.service.search(source, destination, day, min_seats=0)
+        self.cache.put(self._key(source, destination, day), rows, generation)
+        return _sellable(rows, min_seats)
+
+    def _on_change(self, table, op, keys):
+        if table != "flights":
+            return
+        if op == "insert":
+            # a new flight can land on any cached route/day
+            self.cache.clear()
+        else:
+            self.cache.invalidate_flights(keys)
+
+
+_search = None
+
+
+def get_search():
+    global _search
+    if _search is None:
+        _search = FlightSearch()
+    return _search
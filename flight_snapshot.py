@@ -0,0 +1,348 @@
+# flight_snapshot.py
+# The flights table as a columnar snapshot: one fixed-width array per column
+# (ids, times, seat counts) and an interned string table for flight numbers
+# and airports, so a few hundred thousand flights cost ~40 bytes each instead
+# of a tuple of Python objects per row.
+#
+# The snapshot is written to disk and memory-mapped on the next start; column
+# arrays are views straight into the mapping, so opening it reads nothing but
+# the string table. It is brought up to date incrementally: one scan of
+# (flight_id, seats_booked, overbook) finds added, deleted and re-counted
+# flights, and only added flights are read in full.
+#
+#   python flight_snapshot.py            # refresh (or build) the snapshot and save it
+#   python flight_snapshot.py --rebuild  # rebuild it from the flights table
+#
+# Snapshots are immutable: patched() and refreshed() return a new snapshot
+# sharing every column that did not change, so a worker thread can prepare the
+# next one while the GUI keeps reading the current one.
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from db_utils import fetch_columns, get_backend, get_connection
+from instrumentation import timed
+
+MAGIC = b"FLSNAP3\0"                 # 2: added the overbook column; 3: database identity
+HEADER = struct.Struct("<8sQQQ16s")  # magic, rows, strings, string blob bytes, database identity
+KEY_BATCH = 500                      # flight ids per IN (...) when reading rows by key
+
+COLUMNS = ["flight_id", "flight_number", "source", "destination", "departure_time", "arrival_time",
+           "seats", "seats_booked", "overbook"]
+DTYPES = {"flight_id": "<i8", "flight_number": "<u4", "source": "<u4", "destination": "<u4",
+          "departure_time": "<M8[s]", "arrival_time": "<M8[s]", "seats": "<i4", "seats_booked": "<i4",
+          "overbook": "<i4"}
+COUNT_COLUMNS = ("seats_booked", "overbook")    # what changes on a flight after it is added
+STRING_COLUMNS = ("flight_number", "source", "destination")     # hold indexes into the string table
+TIME_COLUMNS = ("departure_time", "arrival_time")
+
+log = logging.getLogger(__name__)
+
+
+def snapshot_path():
+    """Where the snapshot lives: AIRLINE_SNAPSHOT_PATH, else next to the SQLite file, else flights.snap."""
+    path = os.environ.get("AIRLINE_SNAPSHOT_PATH")
+    if path:
+        return path
+    db = getattr(get_backend(), "path", None)
+    if db and db != ":memory:" and not db.startswith("file:"):
+        return db + ".snap"
+    return "flights.snap"
+
+
+def _database_id():
+    # a snapshot of another database (copied, or left behind by a backend switch)
+    # must be rebuilt, not caught up: flight ids would match rows they never were
+    return hashlib.blake2b(get_backend().identity().encode(), digest_size=16).digest()
+
+
+def _pad(n):
+    return -n % 8
+
+
+def _times(values):
+    # MySQL returns datetimes, SQLite 'YYYY-MM-DD HH:MM:SS' text; NULL becomes NaT
+    return np.array([v if v is None or isinstance(v, datetime) else str(v).replace(" ", "T", 1)
+                     for v in values], dtype="datetime64[s]")
+
+
+class FlightSnapshot:
+    def __init__(self, columns, strings, source=None):
+        self.columns = columns    # name -> 1-D array, every one in flight_id order
+        self.strings = strings    # string table; string columns hold indexes into it
+        self._source = source     # the mmap the arrays view, kept open as long as they are
+        self._index = None        # string -> index, built when rows are added
+        self._folded = None       # casefolded string -> indexes, built by the first search
+
+    def __len__(self):
+        return len(self.columns["flight_id"])
+
+    @property
+    def ids(self):
+        return self.columns["flight_id"]
+
+    # --- building ---
+    @classmethod
+    def empty(cls):
+        return cls({c: np.empty(0, DTYPES[c]) for c in COLUMNS}, [])
+
+    def _string_index(self):
+        if self._index is None:
+            self._index = {s: i for i, s in enumerate(self.strings)}
+        return self._index
+
+    def _encode(self, rows):
+        # rows in COLUMNS order -> ({column: array}, strings); new strings are appended
+        strings = list(self.strings)
+        index = dict(self._string_index())
+        cols = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+        out = {}
+        for name, values in zip(COLUMNS, cols):
+            if name in STRING_COLUMNS:
+                ids = []
+                for v in values:
+                    v = "" if v is None else str(v)
+                    i = index.get(v)
+                    if i is None:
+                        i = index[v] = len(strings)
+                        strings.append(v)
+                    ids.append(i)
+                out[name] = np.array(ids, DTYPES[name])
+            elif name in TIME_COLUMNS:
+                out[name] = _times(values)
+            else:
+                out[name] = np.array([v or 0 for v in values], DTYPES[name])
+        return out, strings, index
+
+    def _with(self, columns, strings=None, index=None):
+        snap = FlightSnapshot(columns, self.strings if strings is None else strings, self._source)
+        snap._index = self._index if index is None else index
+        if strings is None:
+            snap._folded = self._folded
+        return snap
+
+    @classmethod
+    @timed("snapshot.build")
+    def from_db(cls, connection=get_connection):
+        """Read the whole flights table; rows are interned a fetchmany chunk at a time."""
+        snap = cls.empty()
+        parts = {c: [] for c in COLUMNS}
+        with connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {', '.join(COLUMNS)} FROM flights ORDER BY flight_id")
+            while True:
+                rows = cur.fetchmany(KEY_BATCH * 20)
+                if not rows:
+                    break
+                cols, snap.strings, snap._index = snap._encode(rows)
+                for c in COLUMNS:
+                    parts[c].append(cols[c])
+        snap.columns = {c: np.concatenate(parts[c]) if parts[c] else np.empty(0, DTYPES[c]) for c in COLUMNS}
+        return snap
+
+    # --- reading ---
+    def find(self, flight_id):
+        """Position of ``flight_id``, or None."""
+        pos = int(np.searchsorted(self.ids, flight_id))
+        return pos if pos < len(self) and self.ids[pos] == flight_id else None
+
+    def value(self, pos, column):
+        v = self.columns[column][pos]
+        if column in STRING_COLUMNS:
+            return self.strings[v]
+        if column in TIME_COLUMNS:
+            return "" if np.isnat(v) else str(v).replace("T", " ")
+        return int(v)
+
+    def row(self, pos):
+        """One flight as a tuple in COLUMNS order (the row shape FlightService.search returns)."""
+        return tuple(self.value(pos, c) for c in COLUMNS)
+
+    def _matching(self, text):
+        # airport string-table indexes equal to text, ignoring case like the DB collations do
+        if self._folded is None:
+            folded = {}
+            airports = np.union1d(self.columns["source"], self.columns["destination"])
+            for i in airports.tolist():
+                folded.setdefault(self.strings[i].casefold(), []).append(i)
+            self._folded = folded
+        return self._folded.get(str(text).strip().casefold(), [])
+
+    @timed("snapshot.search")
+    def search(self, source, destination, day, min_seats=1):
+        """FlightService.search answered from the snapshot."""
+        start = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+        lo, hi = np.datetime64(start, "s"), np.datetime64(start + timedelta(days=1), "s")
+        c = self.columns
+        dep = c["departure_time"]
+        mask = ((dep >= lo) & (dep < hi)
+                & np.isin(c["source"], self._matching(source))
+                & np.isin(c["destination"], self._matching(destination))
+                & (c["seats"] + c["overbook"] - c["seats_booked"] >= min_seats))
+        hits = np.flatnonzero(mask)
+        hits = hits[np.argsort(dep[hits], kind="stable")]
+        return [self.row(int(p)) for p in hits]
+
+    # --- updating ---
+    def patched(self, rows, removed=()):
+        """A new snapshot with ``rows`` (full flights rows) upserted and ``removed`` ids dropped."""
+        ids = self.ids
+        keys = np.array([r[0] for r in rows], "<i8")
+        removed = np.array(sorted(set(removed) - set(keys.tolist())), "<i8")
+        pos = np.searchsorted(ids, keys)
+        known = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == keys) if len(ids) else keys < 0
+        new, strings, index = self._encode(rows)
+        if known.all() and not len(removed):
+            # the usual case, a seat count changed: copy only the columns that differ
+            columns = dict(self.columns)
+            for c in COLUMNS:
+                if not np.array_equal(columns[c][pos], new[c]):
+                    columns[c] = columns[c].copy()
+                    columns[c][pos] = new[c]
+            return self._with(columns, strings, index)
+        keep = ~np.isin(ids, np.concatenate((keys, removed)))
+        order = np.argsort(np.concatenate((ids[keep], keys)), kind="stable")
+        columns = {c: np.concatenate((self.columns[c][keep], new[c]))[order] for c in COLUMNS}
+        return self._with(columns, strings, index)
+
+    @timed("snapshot.refresh")
+    def refreshed(self, connection=get_connection):
+        """Catch up with the flights table; returns (snapshot, changed).
+
+        Flights are only ever added, deleted, re-counted by bookings or given
+        an overbooking allowance, so one pass over (flight_id, seats_booked,
+        overbook) finds every difference.
+        """
+        with connection() as con:
+            cur = con.cursor()
+            db = fetch_columns(cur, f"SELECT flight_id, {', '.join(COUNT_COLUMNS)} FROM flights "
+                                    f"ORDER BY flight_id", (),
+                               [("flight_id", "<i8")] + [(c, DTYPES[c]) for c in COUNT_COLUMNS])
+            db_ids = db["flight_id"]
+            present = np.isin(self.ids, db_ids)
+            added = db_ids[~np.isin(db_ids, self.ids)]
+            rows = []
+            for i in range(0, len(added), KEY_BATCH):
+                chunk = added[i:i + KEY_BATCH].tolist()
+                cur.execute(f"SELECT {', '.join(COLUMNS)} FROM flights "
+                            f"WHERE flight_id IN ({', '.join(['%s'] * len(chunk))})", tuple(chunk))
+                rows += cur.fetchall()
+        snap = self
+        if not present.all():
+            snap = self._with({c: a[present] for c, a in self.columns.items()})
+        # both sides in id order: compare the counts of flights on both sides
+        common = np.isin(db_ids, snap.ids)
+        columns = dict(snap.columns)
+        for c in COUNT_COLUMNS:
+            if not np.array_equal(columns[c], db[c][common]):
+                columns[c] = db[c][common].astype(DTYPES[c])
+        if any(columns[c] is not snap.columns[c] for c in COUNT_COLUMNS):
+            snap = snap._with(columns)
+        if rows:
+            snap = snap.patched(rows)
+        return snap, snap is not self
+
+    # --- on disk ---
+    @timed("snapshot.save")
+    def save(self, path=None):
+        """Write the snapshot to ``path`` atomically (a reader never sees half a file)."""
+        path = path or snapshot_path()
+        blob = "\0".join(self.strings).encode()
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"     # workers may save at once
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self), len(self.strings), len(blob), _database_id()))
+            for c in COLUMNS:
+                data = np.ascontiguousarray(self.columns[c], DTYPES[c]).tobytes()
+                f.write(data + b"\0" * _pad(len(data)))
+            f.write(blob)
+        try:
+            os.replace(tmp, path)
+        except PermissionError:
+            # Windows will not replace a file that is still mapped; the next start catches up instead
+            os.remove(tmp)
+            log.warning("flight snapshot %s is in use; not saved", path)
+            return None
+        return path
+
+    @classmethod
+    @timed("snapshot.load")
+    def load(cls, path=None):
+        """Memory-map a saved snapshot; None if there is none, it is not a snapshot or it is another database's."""
+        path = path or snapshot_path()
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):     # missing, unreadable or empty
+            return None
+        columns = {}
+        try:
+            magic, rows, n_strings, blob_len, database = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError("not a flight snapshot")
+            if database != _database_id():
+                log.info("flight snapshot %s is of another database; rebuilding", path)
+                raise ValueError("snapshot of another database")
+            offset = HEADER.size
+            for c in COLUMNS:
+                columns[c] = np.frombuffer(mm, DTYPES[c], count=rows, offset=offset)
+                offset += columns[c].nbytes + _pad(columns[c].nbytes)
+            if offset + blob_len != len(mm):
+                raise ValueError("truncated flight snapshot")
+            strings = mm[offset:offset + blob_len].decode().split("\0") if n_strings else []
+        except (struct.error, ValueError, UnicodeDecodeError):
+            columns.clear()     # views into the mapping must go before it can close
+            mm.close()
+            return None
+        return cls(columns, strings, mm)
+
+
+# --- the snapshot searches read (published by the flights table model) ---
+_current = None
+
+
+def current():
+    return _current
+
+
+def publish(snapshot):
+    global _current
+    _current = snapshot
+
+
+def open_snapshot(path=None, connection=get_connection):
+    """Map the saved snapshot (building one if there is none), catch it up and save it if it changed."""
+    snap = FlightSnapshot.load(path)
+    if snap is None:
+        snap, changed = FlightSnapshot.from_db(connection), True
+    else:
+        snap, changed = snap.refreshed(connection)
+    if changed:
+        snap.save(path)
+    return snap
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build or refresh the on-disk flight snapshot.")
+    ap.add_argument("--path", help="snapshot file (default: next to the SQLite file, or flights.snap)")
+    ap.add_argument("--rebuild", action="store_true", help="read the whole flights table again")
+    args = ap.parse_args(argv)
+    t = time.perf_counter()
+    if args.rebuild:
+        snap = FlightSnapshot.from_db()
+        snap.save(args.path)
+    else:
+        snap = open_snapshot(args.path)
+    print(f"{len(snap)} flights, {len(snap.strings)} distinct strings in {args.path or snapshot_path()} "
+          f"({(time.perf_counter() - t) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# instrumentation.py
+# Lightweight timing for the DB hot path: per-statement latency histograms and
+# row counts, named spans for handler code, and a slow-statement log.
+#
+# db_utils.db_connect() wraps every connection it opens, so all SQL that goes
+# through the pool is measured. Handler code adds spans:
+#
+#   with span("flights.populate"):          # or @timed("bookings.book")
+#       ...
+#
+# metrics.snapshot() returns everything as plain dicts and export_metrics()
+# writes it to JSON.
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+log = logging.getLogger("airline.sql")
+
+ENABLED = os.environ.get("AIRLINE_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("AIRLINE_SLOW_QUERY_MS", "200"))
+MAX_STATEMENTS = 500   # distinct statement shapes kept; the rest are pooled under "<other>"
+
+# histogram bucket upper bounds, seconds (last bucket is open-ended)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WS_RE = re.compile(r"\s+")
+_IN_RE = re.compile(r"\bIN \(%s(?:\s*,\s*%s)*\)", re.I)     # IN (%s, %s, ...) of any length
+_VALUES_RE = re.compile(r"(\(%s[^()]*\))(?:\s*,\s*\(%s[^()]*\))+")   # multi-row VALUES
+
+
+@lru_cache(maxsize=2048)
+def statement_key(sql):
+    """Collapse whitespace and variable-length placeholder lists so one query shape is one key."""
+    sql = _WS_RE.sub(" ", sql).strip()
+    sql = _VALUES_RE.sub(r"\1, …", sql)
+    return _IN_RE.sub("IN (%s, …)", sql)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        # upper bound of the bucket holding the p-th sample (max for the open bucket)
+        if not self.count:
+            return 0.0
+        target = p * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets_ms": {("inf" if i == len(BUCKETS) else f"{BUCKETS[i] * 1000:g}"): n
+                           for i, n in enumerate(self.counts) if n},
+        }
+
+
+class _Statement:
+    __slots__ = ("execute", "fetch", "rows", "slow")
+
+    def __init__(self):
+        self.execute = Histogram()
+        self.fetch = Histogram()
+        self.rows = 0
+        self.slow = 0
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._statements = {}
+            self._spans = {}
+            self._sql = Histogram()   # every execute + fetch, for the headline numbers
+            self.slow = 0
+
+    # --- recording ---
+    def _statement(self, key):
+        st = self._statements.get(key)
+        if st is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                key = "<other>"
+                st = self._statements.get(key)
+            if st is None:
+                st = self._statements[key] = _Statement()
+        return st
+
+    def record_sql(self, sql, phase, seconds, rows=0):
+        key = statement_key(sql)
+        slow = seconds * 1000 >= self.slow_query_ms
+        with self._lock:
+            st = self._statement(key)
+            (st.execute if phase == "execute" else st.fetch).add(seconds)
+            st.rows += rows
+            self._sql.add(seconds)
+            if slow:
+                st.slow += 1
+                self.slow += 1
+        if slow:
+            log.warning("slow %s (%.1f ms, %d rows): %s", phase, seconds * 1000, rows, key)
+
+    def record_span(self, name, seconds):
+        with self._lock:
+            h = self._spans.get(name)
+            if h is None:
+                h = self._spans[name] = Histogram()
+            h.add(seconds)
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - start)
+
+    # --- reading ---
+    def summary(self):
+        """One line for a status bar."""
+        with self._lock:
+            h = self._sql
+            if not h.count:
+                return "SQL: no statements yet"
+            return (f"SQL: {h.count} calls · p50 {h.percentile(0.5) * 1000:.1f} ms · "
+                    f"p99 {h.percentile(0.99) * 1000:.1f} ms · slow {self.slow}")
+
+    def snapshot(self, **extra):
+        with self._lock:
+            statements = {
+                key: {"execute": st.execute.as_dict(), "fetch": st.fetch.as_dict(),
+                      "rows": st.rows, "slow": st.slow}
+                for key, st in sorted(self._statements.items(),
+                                      key=lambda kv: -(kv[1].execute.total + kv[1].fetch.total))
+            }
+            data = {
+                "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "slow_query_ms": self.slow_query_ms,
+                "sql": self._sql.as_dict(),
+                "slow": self.slow,
+                "statements": statements,
+                "spans": {name: h.as_dict() for name, h in sorted(self._spans.items())},
+            }
+        data.update(extra)
+        return data
+
+
+metrics = Metrics()
+
+
+def span(name):
+    return metrics.span(name)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def export_metrics(path, **extra):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metrics.snapshot(**extra), f, indent=2)
+        f.write("\n")
+
+
+# --- DB-API wrappers ---
+class InstrumentedCursor:
+    def __init__(self, cur):
+        self._cur = cur
+        self._sql = None
+
+    def execute(self, sql, params=()):
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            self._cur.execute(sql, params)
+            return self
+        finally:
+            elapsed = time.perf_counter() - start
+            rc = self._cur.rowcount
+            metrics.record_sql(sql, "execute", elapsed, rc if rc and rc > 0 else 0)
+
+    def executemany(self, sql, seq):
+        seq = seq if isinstance(seq, (list, tuple)) else list(seq)
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            self._cur.executemany(sql, seq)
+            return self
+        finally:
+            metrics.record_sql(sql, "execute", time.perf_counter() - start, len(seq))
+
+    def _fetched(self, start, rows):
+        if self._sql is not None:
+            metrics.record_sql(self._sql, "fetch", time.perf_counter() - start, rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cur.fetchone()
+        self._fetched(start, 0 if row is None else 1)
+        return row
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cur.fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        rows = self._cur.fetchmany(*args)
+        self._fetched(start, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def __getattr__(self, name):
+        # description, rowcount, lastrowid, close, ...
+        return getattr(self._cur, name)
+
+
+class InstrumentedConnection:
+    def __init__(self, con):
+        self._con = con
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._con.cursor(*args, **kwargs))
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._con.commit()
+        finally:
+            metrics.record_sql("COMMIT", "execute", time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        # rollback, close, ping, ...
+        return getattr(self._con, name)
+
+
+def instrument_connection(con):
+    return InstrumentedConnection(con) if ENABLED else con
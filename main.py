@@ -1,21 +1,43 @@
 # main.py
+import time
+_T0 = time.perf_counter()      # startup clock; see MainWindow.startup_finished
+
 import sys
+import os
+import logging
+import importlib
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton,
-    QMessageBox, QMenuBar, QAction, QStatusBar
+    QMessageBox, QMenuBar, QAction, QStatusBar, QFileDialog, QInputDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
 from PyQt5.QtGui import QPalette, QColor, QFont
 
-from flight_manager import FlightManager
-from passenger_manager import PassengerManager
-from booking_manager import BookingManager
+from db_utils import pool_metrics
+from instrumentation import metrics, export_metrics, span
+
+METRICS_REFRESH_MS = 2000
+
+# Manager windows are imported on first use and then kept: reopening one just
+# raises it again, and its data comes from the shared data store.
+WINDOWS = {
+    "flights": ("flight_manager", "FlightManager"),
+    "passengers": ("passenger_manager", "PassengerManager"),
+    "bookings": ("booking_manager", "BookingManager"),
+    "reports": ("reports_window", "ReportsWindow"),
+}
+
+
+class _ProgressRelay(QObject):
+    # carries progress callbacks from the worker thread to the status bar
+    progress = pyqtSignal(str)
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Airline Management System")
+        self._windows = {}
         self.setGeometry(200, 100, 1100, 700)  # larger, widescreen-friendly
 
         # --- Light background for a cleaner look ---
@@ -63,7 +85,8 @@ class MainWindow(QMainWindow):
         flights_btn = QPushButton("🛫 Manage Flights")
         passengers_btn = QPushButton("👤 Manage Passengers")
         bookings_btn = QPushButton("📑 Manage Bookings")
-        for b in (flights_btn, passengers_btn, bookings_btn):
+        reports_btn = QPushButton("📊 Reports")
+        for b in (flights_btn, passengers_btn, bookings_btn, reports_btn):
             b.setStyleSheet(btn_css)
             b.setMinimumHeight(48)
             layout.addWidget(b, alignment=Qt.AlignCenter)
@@ -77,6 +100,7 @@ class MainWindow(QMainWindow):
         flights_btn.clicked.connect(self.open_flights)
         passengers_btn.clicked.connect(self.open_passengers)
         bookings_btn.clicked.connect(self.open_bookings)
+        reports_btn.clicked.connect(self.open_reports)
 
         # --- Simple menu bar ---
         self._build_menu()
@@ -85,12 +109,35 @@ class MainWindow(QMainWindow):
         sb = QStatusBar()
         sb.showMessage("Ready")
         self.setStatusBar(sb)
+        # permanent right-hand label: live SQL timings, left side stays free for messages
+        self.metrics_label = QLabel()
+        self.metrics_label.setStyleSheet("color:#607d8b;")
+        sb.addPermanentWidget(self.metrics_label)
+        self._metrics_timer = QTimer(self)
+        self._metrics_timer.timeout.connect(self.update_metrics)
+        self._metrics_timer.start(METRICS_REFRESH_MS)
+        self.update_metrics()
 
     def _build_menu(self):
         menubar: QMenuBar = self.menuBar()
         file_menu = menubar.addMenu("&File")
         help_menu = menubar.addMenu("&Help")
 
+        import_act = QAction("&Import…", self)
+        import_act.setShortcut("Ctrl+I")
+        import_act.triggered.connect(self.import_data)
+        file_menu.addAction(import_act)
+
+        export_act = QAction("&Export…", self)
+        export_act.setShortcut("Ctrl+E")
+        export_act.triggered.connect(self.export_data)
+        file_menu.addAction(export_act)
+
+        metrics_act = QAction("Export &Metrics…", self)
+        metrics_act.triggered.connect(self.export_metrics)
+        file_menu.addAction(metrics_act)
+        file_menu.addSeparator()
+
         exit_act = QAction("E&xit", self)
         exit_act.setShortcut("Ctrl+Q")
         exit_act.triggered.connect(self.close)
@@ -107,22 +154,125 @@ class MainWindow(QMainWindow):
             "Airline Management System\n\nPython (PyQt5) + MySQL demo UI\nManage flights, passengers, and bookings."
         )
 
+    # --- metrics ---
+    def update_metrics(self):
+        pool = pool_metrics()
+        self.metrics_label.setText(f"{metrics.summary()} · pool {pool['open'] - pool['idle']}/{pool['open']} busy")
+
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "metrics.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            export_metrics(path, pool=pool_metrics())
+        except OSError as e:
+            QMessageBox.critical(self, "Export Failed", str(e))
+            return
+        self.statusBar().showMessage(f"Metrics written to {path}", 5000)
+
+    # --- bulk import / export ---
+    def _bulk_executor(self):
+        if not hasattr(self, "_bulk"):
+            from db_worker import DbExecutor
+            self._bulk = DbExecutor(self)
+            self._relay = _ProgressRelay(self)
+            self._relay.progress.connect(self.statusBar().showMessage)
+        return self._bulk
+
+    def import_data(self):
+        import bulk_io
+        table, ok = QInputDialog.getItem(self, "Import", "Import into table:", sorted(bulk_io.TABLES), 0, False)
+        if not ok:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, f"Import {table}", "", "Data files (*.csv *.jsonl);;All files (*)")
+        if not path:
+            return
+        root, ext = os.path.splitext(path)
+        rejects = f"{root}.rejects{ext or '.csv'}"
+        executor = self._bulk_executor()
+        relay = self._relay
+
+        def progress(read, accepted, rejected):
+            relay.progress.emit(f"Importing {table}: read {read}, accepted {accepted}, rejected {rejected}")
+
+        def done(report):
+            msg = f"{report.accepted} of {report.read} {table} rows imported."
+            if report.rejected:
+                msg += f"\n{report.rejected} rejected rows were written to:\n{rejects}"
+            self.statusBar().showMessage("Ready")
+            QMessageBox.information(self, "Import Finished", msg)
+
+        executor.submit(bulk_io.import_file, table, path, bulk_io.CHUNK_SIZE, rejects, progress,
+                        on_done=done, on_error=lambda e: QMessageBox.critical(self, "Import Failed", str(e)))
+
+    def export_data(self):
+        import bulk_io
+        table, ok = QInputDialog.getItem(self, "Export", "Export table:", sorted(bulk_io.TABLES), 0, False)
+        if not ok:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, f"Export {table}", f"{table}.csv",
+                                              "CSV (*.csv);;JSON lines (*.jsonl)")
+        if not path:
+            return
+        executor = self._bulk_executor()
+        relay = self._relay
+
+        def done(n):
+            self.statusBar().showMessage("Ready")
+            QMessageBox.information(self, "Export Finished", f"{n} {table} rows written to\n{path}")
+
+        executor.submit(bulk_io.export_table, table, path, bulk_io.EXPORT_FETCH,
+                        lambda n: relay.progress.emit(f"Exporting {table}: {n} rows"),
+                        on_done=done, on_error=lambda e: QMessageBox.critical(self, "Export Failed", str(e)))
+
+    # --- manager windows ---
+    def open_window(self, name):
+        win = self._windows.get(name)
+        if win is None:
+            self.statusBar().showMessage(f"Opening {name}…")
+            module, cls = WINDOWS[name]
+            with span(f"window.{name}.create"):
+                win = self._windows[name] = getattr(importlib.import_module(module), cls)()
+            self.statusBar().showMessage("Ready")
+        if win.isMinimized():
+            win.showNormal()
+        win.show()
+        win.raise_()
+        win.activateWindow()
+        return win
+
     def open_flights(self):
-        self.fwin = FlightManager()
-        self.fwin.show()
+        return self.open_window("flights")
 
     def open_passengers(self):
-        self.pwin = PassengerManager()
-        self.pwin.show()
+        return self.open_window("passengers")
 
     def open_bookings(self):
-        self.bwin = BookingManager()
-        self.bwin.show()
+        return self.open_window("bookings")
+
+    def open_reports(self):
+        return self.open_window("reports")
+
+    def startup_finished(self, seconds):
+        metrics.record_span("app.startup", seconds)
+        logging.getLogger(__name__).info("startup to interactive main window: %.0f ms", seconds * 1000)
+        self.statusBar().showMessage(f"Ready · started in {seconds * 1000:.0f} ms", 10000)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
     app = QApplication(sys.argv)
+    if os.environ.get("AIRLINE_APP_AUDIT") == "1":
+        importlib.import_module("audit").get_writer()   # batched audit rows (audit.py)
     window = MainWindow()
     window.show()
+    # first event-loop turn after show(): the main window is on screen and interactive
+    if "--measure-startup" in sys.argv:
+        def report():
+            print(f"startup_ms={(time.perf_counter() - _T0) * 1000:.1f}", flush=True)
+            app.quit()
+        QTimer.singleShot(0, report)
+    else:
+        QTimer.singleShot(0, lambda: window.startup_finished(time.perf_counter() - _T0))
     # PyQt5 event loop:
     sys.exit(app.exec_())
@@ -0,0 +1,57 @@
+-- 001_seat_inventory.sql
+-- Make flights.seats_booked the single seat counter.
+--
+-- Older builds of the app decremented flights.seats on every booking (and
+-- incremented it again when a booking row was deleted) while the triggers
+-- also bumped seats_booked, so each booking was counted twice. Afterwards
+-- flights.seats is the capacity and seats_booked is kept by the triggers only.
+USE AirlineDB;
+
+-- Undo the app-side decrements (every remaining booking row took one seat)
+-- and recount confirmed bookings.
+UPDATE flights f
+LEFT JOIN (
+    SELECT flight_id,
+           COUNT(*) AS booked_rows,
+           SUM(status = 'Confirmed') AS confirmed
+    FROM bookings
+    GROUP BY flight_id
+) b ON b.flight_id = f.flight_id
+SET f.seats = f.seats + COALESCE(b.booked_rows, 0),
+    f.seats_booked = COALESCE(b.confirmed, 0);
+
+-- The capacity check now locks the flight row before reading the counter.
+DROP TRIGGER IF EXISTS prevent_overbooking;
+DELIMITER $$
+CREATE TRIGGER prevent_overbooking
+BEFORE INSERT ON bookings
+FOR EACH ROW
+BEGIN
+    DECLARE total_seats INT;
+    DECLARE booked_seats INT;
+
+    SELECT seats, seats_booked INTO total_seats, booked_seats
+    FROM flights
+    WHERE flight_id = NEW.flight_id
+    FOR UPDATE;
+
+    IF (booked_seats >= total_seats) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot complete booking. Flight is fully booked.';
+    END IF;
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS after_booking_deleted;
+DELIMITER $$
+CREATE TRIGGER after_booking_deleted
+AFTER DELETE ON bookings
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'Confirmed' THEN
+        UPDATE flights
+        SET seats_booked = seats_booked - 1
+        WHERE flight_id = OLD.flight_id;
+    END IF;
+END$$
+DELIMITER ;
@@ -0,0 +1,8 @@
+-- 002_booking_status.sql
+-- Bookings are cancelled by setting status = 'Cancelled' rather than deleted.
+-- Listings only show confirmed bookings, newest first; this index serves
+-- WHERE status = 'Confirmed' AND booking_id < ? ORDER BY booking_id DESC
+-- without walking the cancelled history.
+USE AirlineDB;
+
+ALTER TABLE bookings ADD INDEX idx_bookings_status_id (status, booking_id);
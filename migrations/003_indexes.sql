@@ -0,0 +1,29 @@
+-- 003_indexes.sql
+-- Index pass for the app's hot queries (checked by query_plans.py).
+USE AirlineDB;
+
+-- Route/date search: WHERE source = ? AND destination = ? AND departure_time BETWEEN ? AND ?
+ALTER TABLE flights ADD INDEX idx_flights_route (source, destination, departure_time);
+
+-- Older databases may hold duplicate confirmed bookings made before the
+-- trigger existed; keep the earliest one of each pair so the index can build.
+UPDATE bookings b
+JOIN (
+    SELECT passenger_id, flight_id, MIN(booking_id) AS keep_id
+    FROM bookings
+    WHERE status = 'Confirmed'
+    GROUP BY passenger_id, flight_id
+    HAVING COUNT(*) > 1
+) d ON b.passenger_id = d.passenger_id AND b.flight_id = d.flight_id
+SET b.status = 'Cancelled'
+WHERE b.status = 'Confirmed' AND b.booking_id <> d.keep_id;
+
+-- One confirmed booking per passenger and flight, enforced by a unique index
+-- instead of a BEFORE INSERT trigger that scanned bookings on every insert.
+-- active_flag is NULL for cancelled rows, and NULLs never collide.
+ALTER TABLE bookings
+    ADD COLUMN active_flag TINYINT AS (IF(status = 'Confirmed', 1, NULL)) STORED,
+    ADD UNIQUE INDEX uq_bookings_active (passenger_id, flight_id, active_flag),
+    ADD INDEX idx_bookings_flight_status (flight_id, status);
+
+DROP TRIGGER IF EXISTS prevent_double_booking;
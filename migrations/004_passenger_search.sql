@@ -0,0 +1,14 @@
+-- 004_passenger_search.sql
+-- Passenger lookup by name prefix or passport number (BookingManager's
+-- "Find passenger" box). Both searches are LIKE 'prefix%' ... ORDER BY col
+-- LIMIT n, which a B-tree on the column answers without a sort.
+USE AirlineDB;
+
+-- The unique index will not build while duplicates exist. List them first
+-- and merge or correct them by hand; they are real people, so nothing here
+-- picks a winner automatically:
+--   SELECT passport_no, GROUP_CONCAT(passenger_id) FROM passengers
+--   GROUP BY passport_no HAVING COUNT(*) > 1;
+ALTER TABLE passengers
+    ADD UNIQUE INDEX uq_passengers_passport (passport_no),
+    ADD INDEX idx_passengers_name (name);
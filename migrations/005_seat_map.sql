@@ -0,0 +1,26 @@
+-- 005_seat_map.sql
+-- Seat assignments. bookings.seat_no is the seat a booking holds (1..seats,
+-- shown as 1A, 1B, ...); flights.seat_map is a bitset of taken seats (bit
+-- n-1 = seat n, little-endian bytes) that BookingService allocates from
+-- while it holds the flight row lock. See seat_map.py.
+USE AirlineDB;
+
+ALTER TABLE flights ADD COLUMN seat_map BLOB NULL;
+ALTER TABLE bookings
+    ADD COLUMN seat_no SMALLINT NULL,
+    -- no two confirmed bookings on one seat (NULL seat_no / cancelled rows never collide)
+    ADD UNIQUE INDEX uq_bookings_seat (flight_id, seat_no, active_flag);
+
+-- Existing confirmed bookings get seats 1..n in booking order ...
+UPDATE bookings b
+JOIN (
+    SELECT booking_id, ROW_NUMBER() OVER (PARTITION BY flight_id ORDER BY booking_id) AS rn
+    FROM bookings
+    WHERE status = 'Confirmed'
+) x ON x.booking_id = b.booking_id
+SET b.seat_no = x.rn;
+
+-- ... so each flight's first seats_booked bits are set.
+UPDATE flights
+SET seat_map = CONCAT(REPEAT(UNHEX('FF'), seats_booked DIV 8),
+                      IF(seats_booked % 8 = 0, '', CHAR((1 << (seats_booked % 8)) - 1 USING binary)));
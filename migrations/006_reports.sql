@@ -0,0 +1,91 @@
+-- 006_reports.sql
+-- Reports read small summary tables instead of rescanning bookings. The
+-- summaries are advanced from booking_audit_log (see reports.py), so the log
+-- now records inserts and deletes as well as status changes, and carries the
+-- flight id. Run with the app stopped: the backfill below and the watermark
+-- it sets must see the same rows.
+USE AirlineDB;
+
+ALTER TABLE booking_audit_log ADD COLUMN flight_id INT NULL AFTER booking_id;
+UPDATE booking_audit_log a JOIN bookings b ON b.booking_id = a.booking_id SET a.flight_id = b.flight_id;
+
+DROP TRIGGER IF EXISTS audit_booking_changes;
+DELIMITER $$
+CREATE TRIGGER audit_booking_changes
+AFTER UPDATE ON bookings
+FOR EACH ROW
+BEGIN
+    IF OLD.status != NEW.status THEN
+        INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+        VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+    END IF;
+END$$
+
+CREATE TRIGGER audit_booking_inserts
+AFTER INSERT ON bookings
+FOR EACH ROW
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, change_date, action_performed)
+    VALUES (NEW.booking_id, NEW.flight_id, NULL, NEW.status, COALESCE(NEW.booking_date, CURRENT_TIMESTAMP), 'Booked');
+END$$
+
+CREATE TRIGGER audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
+END$$
+DELIMITER ;
+
+CREATE TABLE report_daily_bookings (
+    day DATE PRIMARY KEY,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE report_route_bookings (
+    source VARCHAR(30),
+    destination VARCHAR(30),
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, destination)
+);
+
+CREATE TABLE report_state (
+    name VARCHAR(30) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0
+);
+
+-- History before this migration: every booking row was booked once (older
+-- inserts were never audited), cancellations are in the log, and so are
+-- bookings inserted and later deleted once the triggers above exist. Same as
+-- ReportService.rebuild_summaries().
+INSERT INTO report_daily_bookings (day, booked, cancelled)
+SELECT day, SUM(booked), SUM(cancelled) FROM (
+    SELECT DATE(booking_date) AS day, COUNT(*) AS booked, 0 AS cancelled FROM bookings GROUP BY DATE(booking_date)
+    UNION ALL
+    SELECT DATE(change_date), 0, COUNT(*) FROM booking_audit_log
+    WHERE old_status = 'Confirmed' GROUP BY DATE(change_date)
+    UNION ALL
+    SELECT DATE(a.change_date), COUNT(*), 0 FROM booking_audit_log a
+    WHERE a.action_performed = 'Booked' AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+    GROUP BY DATE(a.change_date)
+) x GROUP BY day;
+
+INSERT INTO report_route_bookings (source, destination, booked, cancelled)
+SELECT source, destination, SUM(booked), SUM(cancelled) FROM (
+    SELECT f.source, f.destination, COUNT(*) AS booked, 0 AS cancelled
+    FROM bookings b JOIN flights f ON f.flight_id = b.flight_id GROUP BY f.source, f.destination
+    UNION ALL
+    SELECT f.source, f.destination, 0, COUNT(*)
+    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+    WHERE a.old_status = 'Confirmed' GROUP BY f.source, f.destination
+    UNION ALL
+    SELECT f.source, f.destination, COUNT(*), 0
+    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+    WHERE a.action_performed = 'Booked' AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+    GROUP BY f.source, f.destination
+) x GROUP BY source, destination;
+
+INSERT INTO report_state (name, last_log_id) SELECT 'audit', COALESCE(MAX(log_id), 0) FROM booking_audit_log;
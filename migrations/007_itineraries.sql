@@ -0,0 +1,9 @@
+-- 007_itineraries.sql
+-- Multi-segment bookings. BookingService.book_itinerary inserts every
+-- segment of a trip in one statement, tagged with a client-chosen UUID, so a
+-- retried request can find what the first attempt booked.
+USE AirlineDB;
+
+ALTER TABLE bookings
+    ADD COLUMN itinerary_id CHAR(36) NULL,
+    ADD INDEX idx_bookings_itinerary (itinerary_id);
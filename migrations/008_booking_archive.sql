@@ -0,0 +1,18 @@
+-- 008_booking_archive.sql
+-- Deleting a flight or passenger used to fail on the bookings foreign keys.
+-- services.DeletionService now cancels the dependent bookings, copies them
+-- here and removes them in small batches before deleting the parent row.
+USE AirlineDB;
+
+CREATE TABLE bookings_archive (
+    booking_id INT PRIMARY KEY,
+    passenger_id INT,
+    flight_id INT,
+    booking_date DATETIME,
+    status ENUM('Confirmed', 'Cancelled'),
+    seat_no SMALLINT NULL,
+    itinerary_id CHAR(36) NULL,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_archive_passenger (passenger_id),
+    INDEX idx_archive_flight (flight_id)
+);
@@ -0,0 +1,63 @@
+-- 009_audit_log.sql
+-- booking_audit_log becomes a partitioned, indexed, append-only stream (see
+-- audit.py): one partition per month of change_date so retention drops old
+-- months whole, indexes for lookups by booking and by time, a rollup of what
+-- retention removes, and audit triggers that step aside for sessions that
+-- write the log themselves in batches (audit.AuditWriter).
+-- Rebuilding the table takes a while on a large log; run with the app stopped.
+USE AirlineDB;
+
+-- the partition key has to be part of every unique key
+ALTER TABLE booking_audit_log
+    MODIFY change_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (log_id, change_date),
+    ADD INDEX idx_audit_booking (booking_id, log_id),
+    ADD INDEX idx_audit_date (change_date, log_id);
+
+ALTER TABLE booking_audit_log PARTITION BY RANGE COLUMNS (change_date) (
+    PARTITION p_old VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE booking_audit_daily (
+    day DATE,
+    flight_id INT NOT NULL DEFAULT 0,
+    events INT NOT NULL DEFAULT 0,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    booked_gone INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, flight_id)
+);
+
+CREATE TABLE audit_retention (
+    partition_name VARCHAR(16) PRIMARY KEY,
+    rolled_up_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+DROP TRIGGER IF EXISTS audit_booking_changes;
+DROP TRIGGER IF EXISTS audit_booking_deletes;
+DELIMITER $$
+CREATE TRIGGER audit_booking_changes
+AFTER UPDATE ON bookings
+FOR EACH ROW
+BEGIN
+    IF OLD.status != NEW.status AND @airline_app_audit IS NULL THEN
+        INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+        VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+    END IF;
+END$$
+
+CREATE TRIGGER audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW
+BEGIN
+    IF @airline_app_audit IS NULL THEN
+        INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+        VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
+    END IF;
+END$$
+DELIMITER ;
@@ -0,0 +1,42 @@
+-- 010_waitlist.sql
+-- Full flights get a waitlist, and each flight an overbooking allowance:
+-- BookingService sells up to seats + overbook bookings (the extra ones get a
+-- seat number when one frees up) and promotes the waitlist, in priority
+-- order, in the same transaction as the cancellation that made room.
+USE AirlineDB;
+
+ALTER TABLE flights ADD COLUMN overbook SMALLINT NOT NULL DEFAULT 0;
+
+CREATE TABLE waitlist (
+    waitlist_id INT PRIMARY KEY AUTO_INCREMENT,
+    flight_id INT NOT NULL,
+    passenger_id INT NOT NULL,
+    priority INT NOT NULL DEFAULT 0,
+    requested_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (flight_id) REFERENCES flights(flight_id),
+    FOREIGN KEY (passenger_id) REFERENCES passengers(passenger_id),
+    UNIQUE INDEX uq_waitlist_passenger (passenger_id, flight_id),
+    INDEX idx_waitlist_flight (flight_id, waitlist_id)
+);
+
+DROP TRIGGER IF EXISTS prevent_overbooking;
+DELIMITER $$
+CREATE TRIGGER prevent_overbooking
+BEFORE INSERT ON bookings
+FOR EACH ROW
+BEGIN
+    DECLARE total_seats INT;
+    DECLARE booked_seats INT;
+
+    -- capacity includes the flight's overbooking allowance
+    SELECT seats + overbook, seats_booked INTO total_seats, booked_seats
+    FROM flights
+    WHERE flight_id = NEW.flight_id
+    FOR UPDATE;
+
+    IF (booked_seats >= total_seats) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot complete booking. Flight is fully booked.';
+    END IF;
+END$$
+DELIMITER ;
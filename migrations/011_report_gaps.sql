@@ -0,0 +1,11 @@
+-- 011_report_gaps.sql
+-- reports.py used to remember audit log_id holes per process, so a hole left
+-- by a rolled-back insert was never old enough to skip when every refresh ran
+-- in a new process (python reports.py, audit.py --purge). Holes and when
+-- they were first seen are now kept here.
+USE AirlineDB;
+
+CREATE TABLE report_gaps (
+    log_id INT PRIMARY KEY,
+    first_seen DOUBLE NOT NULL
+);
@@ -0,0 +1,30 @@
+-- 004_passenger_search.sql (SQLite)
+-- Passenger lookup by name prefix or passport number. name and passport_no
+-- become NOCASE columns, as in MySQL, so LIKE 'prefix%' and ORDER BY are
+-- answered by the NOCASE indexes. SQLite cannot change a column's collation
+-- in place, so the table is copied. The unique index will not build while
+-- duplicate passports exist; see ../004_passenger_search.sql.
+CREATE TABLE passengers_new (
+    passenger_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) COLLATE NOCASE,
+    gender VARCHAR(10),
+    age INT,
+    passport_no VARCHAR(20) COLLATE NOCASE
+);
+INSERT INTO passengers_new (passenger_id, name, gender, age, passport_no)
+SELECT passenger_id, name, gender, age, passport_no FROM passengers;
+-- keep the AUTOINCREMENT high-water mark, so ids of deleted passengers are not handed out again
+DELETE FROM sqlite_sequence WHERE name = 'passengers_new';
+UPDATE sqlite_sequence SET name = 'passengers_new' WHERE name = 'passengers';
+DROP TABLE passengers;
+ALTER TABLE passengers_new RENAME TO passengers;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_passengers_passport ON passengers (passport_no COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_passengers_name ON passengers (name COLLATE NOCASE);
+
+CREATE TRIGGER IF NOT EXISTS validate_passenger_age
+BEFORE INSERT ON passengers
+FOR EACH ROW WHEN NEW.age < 1
+BEGIN
+    SELECT RAISE(ABORT, 'Passenger age must be at least 1 year.');
+END;
@@ -0,0 +1,26 @@
+-- 005_seat_map.sql (SQLite)
+-- Seat assignments: bookings.seat_no and the flights.seat_map bitset (bit
+-- n-1 = seat n, little-endian bytes). See ../005_seat_map.sql.
+ALTER TABLE flights ADD COLUMN seat_map BLOB;
+ALTER TABLE bookings ADD COLUMN seat_no INT;
+
+-- Existing confirmed bookings get seats 1..n in booking order ...
+CREATE TEMP TABLE seat_fill (booking_id INTEGER PRIMARY KEY, seat_no INT);
+INSERT INTO seat_fill (booking_id, seat_no)
+SELECT booking_id, ROW_NUMBER() OVER (PARTITION BY flight_id ORDER BY booking_id)
+FROM bookings
+WHERE status = 'Confirmed' AND flight_id IN (SELECT flight_id FROM flights WHERE seat_map IS NULL);
+UPDATE bookings SET seat_no = (SELECT seat_no FROM seat_fill WHERE seat_fill.booking_id = bookings.booking_id)
+WHERE booking_id IN (SELECT booking_id FROM seat_fill);
+DROP TABLE seat_fill;
+
+-- ... so each flight's first seats_booked bits are set (blobs concatenate as
+-- text; the cast turns the bytes back into a blob).
+UPDATE flights SET seat_map = CAST(
+    COALESCE((WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < flights.seats_booked / 8)
+              SELECT group_concat(x'FF', '') FROM n WHERE flights.seats_booked >= 8), '')
+    || CASE WHEN seats_booked % 8 THEN char((1 << (seats_booked % 8)) - 1) ELSE '' END AS BLOB)
+WHERE seat_map IS NULL;
+
+-- no two confirmed bookings on one seat (NULL seat_no / cancelled rows never collide)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_bookings_seat ON bookings (flight_id, seat_no, active_flag);
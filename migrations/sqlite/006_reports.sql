@@ -0,0 +1,89 @@
+-- 006_reports.sql (SQLite)
+-- Report summary tables, advanced from booking_audit_log by reports.py; the
+-- log now records inserts and deletes too, and carries the flight id. See
+-- ../006_reports.sql. Run with the app stopped.
+ALTER TABLE booking_audit_log ADD COLUMN flight_id INT;
+UPDATE booking_audit_log
+SET flight_id = (SELECT b.flight_id FROM bookings b WHERE b.booking_id = booking_audit_log.booking_id)
+WHERE flight_id IS NULL;
+
+DROP TRIGGER IF EXISTS audit_booking_changes;
+CREATE TRIGGER audit_booking_changes
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+END;
+
+DROP TRIGGER IF EXISTS audit_booking_inserts;
+CREATE TRIGGER audit_booking_inserts
+AFTER INSERT ON bookings
+FOR EACH ROW
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, change_date, action_performed)
+    VALUES (NEW.booking_id, NEW.flight_id, NULL, NEW.status, COALESCE(NEW.booking_date, CURRENT_TIMESTAMP), 'Booked');
+END;
+
+DROP TRIGGER IF EXISTS audit_booking_deletes;
+CREATE TRIGGER audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
+END;
+
+CREATE TABLE IF NOT EXISTS report_daily_bookings (
+    day DATE PRIMARY KEY,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS report_route_bookings (
+    source VARCHAR(30) COLLATE NOCASE,
+    destination VARCHAR(30) COLLATE NOCASE,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, destination)
+);
+CREATE TABLE IF NOT EXISTS report_state (
+    name VARCHAR(30) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0
+);
+
+-- History before this migration, as ReportService.rebuild_summaries() counts
+-- it; only while nothing has been folded into the summaries yet.
+CREATE TEMP TABLE report_backfill AS
+SELECT NOT EXISTS (SELECT 1 FROM report_state WHERE name = 'audit' AND last_log_id > 0)
+   AND NOT EXISTS (SELECT 1 FROM report_daily_bookings) AS todo;
+
+INSERT INTO report_daily_bookings (day, booked, cancelled)
+SELECT day, SUM(booked), SUM(cancelled) FROM (
+    SELECT DATE(booking_date) AS day, COUNT(*) AS booked, 0 AS cancelled FROM bookings GROUP BY DATE(booking_date)
+    UNION ALL
+    SELECT DATE(change_date), 0, COUNT(*) FROM booking_audit_log
+    WHERE old_status = 'Confirmed' GROUP BY DATE(change_date)
+    UNION ALL
+    SELECT DATE(a.change_date), COUNT(*), 0 FROM booking_audit_log a
+    WHERE a.action_performed = 'Booked' AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+    GROUP BY DATE(a.change_date)
+) x WHERE (SELECT todo FROM temp.report_backfill) GROUP BY day;
+
+INSERT INTO report_route_bookings (source, destination, booked, cancelled)
+SELECT source, destination, SUM(booked), SUM(cancelled) FROM (
+    SELECT f.source, f.destination, COUNT(*) AS booked, 0 AS cancelled
+    FROM bookings b JOIN flights f ON f.flight_id = b.flight_id GROUP BY f.source, f.destination
+    UNION ALL
+    SELECT f.source, f.destination, 0, COUNT(*)
+    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+    WHERE a.old_status = 'Confirmed' GROUP BY f.source, f.destination
+    UNION ALL
+    SELECT f.source, f.destination, COUNT(*), 0
+    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+    WHERE a.action_performed = 'Booked' AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+    GROUP BY f.source, f.destination
+) x WHERE (SELECT todo FROM temp.report_backfill) GROUP BY source, destination;
+
+INSERT OR REPLACE INTO report_state (name, last_log_id)
+SELECT 'audit', COALESCE(MAX(log_id), 0) FROM booking_audit_log WHERE (SELECT todo FROM temp.report_backfill);
+DROP TABLE report_backfill;
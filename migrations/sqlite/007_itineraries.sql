@@ -0,0 +1,4 @@
+-- 007_itineraries.sql (SQLite)
+-- Multi-segment bookings tagged with a client-chosen UUID. See ../007_itineraries.sql.
+ALTER TABLE bookings ADD COLUMN itinerary_id CHAR(36);
+CREATE INDEX IF NOT EXISTS idx_bookings_itinerary ON bookings (itinerary_id);
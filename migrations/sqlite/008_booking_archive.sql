@@ -0,0 +1,14 @@
+-- 008_booking_archive.sql (SQLite)
+-- Bookings removed together with their flight or passenger. See ../008_booking_archive.sql.
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    booking_id INTEGER PRIMARY KEY,
+    passenger_id INT,
+    flight_id INT,
+    booking_date DATETIME,
+    status TEXT CHECK (status IN ('Confirmed', 'Cancelled')),
+    seat_no INT,
+    itinerary_id CHAR(36),
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_archive_passenger ON bookings_archive (passenger_id);
+CREATE INDEX IF NOT EXISTS idx_archive_flight ON bookings_archive (flight_id);
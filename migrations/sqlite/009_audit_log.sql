@@ -0,0 +1,36 @@
+-- 009_audit_log.sql (SQLite)
+-- Audit log indexes, the retention rollup, and audit triggers that step aside
+-- for connections writing the log themselves (audit.AuditWriter). SQLite has
+-- no partitioning; audit.AuditLog.purge() deletes old rows in batches. See
+-- ../009_audit_log.sql.
+CREATE INDEX IF NOT EXISTS idx_audit_booking ON booking_audit_log (booking_id, log_id);
+CREATE INDEX IF NOT EXISTS idx_audit_date ON booking_audit_log (change_date, log_id);
+
+CREATE TABLE IF NOT EXISTS booking_audit_daily (
+    day DATE,
+    flight_id INT NOT NULL DEFAULT 0,
+    events INT NOT NULL DEFAULT 0,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    booked_gone INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, flight_id)
+);
+
+DROP TRIGGER IF EXISTS audit_booking_changes;
+CREATE TRIGGER audit_booking_changes
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status IS NOT NEW.status
+    AND NOT EXISTS (SELECT 1 FROM pragma_table_info('app_audit'))
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+END;
+
+DROP TRIGGER IF EXISTS audit_booking_deletes;
+CREATE TRIGGER audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM pragma_table_info('app_audit'))
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
+END;
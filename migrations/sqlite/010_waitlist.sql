@@ -0,0 +1,22 @@
+-- 010_waitlist.sql (SQLite)
+-- Per-flight waitlists and an overbooking allowance. See ../010_waitlist.sql.
+ALTER TABLE flights ADD COLUMN overbook INT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    waitlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    flight_id INT NOT NULL REFERENCES flights(flight_id),
+    passenger_id INT NOT NULL REFERENCES passengers(passenger_id),
+    priority INT NOT NULL DEFAULT 0,
+    requested_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_waitlist_passenger ON waitlist (passenger_id, flight_id);
+CREATE INDEX IF NOT EXISTS idx_waitlist_flight ON waitlist (flight_id, waitlist_id);
+
+DROP TRIGGER IF EXISTS prevent_overbooking;
+CREATE TRIGGER prevent_overbooking
+BEFORE INSERT ON bookings
+FOR EACH ROW
+WHEN (SELECT seats_booked >= seats + overbook FROM flights WHERE flight_id = NEW.flight_id)
+BEGIN
+    SELECT RAISE(ABORT, 'Cannot complete booking. Flight is fully booked.');
+END;
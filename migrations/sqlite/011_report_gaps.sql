@@ -0,0 +1,6 @@
+-- 011_report_gaps.sql (SQLite)
+-- Audit log_id holes reports.py is waiting on. See ../011_report_gaps.sql.
+CREATE TABLE IF NOT EXISTS report_gaps (
+    log_id INTEGER PRIMARY KEY,
+    first_seen REAL NOT NULL
+);
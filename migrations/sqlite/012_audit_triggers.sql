@@ -0,0 +1,22 @@
+-- 012_audit_triggers.sql (SQLite only)
+-- The audit triggers looked for the app_audit temp table in pragma_table_list,
+-- which SQLite only has from 3.37. pragma_table_info works on every version
+-- the schema supports (3.31+, for bookings.active_flag).
+DROP TRIGGER IF EXISTS audit_booking_changes;
+CREATE TRIGGER audit_booking_changes
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status IS NOT NEW.status
+    AND NOT EXISTS (SELECT 1 FROM pragma_table_info('app_audit'))
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+END;
+
+DROP TRIGGER IF EXISTS audit_booking_deletes;
+CREATE TRIGGER audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM pragma_table_info('app_audit'))
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
+END;
@@ -1,12 +1,15 @@
 # passenger_manager.py
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QGroupBox,
-    QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QMessageBox,
+    QLineEdit, QPushButton, QTableView, QAbstractItemView, QMessageBox,
     QHeaderView, QLabel
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPalette, QColor, QFont
-from db_utils import db_connect
+from db_worker import DbExecutor, BusyIndicator, LoadingPlaceholder
+from data_store import get_store
+from services import DeletionService, PassengerService, ServiceError, validate_passenger
+from instrumentation import span
 
 BTN_CSS = """
 QPushButton {
@@ -47,6 +50,12 @@ class PassengerManager(QWidget):
         title.setStyleSheet("color:#0d47a1;")
         root.addWidget(title, alignment=Qt.AlignLeft)
 
+        self.executor = DbExecutor(self)
+        self.service = PassengerService()
+        self.deletion = DeletionService()
+        self.store = get_store()
+        root.addWidget(BusyIndicator(self.executor, self.store.executor))
+
         # Form
         form_card = QGroupBox("Add Passenger"); form_card.setStyleSheet(CARD_CSS)
         form_layout = QFormLayout()
@@ -73,15 +82,16 @@ class PassengerManager(QWidget):
         # Table
         table_card = QGroupBox("Passengers List"); table_card.setStyleSheet(CARD_CSS)
         table_layout = QVBoxLayout()
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "Name", "Gender", "Age", "Passport No"])
+        self.model = self.store.model("passengers")
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setAlternatingRowColors(True)
         header: QHeaderView = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.Interactive)
         header.setStretchLastSection(True)
-        self.table.setSelectionBehavior(self.table.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
         table_layout.addWidget(self.table)
         table_card.setLayout(table_layout)
@@ -92,20 +102,19 @@ class PassengerManager(QWidget):
         # signals
         add_btn.clicked.connect(self.add_passenger)
         del_btn.clicked.connect(self.delete_passenger)
-
-        self.load_passengers()
+        self.model.first_page_loaded.connect(self.table.resizeColumnsToContents)
+        self.loading = LoadingPlaceholder(self.table, self.model)
+        self.model.load_failed.connect(self._show_error)
+        if self.model.rowCount():
+            # shared model already loaded by an earlier window: nothing to fetch
+            self.table.resizeColumnsToContents()
 
     def load_passengers(self):
-        self.table.setRowCount(0)
-        con = db_connect(); cur = con.cursor()
-        cur.execute("SELECT * FROM passengers ORDER BY passenger_id DESC")
-        rows = cur.fetchall()
-        for r, row in enumerate(rows):
-            self.table.insertRow(r)
-            for c, val in enumerate(row):
-                self.table.setItem(r, c, QTableWidgetItem(str(val)))
-        con.close()
-        self.table.resizeColumnsToContents()
+        with span("passengers.load"):
+            self.model.reset()
+
+    def _show_error(self, e):
+        QMessageBox.critical(self, "Error", str(e))
 
     def add_passenger(self):
         try:
@@ -114,34 +123,44 @@ class PassengerManager(QWidget):
             age = self.age.text().strip()
             passport_no = self.passport_no.text().strip()
 
-            if not (name and gender and age.isdigit() and passport_no):
-                QMessageBox.warning(self, "Invalid Input", "Please fill all fields correctly.")
+            try:
+                values = validate_passenger(name, gender, age, passport_no)
+            except ServiceError as e:
+                QMessageBox.warning(self, e.title, str(e))
                 return
 
-            con = db_connect(); cur = con.cursor()
-            cur.execute("""
-                INSERT INTO passengers (name, gender, age, passport_no)
-                VALUES (%s, %s, %s, %s)
-            """, (name, gender, int(age), passport_no))
-            con.commit(); con.close()
-
-            self.name.clear(); self.gender.clear(); self.age.clear(); self.passport_no.clear()
-            self.load_passengers()
-            QMessageBox.information(self, "Success", "Passenger added.")
+            self.executor.submit(self.service.add, *values,
+                                 on_done=self._passenger_added,
+                                 on_error=self._show_error)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
+    def _passenger_added(self, _):
+        self.name.clear(); self.gender.clear(); self.age.clear(); self.passport_no.clear()
+        QMessageBox.information(self, "Success", "Passenger added.")
+
     def delete_passenger(self):
-        row = self.table.currentRow()
-        if row < 0:
-            QMessageBox.warning(self, "No Selection", "Select a passenger row to delete.")
+        ids = sorted({self.model.row_key(i.row()) for i in self.table.selectionModel().selectedRows()})
+        if not ids:
+            QMessageBox.warning(self, "No Selection", "Select one or more passenger rows to delete.")
             return
-        pid = self.table.item(row, 0).text()
-        try:
-            con = db_connect(); cur = con.cursor()
-            cur.execute("DELETE FROM passengers WHERE passenger_id=%s", (pid,))
-            con.commit(); con.close()
-            self.load_passengers()
-            QMessageBox.information(self, "Deleted", "Passenger deleted.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        # count the bookings that go with them before asking
+        self.executor.submit(self.deletion.impact, "passengers", ids, key="delete",
+                             on_done=lambda impact: self._confirm_delete(ids, impact), on_error=self._show_error)
+
+    def _confirm_delete(self, ids, impact):
+        if not impact.found:
+            QMessageBox.information(self, "Deleted", "The selected passengers were already deleted.")
+            return
+        text = f"Delete {impact.found} passenger(s)?"
+        if impact.confirmed or impact.cancelled:
+            text += (f"\n\n{impact.confirmed} confirmed booking(s) will be cancelled, and all "
+                     f"{impact.confirmed + impact.cancelled} booking(s) moved to the archive.")
+        if QMessageBox.question(self, "Delete Passengers", text) != QMessageBox.Yes:
+            return
+        self.executor.submit(self.deletion.delete, "passengers", ids,
+                             on_done=self._passenger_deleted, on_error=self._show_error)
+
+    def _passenger_deleted(self, result):
+        QMessageBox.information(self, "Deleted", f"{result.deleted} passenger(s) deleted, "
+                                                 f"{result.cancelled} booking(s) cancelled.")
@@ -0,0 +1,185 @@
+# passenger_search.py
+import threading
+from array import array
+from bisect import bisect_left
+
+from db_utils import get_connection
+from services import PassengerService, SEARCH_LIMIT, add_change_listener
+
+LOAD_FETCH = 10000      # rows per fetchmany while building the index
+BULK_MERGE = 64         # more pending inserts than this: append and re-sort instead of insort
+PRUNE_DELETED = 256     # deleted ids skipped at lookup before they are pruned from the index
+
+
+def _key(text):
+    return str(text or "").strip().casefold()
+
+
+class _SortedKeys:
+    """Sorted casefolded strings with a parallel array of passenger ids."""
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [k for k, _ in pairs]
+        self.ids = array("q", (i for _, i in pairs))
+
+    def add(self, pairs):
+        if len(pairs) > BULK_MERGE:
+            merged = sorted(set(zip(self.keys, self.ids)).union(pairs))
+            self.keys = [k for k, _ in merged]
+            self.ids = array("q", (i for _, i in merged))
+            return
+        for k, i in pairs:
+            pos = bisect_left(self.keys, k)
+            # ties stay in id order so the result order is stable
+            while pos < len(self.keys) and self.keys[pos] == k and self.ids[pos] < i:
+                pos += 1
+            if pos < len(self.keys) and self.keys[pos] == k and self.ids[pos] == i:
+                continue    # already indexed (inserted while the index was loading)
+            self.keys.insert(pos, k)
+            self.ids.insert(pos, i)
+
+    def remove(self, ids):
+        keep = [n for n, i in enumerate(self.ids) if i not in ids]
+        if len(keep) < len(self.ids):
+            self.keys = [self.keys[n] for n in keep]
+            self.ids = array("q", (self.ids[n] for n in keep))
+
+    def prefix(self, p, limit, deleted, seen=()):
+        out = []
+        pos = bisect_left(self.keys, p)
+        while pos < len(self.keys) and len(out) < limit and self.keys[pos].startswith(p):
+            i = self.ids[pos]
+            if i not in deleted and i not in seen:
+                out.append(i)
+            pos += 1
+        return out
+
+
+class PassengerIndex:
+    """In-memory name/passport prefix index for completion.
+
+    Completion only needs ids from here; the display rows are read back by
+    primary key, which also drops anyone deleted by another client.
+    Inserts made through the services are pulled in lazily on the next
+    lookup, so writers never pay for the index.
+    """
+
+    def __init__(self, connection=get_connection):
+        self.connection = connection
+        self._lock = threading.Lock()
+        self._names = _SortedKeys()
+        self._passports = _SortedKeys()
+        self._pending = set()    # inserted ids not in the index yet
+        self._deleted = set()    # deleted ids still in the index, skipped until pruned
+        self.ready = False
+        self._loading = False
+
+    def load(self):
+        """Build the index with one streaming pass over passengers (run it off the GUI thread)."""
+        with self._lock:
+            if self.ready or self._loading:
+                return
+            self._loading = True
+        names, passports = [], []
+        try:
+            with self.connection() as con:
+                cur = con.cursor()
+                cur.execute("SELECT passenger_id, name, passport_no FROM passengers")
+                while True:
+                    rows = cur.fetchmany(LOAD_FETCH)
+                    if not rows:
+                        break
+                    for pid, name, passport in rows:
+                        names.append((_key(name), pid))
+                        passports.append((_key(passport), pid))
+            names, passports = _SortedKeys(names), _SortedKeys(passports)
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        with self._lock:
+            self._names, self._passports = names, passports
+            self._loading = False
+            self.ready = True
+
+    def on_change(self, table, op, keys):
+        if table != "passengers":
+            return
+        with self._lock:
+            if op == "insert":
+                self._pending.update(keys)
+            elif op == "delete":
+                self._deleted.update(keys)
+
+    def _pull_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return
+        ids = sorted(pending)
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT passenger_id, name, passport_no FROM passengers "
+                        f"WHERE passenger_id IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+            rows = cur.fetchall()
+        with self._lock:
+            self._names.add([(_key(name), pid) for pid, name, _ in rows])
+            self._passports.add([(_key(passport), pid) for pid, _, passport in rows])
+
+    def lookup(self, text, limit=SEARCH_LIMIT):
+        """Ids of passengers whose passport or name starts with ``text`` (passport hits first)."""
+        p = _key(text)
+        if not p or not self.ready:
+            return []
+        self._pull_pending()
+        with self._lock:
+            if len(self._deleted) > PRUNE_DELETED:
+                self._prune()
+            ids = self._passports.prefix(p, limit, self._deleted)
+            ids += self._names.prefix(p, limit, self._deleted, set(ids))
+        return ids[:limit]
+
+    def _prune(self):
+        # one pass over each list instead of a skip set that grows for as long as the app runs
+        self._names.remove(self._deleted)
+        self._passports.remove(self._deleted)
+        self._deleted = set()
+
+
+class PassengerSearch:
+    """Prefix search for the booking form: the in-memory index once built, indexed SQL until then."""
+
+    def __init__(self, service=None, index=None):
+        self.service = service or PassengerService()
+        self.index = index or PassengerIndex()
+        add_change_listener(self.index.on_change)
+
+    def warm(self):
+        self.index.load()
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        """(passenger_id, name, passport_no) rows, best matches first."""
+        if not _key(text):
+            return []
+        if not self.index.ready:
+            return self.service.search(text, limit)
+        ids = self.index.lookup(text, limit)
+        if not ids:
+            return []
+        with self.index.connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT passenger_id, name, passport_no FROM passengers "
+                        f"WHERE passenger_id IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+            by_id = {r[0]: r for r in cur.fetchall()}
+        return [by_id[i] for i in ids if i in by_id]
+
+
+_search = None
+
+
+def get_passenger_search():
+    global _search
+    if _search is None:
+        _search = PassengerSearch()
+    return _search
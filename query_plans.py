@@ -0,0 +1,103 @@
+# query_plans.py
+# EXPLAIN the app's hot queries and fail if any of them falls back to a full
+# table scan. Run it against a database loaded with representative data
+# (the optimizer happily scans tiny tables):
+#
+#   python query_plans.py                    # exit status 1 on regression
+#   python query_plans.py --backend sqlite   # same check against the embedded engine
+import argparse
+import sys
+
+from db_utils import get_backend, get_connection, set_backend
+
+# (name, sql, params) - kept in step with table_model.py and services.py
+HOT_QUERIES = [
+    ("flights page",
+     "SELECT flight_id, flight_number, source, destination, departure_time, arrival_time, seats, seats_booked "
+     "FROM flights WHERE flight_id < %s ORDER BY flight_id DESC LIMIT %s", (10 ** 9, 500)),
+    ("passengers page",
+     "SELECT passenger_id, name, gender, age, passport_no "
+     "FROM passengers WHERE passenger_id < %s ORDER BY passenger_id DESC LIMIT %s", (10 ** 9, 500)),
+    ("confirmed bookings page",
+     "SELECT booking_id, passenger_id, flight_id, seat_no, booking_date FROM bookings "
+     "WHERE status='Confirmed' AND booking_id < %s ORDER BY booking_id DESC LIMIT %s", (10 ** 9, 500)),
+    ("lock flights for booking",
+     "SELECT flight_id, seats - seats_booked, seats, seat_map FROM flights WHERE flight_id IN (%s, %s) "
+     "ORDER BY flight_id", (1, 2)),
+    ("existing confirmed bookings",
+     "SELECT passenger_id, flight_id FROM bookings "
+     "WHERE flight_id IN (%s, %s) AND passenger_id IN (%s, %s) AND status='Confirmed'", (1, 2, 1, 2)),
+    ("bookings on flight",
+     "SELECT booking_id FROM bookings WHERE flight_id=%s AND status='Confirmed'", (1,)),
+    ("itinerary segments",
+     "SELECT flight_id, booking_id FROM bookings WHERE itinerary_id=%s AND status='Confirmed'",
+     ("00000000-0000-0000-0000-000000000000",)),
+    ("delete batch (flight)",
+     "SELECT booking_id, flight_id FROM bookings WHERE flight_id IN (%s) ORDER BY booking_id LIMIT %s", (1, 500)),
+    ("delete batch (passenger)",
+     "SELECT booking_id, flight_id FROM bookings WHERE passenger_id IN (%s) ORDER BY booking_id LIMIT %s", (1, 500)),
+    ("waitlist catch-up",
+     "SELECT waitlist_id, passenger_id, priority FROM waitlist WHERE flight_id=%s AND waitlist_id > %s",
+     (1, 0)),
+    ("seatless bookings on flight",
+     "SELECT booking_id FROM bookings WHERE flight_id=%s AND seat_no IS NULL AND status='Confirmed' "
+     "ORDER BY booking_id LIMIT %s", (1, 1)),
+    ("passenger name prefix",
+     "SELECT passenger_id, name, passport_no FROM passengers WHERE name LIKE %s ORDER BY name LIMIT %s",
+     ("Sm%", 20)),
+    ("passenger passport prefix",
+     "SELECT passenger_id, name, passport_no FROM passengers WHERE passport_no LIKE %s "
+     "ORDER BY passport_no LIMIT %s", ("N12%", 20)),
+    ("route search",
+     "SELECT flight_id FROM flights WHERE source=%s AND destination=%s "
+     "AND departure_time >= %s AND departure_time < %s", ("Kathmandu", "Delhi", "2030-01-01", "2030-01-02")),
+    ("report: audit rows since watermark",
+     "SELECT DATE(change_date), COUNT(*) FROM booking_audit_log WHERE log_id > %s AND log_id <= %s "
+     "GROUP BY DATE(change_date)", (0, 50000)),
+    ("audit: booking history",
+     "SELECT log_id, change_date, action_performed FROM booking_audit_log WHERE booking_id=%s ORDER BY log_id",
+     (1,)),
+    ("audit: time range page",
+     "SELECT log_id, booking_id, change_date FROM booking_audit_log WHERE change_date >= %s AND change_date < %s "
+     "ORDER BY change_date, log_id LIMIT %s", ("2026-01-01 00:00:00", "2026-01-02 00:00:00", 1000)),
+    ("audit: purge batch",
+     "SELECT log_id FROM booking_audit_log WHERE change_date < %s AND log_id <= %s "
+     "ORDER BY change_date, log_id LIMIT %s", ("2025-01-01 00:00:00", 50000, 5000)),
+    ("report: route rollup",
+     "SELECT source, destination, COUNT(*), SUM(seats), SUM(seats_booked) FROM flights "
+     "GROUP BY source, destination", ()),
+    ("report: booking curve",
+     "SELECT DATE(booking_date), COUNT(*) FROM bookings WHERE flight_id=%s AND status='Confirmed' "
+     "GROUP BY DATE(booking_date)", (1,)),
+]
+
+
+def check_plans(queries=HOT_QUERIES):
+    backend = get_backend()
+    failures = []
+    with get_connection() as con:
+        cur = con.cursor()
+        for name, sql, params in queries:
+            plan = backend.explain(cur, sql, params)
+            scans = [table for table, _, full in plan if full]
+            access = "; ".join(detail for _, detail, _ in plan)
+            print(f"{'FAIL' if scans else 'ok  '}  {name:<28} {access}")
+            if scans:
+                failures.append((name, scans))
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fail if a hot query plans a full table scan.")
+    ap.add_argument("--backend", choices=["mysql", "sqlite"])
+    ap.add_argument("--sqlite-path")
+    args = ap.parse_args(argv)
+    if args.backend == "sqlite":
+        set_backend("sqlite", path=args.sqlite_path)
+    elif args.backend:
+        set_backend(args.backend)
+    return 1 if check_plans() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+# reports.py
+# Load factor, bookings per day, booking curves and top routes.
+#
+# Aggregation runs in SQL wherever an index can serve it. Results that cover
+# a whole table come back as columnar NumPy arrays (one array per column,
+# filled a fetchmany chunk at a time) and are rolled up in process. Booking
+# history is never rescanned: report_daily_bookings and report_route_bookings
+# are advanced from the booking_audit_log rows written since the last refresh.
+#
+#   python reports.py              # fold new audit rows into the summaries
+#   python reports.py --rebuild    # recompute them from scratch
+import argparse
+import time
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from db_utils import fetch_columns, get_connection
+from instrumentation import timed
+
+REFRESH_BATCH = 50000     # audit rows folded into the summaries per transaction
+GAP_GRACE_S = 30          # how long a missing audit log_id is waited for (see _fold_limit)
+LF_BINS = 10
+FULL_AT = 0.9             # load factor counted as "full"
+MOVING_AVG_DAYS = 7
+TOP_ROUTES = 20
+FULLEST = 20              # flights listed by the load-factor report
+
+LoadFactorReport = namedtuple("LoadFactorReport",
+                              "flights seats booked mean weighted full_share hist edges fullest")
+DailyReport = namedtuple("DailyReport", "days booked cancelled net average")
+BookingCurve = namedtuple("BookingCurve", "flight_id seats days_before cumulative")
+RouteRow = namedtuple("RouteRow", "source destination flights seats booked load_factor bookings cancellations")
+
+
+def moving_average(values, window=MOVING_AVG_DAYS):
+    """Trailing mean over ``window`` points (shorter at the start)."""
+    sums = np.cumsum(values, dtype=float)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+def _add_counts(cur, table, key_cols, rows):
+    # rows: (*key, booked, cancelled); summary tables are tiny, so update-else-insert is fine
+    where = " AND ".join(f"{c}=%s" for c in key_cols)
+    for *key, booked, cancelled in rows:
+        if not (booked or cancelled):
+            continue     # e.g. a cancelled booking deleted: nothing entered or left 'Confirmed'
+        cur.execute(f"UPDATE {table} SET booked = booked + %s, cancelled = cancelled + %s WHERE {where}",
+                    (booked, cancelled, *key))
+        if cur.rowcount == 0:
+            cur.execute(f"INSERT INTO {table} ({', '.join(key_cols)}, booked, cancelled) "
+                        f"VALUES ({', '.join(['%s'] * (len(key_cols) + 2))})", (*key, booked, cancelled))
+
+
+class ReportService:
+    def __init__(self, connection=get_connection):
+        self.connection = connection
+
+    # --- summary tables ---
+    @staticmethod
+    def _fold_limit(cur, log_ids, last):
+        """Highest log_id that can be folded in now.
+
+        MySQL hands out AUTO_INCREMENT ids at insert time, so a booking still
+        being committed can leave a hole below rows that are already visible.
+        Stop at the hole until it has been open for GAP_GRACE_S; after that it
+        was a rolled-back insert and is skipped. When a hole was first seen is
+        kept in report_gaps, so the wait counts across processes and runs.
+        """
+        prev = np.concatenate(([last], log_ids[:-1]))
+        now = time.time()
+        for i in np.flatnonzero(log_ids - prev > 1):
+            missing = int(prev[i]) + 1
+            cur.execute("SELECT first_seen FROM report_gaps WHERE log_id=%s", (missing,))
+            row = cur.fetchone()
+            if row is None:
+                cur.execute("INSERT INTO report_gaps (log_id, first_seen) VALUES (%s, %s)", (missing, now))
+                return int(prev[i])
+            if now - row[0] < GAP_GRACE_S:
+                return int(prev[i])
+        return int(log_ids[-1])
+
+    @timed("reports.refresh")
+    def refresh_summaries(self):
+        """Fold audit rows written since the last refresh into the summary tables; returns how many."""
+        total = 0
+        while True:
+            with self.connection() as con:
+                cur = con.cursor()
+                # serialises refreshers; the summaries and the watermark move together
+                cur.execute("SELECT last_log_id FROM report_state WHERE name='audit' FOR UPDATE")
+                row = cur.fetchone()
+                last = row[0] if row else 0
+                ids = fetch_columns(cur, "SELECT log_id FROM booking_audit_log WHERE log_id > %s "
+                                         "ORDER BY log_id LIMIT %s", (last, REFRESH_BATCH),
+                                    [("log_id", "i8")])["log_id"]
+                high = self._fold_limit(cur, ids, last) if len(ids) else last
+                if high == last:
+                    con.commit()     # keeps a newly seen gap
+                    return total
+                # both served by the log_id primary key range
+                cur.execute("""
+                    SELECT DATE(change_date),
+                           SUM(CASE WHEN new_status='Confirmed' THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN old_status='Confirmed' THEN 1 ELSE 0 END)
+                    FROM booking_audit_log WHERE log_id > %s AND log_id <= %s
+                    GROUP BY DATE(change_date)
+                """, (last, high))
+                _add_counts(cur, "report_daily_bookings", ("day",), cur.fetchall())
+                cur.execute("""
+                    SELECT f.source, f.destination,
+                           SUM(CASE WHEN a.new_status='Confirmed' THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN a.old_status='Confirmed' THEN 1 ELSE 0 END)
+                    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+                    WHERE a.log_id > %s AND a.log_id <= %s
+                    GROUP BY f.source, f.destination
+                """, (last, high))
+                _add_counts(cur, "report_route_bookings", ("source", "destination"), cur.fetchall())
+                if row is None:
+                    cur.execute("INSERT INTO report_state (name, last_log_id) VALUES ('audit', %s)", (high,))
+                else:
+                    cur.execute("UPDATE report_state SET last_log_id=%s WHERE name='audit'", (high,))
+                cur.execute("DELETE FROM report_gaps WHERE log_id <= %s", (high,))
+                con.commit()
+            total += int(np.count_nonzero(ids <= high))
+            if len(ids) < REFRESH_BATCH or high < ids[-1]:
+                return total
+
+    @timed("reports.rebuild")
+    def rebuild_summaries(self):
+        """Recompute the summaries from bookings plus the audit log (same as migration 006)."""
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT last_log_id FROM report_state WHERE name='audit' FOR UPDATE")
+            cur.execute("DELETE FROM report_daily_bookings")
+            cur.execute("DELETE FROM report_route_bookings")
+            cur.execute("DELETE FROM report_state")
+            cur.execute("DELETE FROM report_gaps")
+            # every booking row, live or archived, was booked once; cancellations,
+            # deletions and the bookings since deleted are in the log, or in the
+            # daily rollup once audit.AuditLog.purge() has removed their rows
+            cur.execute("""
+                INSERT INTO report_daily_bookings (day, booked, cancelled)
+                SELECT day, SUM(booked), SUM(cancelled) FROM (
+                    SELECT DATE(booking_date) AS day, COUNT(*) AS booked, 0 AS cancelled
+                    FROM bookings GROUP BY DATE(booking_date)
+                    UNION ALL
+                    SELECT DATE(booking_date), COUNT(*), 0 FROM bookings_archive GROUP BY DATE(booking_date)
+                    UNION ALL
+                    SELECT DATE(change_date), 0, COUNT(*) FROM booking_audit_log
+                    WHERE old_status = 'Confirmed' GROUP BY DATE(change_date)
+                    UNION ALL
+                    SELECT DATE(a.change_date), COUNT(*), 0 FROM booking_audit_log a
+                    WHERE a.action_performed = 'Booked'
+                      AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+                      AND NOT EXISTS (SELECT 1 FROM bookings_archive r WHERE r.booking_id = a.booking_id)
+                    GROUP BY DATE(a.change_date)
+                    UNION ALL
+                    SELECT day, SUM(booked_gone), SUM(cancelled) FROM booking_audit_daily GROUP BY day
+                ) x GROUP BY day
+            """)
+            cur.execute("""
+                INSERT INTO report_route_bookings (source, destination, booked, cancelled)
+                SELECT source, destination, SUM(booked), SUM(cancelled) FROM (
+                    SELECT f.source, f.destination, COUNT(*) AS booked, 0 AS cancelled
+                    FROM bookings b JOIN flights f ON f.flight_id = b.flight_id
+                    GROUP BY f.source, f.destination
+                    UNION ALL
+                    SELECT f.source, f.destination, COUNT(*), 0
+                    FROM bookings_archive b JOIN flights f ON f.flight_id = b.flight_id
+                    GROUP BY f.source, f.destination
+                    UNION ALL
+                    SELECT f.source, f.destination, 0, COUNT(*)
+                    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+                    WHERE a.old_status = 'Confirmed' GROUP BY f.source, f.destination
+                    UNION ALL
+                    SELECT f.source, f.destination, COUNT(*), 0
+                    FROM booking_audit_log a JOIN flights f ON f.flight_id = a.flight_id
+                    WHERE a.action_performed = 'Booked'
+                      AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.booking_id = a.booking_id)
+                      AND NOT EXISTS (SELECT 1 FROM bookings_archive r WHERE r.booking_id = a.booking_id)
+                    GROUP BY f.source, f.destination
+                    UNION ALL
+                    SELECT f.source, f.destination, SUM(d.booked_gone), SUM(d.cancelled)
+                    FROM booking_audit_daily d JOIN flights f ON f.flight_id = d.flight_id
+                    GROUP BY f.source, f.destination
+                ) x GROUP BY source, destination
+            """)
+            cur.execute("INSERT INTO report_state (name, last_log_id) "
+                        "SELECT 'audit', COALESCE(MAX(log_id), 0) FROM booking_audit_log")
+            con.commit()
+
+    # --- reports ---
+    @timed("reports.load_factor")
+    def load_factor(self):
+        with self.connection() as con:
+            cols = fetch_columns(con.cursor(),
+                                 "SELECT flight_id, COALESCE(seats, 0), seats_booked FROM flights", (),
+                                 [("flight_id", "i8"), ("seats", "i8"), ("booked", "i8")])
+        seats, booked = cols["seats"], cols["booked"]
+        lf = np.divide(booked, seats, out=np.zeros(len(seats)), where=seats > 0)
+        hist, edges = np.histogram(np.clip(lf, 0, 1), bins=LF_BINS, range=(0, 1))
+        top = np.argsort(-lf, kind="stable")[:FULLEST]
+        return LoadFactorReport(
+            flights=len(lf), seats=int(seats.sum()), booked=int(booked.sum()),
+            mean=float(lf.mean()) if len(lf) else 0.0,
+            weighted=float(booked.sum() / seats.sum()) if seats.sum() else 0.0,
+            full_share=float((lf >= FULL_AT).mean()) if len(lf) else 0.0,
+            hist=hist, edges=edges,
+            fullest=list(zip(cols["flight_id"][top].tolist(), lf[top].tolist())))
+
+    @timed("reports.daily")
+    def daily(self, since=None):
+        """Bookings per day from the summary table, with empty days filled in."""
+        with self.connection() as con:
+            cols = fetch_columns(con.cursor(),
+                                 "SELECT day, booked, cancelled FROM report_daily_bookings "
+                                 "WHERE day >= %s ORDER BY day", ((since or date.min).isoformat(),),
+                                 [("day", "datetime64[D]"), ("booked", "i8"), ("cancelled", "i8")])
+        if not len(cols["day"]):
+            empty = np.empty(0, "i8")
+            return DailyReport(np.empty(0, "datetime64[D]"), empty, empty, empty, np.empty(0))
+        days = np.arange(cols["day"][0], cols["day"][-1] + 1)
+        pos = (cols["day"] - days[0]).astype(int)
+        booked = np.zeros(len(days), "i8")
+        cancelled = np.zeros(len(days), "i8")
+        booked[pos] = cols["booked"]
+        cancelled[pos] = cols["cancelled"]
+        net = booked - cancelled
+        return DailyReport(days, booked, cancelled, net, moving_average(net))
+
+    @timed("reports.booking_curve")
+    def booking_curve(self, flight_id):
+        """Confirmed bookings on a flight, cumulative, against days before departure."""
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT seats, departure_time FROM flights WHERE flight_id=%s", (flight_id,))
+            r = cur.fetchone()
+            if not r:
+                return None
+            # idx_bookings_flight_status narrows to the flight's confirmed rows
+            cols = fetch_columns(cur, "SELECT DATE(booking_date), COUNT(*) FROM bookings "
+                                      "WHERE flight_id=%s AND status='Confirmed' "
+                                      "GROUP BY DATE(booking_date) ORDER BY DATE(booking_date)", (flight_id,),
+                                 [("day", "datetime64[D]"), ("n", "i8")])
+        departure = np.datetime64(str(r[1])[:10], "D")
+        if not len(cols["day"]):
+            return BookingCurve(flight_id, r[0], np.empty(0, "i8"), np.empty(0, "i8"))
+        days = np.arange(cols["day"][0], cols["day"][-1] + 1)     # one point per day, quiet days included
+        counts = np.zeros(len(days), "i8")
+        counts[(cols["day"] - days[0]).astype(int)] = cols["n"]
+        return BookingCurve(flight_id, r[0], (departure - days).astype(int), np.cumsum(counts))
+
+    @timed("reports.top_routes")
+    def top_routes(self, limit=TOP_ROUTES):
+        """Busiest routes by confirmed bookings, with load factor and lifetime booking/cancel counts."""
+        with self.connection() as con:
+            cur = con.cursor()
+            # grouped in idx_flights_route order: one pass, no temporary sort
+            cols = fetch_columns(cur, "SELECT source, destination, COUNT(*), SUM(COALESCE(seats, 0)), "
+                                      "SUM(seats_booked) FROM flights GROUP BY source, destination", (),
+                                 [("source", object), ("destination", object), ("flights", "i8"),
+                                  ("seats", "i8"), ("booked", "i8")])
+            cur.execute("SELECT source, destination, booked, cancelled FROM report_route_bookings")
+            history = {(s.casefold(), d.casefold()): (b, c) for s, d, b, c in cur.fetchall()}
+        seats, booked = cols["seats"], cols["booked"]
+        lf = np.divide(booked, seats, out=np.zeros(len(seats)), where=seats > 0)
+        out = []
+        for i in np.argsort(-booked, kind="stable")[:limit]:
+            src, dest = cols["source"][i], cols["destination"][i]
+            b, c = history.get((str(src).casefold(), str(dest).casefold()), (0, 0))
+            out.append(RouteRow(src, dest, int(cols["flights"][i]), int(seats[i]), int(booked[i]),
+                                float(lf[i]), int(b), int(c)))
+        return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Maintain the report summary tables.")
+    ap.add_argument("--rebuild", action="store_true", help="recompute from bookings and the audit log")
+    args = ap.parse_args(argv)
+    service = ReportService()
+    if args.rebuild:
+        service.rebuild_summaries()
+        print("summaries rebuilt")
+    else:
+        print(f"{service.refresh_summaries()} audit rows folded in")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# reports_window.py
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, QLineEdit, QPushButton,
+    QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox
+)
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer
+from PyQt5.QtGui import QPalette, QColor, QFont, QPainter, QPen, QPolygonF
+from db_worker import DbExecutor, BusyIndicator
+from data_store import get_store
+from reports import FULL_AT, ReportService
+
+BTN_CSS = """
+QPushButton {
+    font-size: 14px; padding: 10px 16px;
+    border-radius: 8px; background-color: #1976d2; color: white;
+}
+QPushButton:hover { background-color: #1565c0; }
+QPushButton:pressed { background-color: #0d47a1; }
+"""
+
+CARD_CSS = """
+QGroupBox {
+    border: 1px solid #e0e0e0; border-radius: 10px; margin-top: 10px;
+}
+QGroupBox::title {
+    subcontrol-origin: margin; left: 12px; padding: 0 6px;
+    color:#0d47a1; font-weight:600;
+}
+"""
+
+REFRESH_DEBOUNCE_MS = 2000   # booking bursts fold into one summary refresh
+
+BAR = QColor("#90caf9")
+LINE = QColor("#0d47a1")
+
+
+class BarChart(QWidget):
+    """Bars for a NumPy array, with an optional line (e.g. a moving average) drawn over them."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.values = None
+        self.line = None
+        self.labels = ("", "")
+        self.setMinimumHeight(220)
+
+    def set_data(self, values, line=None, labels=("", "")):
+        self.values, self.line, self.labels = values, line, labels
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), Qt.white)
+        if self.values is None or not len(self.values):
+            p.setPen(QColor("#90a4ae"))
+            p.drawText(self.rect(), Qt.AlignCenter, "No data")
+            p.end()
+            return
+        plot = QRectF(self.rect()).adjusted(40, 10, -10, -24)
+        top = max(float(self.values.max()), float(self.line.max()) if self.line is not None else 0, 1.0)
+        low = min(float(self.values.min()), 0.0)
+        span = top - low
+        n = len(self.values)
+        w = plot.width() / n
+
+        def y(v):
+            return plot.bottom() - (v - low) / span * plot.height()
+
+        p.setPen(Qt.NoPen)
+        p.setBrush(BAR)
+        for i, v in enumerate(self.values.tolist()):
+            p.drawRect(QRectF(plot.left() + i * w + w * 0.1, min(y(v), y(0)), max(w * 0.8, 1), abs(y(v) - y(0))))
+        if self.line is not None:
+            p.setPen(QPen(LINE, 2))
+            p.drawPolyline(QPolygonF([QPointF(plot.left() + (i + 0.5) * w, y(v))
+                                      for i, v in enumerate(self.line.tolist())]))
+        p.setPen(QColor("#607d8b"))
+        p.setFont(QFont("Segoe UI", 8))
+        p.drawText(QRectF(0, plot.top() - 6, 36, 12), Qt.AlignRight | Qt.AlignVCenter, f"{top:g}")
+        p.drawText(QRectF(0, y(0) - 6, 36, 12), Qt.AlignRight | Qt.AlignVCenter, "0")
+        p.drawText(QRectF(plot.left(), plot.bottom() + 4, plot.width() / 2, 16), Qt.AlignLeft, self.labels[0])
+        p.drawText(QRectF(plot.center().x(), plot.bottom() + 4, plot.width() / 2, 16), Qt.AlignRight,
+                   self.labels[1])
+        p.end()
+
+
+def _table(headers):
+    t = QTableWidget(0, len(headers))
+    t.setHorizontalHeaderLabels(headers)
+    t.setAlternatingRowColors(True)
+    t.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    t.setSelectionBehavior(QAbstractItemView.SelectRows)
+    t.verticalHeader().setVisible(False)
+    t.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    return t
+
+
+def _fill(table, rows):
+    table.setRowCount(len(rows))
+    for r, row in enumerate(rows):
+        for c, value in enumerate(row):
+            item = QTableWidgetItem(value)
+            if c and value[:1].isdigit():
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            table.setItem(r, c, item)
+
+
+class ReportsWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Reports")
+        self.setGeometry(300, 170, 1000, 660)
+
+        pal = self.palette()
+        pal.setColor(QPalette.Window, QColor(245, 248, 252))
+        self.setPalette(pal)
+
+        root = QVBoxLayout()
+        root.setContentsMargins(20, 20, 20, 20)
+        root.setSpacing(14)
+
+        head = QHBoxLayout()
+        title = QLabel("📊 Reports")
+        title.setFont(QFont("Segoe UI", 20, QFont.Bold))
+        title.setStyleSheet("color:#0d47a1;")
+        head.addWidget(title)
+        head.addStretch(1)
+        refresh_btn = QPushButton("Refresh"); refresh_btn.setStyleSheet(BTN_CSS)
+        head.addWidget(refresh_btn)
+        root.addLayout(head)
+
+        self.executor = DbExecutor(self)
+        self.service = ReportService()
+        self.store = get_store()
+        root.addWidget(BusyIndicator(self.executor))
+
+        tabs = QTabWidget()
+        root.addWidget(tabs, stretch=1)
+
+        # Load factor
+        lf_tab = QWidget(); lf_layout = QVBoxLayout(lf_tab)
+        self.lf_summary = QLabel(); self.lf_summary.setFont(QFont("Segoe UI", 11))
+        lf_layout.addWidget(self.lf_summary)
+        lf_card = QGroupBox("Flights by load factor"); lf_card.setStyleSheet(CARD_CSS)
+        self.lf_chart = BarChart()
+        QVBoxLayout(lf_card).addWidget(self.lf_chart)
+        lf_layout.addWidget(lf_card, stretch=1)
+        full_card = QGroupBox("Fullest flights"); full_card.setStyleSheet(CARD_CSS)
+        self.fullest = _table(["Flight ID", "Load factor"])
+        QVBoxLayout(full_card).addWidget(self.fullest)
+        lf_layout.addWidget(full_card, stretch=1)
+        tabs.addTab(lf_tab, "Load Factor")
+
+        # Bookings per day + per-flight booking curve
+        day_tab = QWidget(); day_layout = QVBoxLayout(day_tab)
+        day_card = QGroupBox("Net bookings per day (line: 7-day average)"); day_card.setStyleSheet(CARD_CSS)
+        self.day_chart = BarChart()
+        QVBoxLayout(day_card).addWidget(self.day_chart)
+        day_layout.addWidget(day_card, stretch=1)
+        curve_card = QGroupBox("Booking curve"); curve_card.setStyleSheet(CARD_CSS)
+        curve_layout = QVBoxLayout(curve_card)
+        curve_row = QHBoxLayout()
+        self.curve_flight = QLineEdit(); self.curve_flight.setPlaceholderText("Flight ID")
+        curve_btn = QPushButton("Show Curve"); curve_btn.setStyleSheet(BTN_CSS)
+        self.curve_info = QLabel()
+        curve_row.addWidget(self.curve_flight); curve_row.addWidget(curve_btn)
+        curve_row.addWidget(self.curve_info, 1)
+        curve_layout.addLayout(curve_row)
+        self.curve_chart = BarChart()
+        curve_layout.addWidget(self.curve_chart)
+        day_layout.addWidget(curve_card, stretch=1)
+        tabs.addTab(day_tab, "Bookings per Day")
+
+        # Top routes
+        self.routes = _table(["Route", "Flights", "Seats", "Booked", "Load factor", "Bookings made", "Cancelled"])
+        tabs.addTab(self.routes, "Top Routes")
+
+        self.setLayout(root)
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(REFRESH_DEBOUNCE_MS)
+        self._refresh_timer.timeout.connect(self.refresh)
+        refresh_btn.clicked.connect(self.refresh)
+        curve_btn.clicked.connect(self.show_curve)
+        self.curve_flight.returnPressed.connect(self.show_curve)
+        self.store.changed.connect(self._store_changed)
+        self.refresh()
+
+    # --- data ---
+    def _compute(self):
+        # worker thread: catch the summaries up, then read everything the tabs show
+        self.service.refresh_summaries()
+        return self.service.load_factor(), self.service.daily(), self.service.top_routes()
+
+    def refresh(self):
+        self.executor.submit(self._compute, key="reports", on_done=self._show, on_error=self._show_error)
+
+    def _store_changed(self, table, op, keys, version):
+        if table in ("bookings", "flights") and self.isVisible():
+            self._refresh_timer.start()
+
+    def _show(self, result):
+        lf, daily, routes = result
+        self.lf_summary.setText(
+            f"{lf.flights} flights · {lf.booked} of {lf.seats} seats booked ({lf.weighted:.1%}) · "
+            f"mean load factor {lf.mean:.1%} · {lf.full_share:.1%} of flights at least {FULL_AT:.0%} full")
+        self.lf_chart.set_data(lf.hist, labels=("0%", "100%"))
+        _fill(self.fullest, [(str(fid), f"{f:.1%}") for fid, f in lf.fullest])
+        if len(daily.days):
+            self.day_chart.set_data(daily.net, daily.average, (str(daily.days[0]), str(daily.days[-1])))
+        else:
+            self.day_chart.set_data(None)
+        _fill(self.routes, [(f"{r.source} → {r.destination}", str(r.flights), str(r.seats), str(r.booked),
+                             f"{r.load_factor:.1%}", str(r.bookings), str(r.cancellations)) for r in routes])
+
+    def show_curve(self):
+        text = self.curve_flight.text().strip()
+        if not text.isdigit():
+            QMessageBox.warning(self, "Invalid Input", "Enter a numeric Flight ID.")
+            return
+        self.executor.submit(self.service.booking_curve, int(text), key="curve",
+                             on_done=self._show_curve, on_error=self._show_error)
+
+    def _show_curve(self, curve):
+        if curve is None:
+            self.curve_info.setText("Flight not found.")
+            self.curve_chart.set_data(None)
+            return
+        if not len(curve.cumulative):
+            self.curve_info.setText(f"Flight {curve.flight_id}: no confirmed bookings.")
+            self.curve_chart.set_data(None)
+            return
+        self.curve_info.setText(f"Flight {curve.flight_id}: {curve.cumulative[-1]} of {curve.seats} seats booked")
+        self.curve_chart.set_data(curve.cumulative, labels=(f"{curve.days_before[0]} days before",
+                                                            f"{curve.days_before[-1]} days before"))
+
+    def _show_error(self, e):
+        QMessageBox.critical(self, "Error", str(e))
@@ -0,0 +1,195 @@
+-- schema_sqlite.sql
+-- SQLite port of dataset.sql (same tables, indexes and trigger behaviour).
+-- Loaded automatically by db_utils.SQLiteBackend when the file is new; older
+-- files are brought up to date by migrations/sqlite/ (PRAGMA user_version).
+-- A schema change here needs a migration there too.
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS flights (
+    flight_id INTEGER PRIMARY KEY AUTOINCREMENT,   -- AUTOINCREMENT: ids are never reused, like MySQL
+    flight_number VARCHAR(10),
+    source VARCHAR(30) COLLATE NOCASE,             -- MySQL's default collation is case-insensitive
+    destination VARCHAR(30) COLLATE NOCASE,
+    departure_time DATETIME,
+    arrival_time DATETIME,
+    seats INT,                  -- capacity; never changed by bookings
+    seats_booked INT DEFAULT 0, -- confirmed bookings, maintained only by the triggers below
+    seat_map BLOB,              -- bitset of taken seats (bit n-1 = seat n), maintained by BookingService
+    overbook INT NOT NULL DEFAULT 0  -- bookings sold beyond seats; they get a seat when one frees up
+);
+CREATE INDEX IF NOT EXISTS idx_flights_route ON flights (source, destination, departure_time);
+
+CREATE TABLE IF NOT EXISTS passengers (
+    passenger_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) COLLATE NOCASE,
+    gender VARCHAR(10),
+    age INT,
+    passport_no VARCHAR(20) COLLATE NOCASE
+);
+-- NOCASE indexes let LIKE 'prefix%' (case-insensitive, as in MySQL) use them
+CREATE UNIQUE INDEX IF NOT EXISTS uq_passengers_passport ON passengers (passport_no COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_passengers_name ON passengers (name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    passenger_id INT REFERENCES passengers(passenger_id),
+    flight_id INT REFERENCES flights(flight_id),
+    booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    status TEXT DEFAULT 'Confirmed' CHECK (status IN ('Confirmed', 'Cancelled')),
+    seat_no INT,                -- 1..seats, shown as 1A, 1B, ...
+    itinerary_id CHAR(36),      -- client UUID shared by the segments of one BookingService.book_itinerary
+    active_flag INT GENERATED ALWAYS AS (CASE WHEN status = 'Confirmed' THEN 1 END) STORED
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_bookings_active ON bookings (passenger_id, flight_id, active_flag);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_bookings_seat ON bookings (flight_id, seat_no, active_flag);
+CREATE INDEX IF NOT EXISTS idx_bookings_flight_status ON bookings (flight_id, status);
+CREATE INDEX IF NOT EXISTS idx_bookings_status_id ON bookings (status, booking_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_itinerary ON bookings (itinerary_id);
+
+-- Passengers waiting for a seat on a full flight (BookingService.join_waitlist)
+CREATE TABLE IF NOT EXISTS waitlist (
+    waitlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    flight_id INT NOT NULL REFERENCES flights(flight_id),
+    passenger_id INT NOT NULL REFERENCES passengers(passenger_id),
+    priority INT NOT NULL DEFAULT 0,
+    requested_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_waitlist_passenger ON waitlist (passenger_id, flight_id);
+CREATE INDEX IF NOT EXISTS idx_waitlist_flight ON waitlist (flight_id, waitlist_id);
+
+-- Bookings removed together with their flight or passenger (services.DeletionService).
+-- No foreign keys: the rows they pointed at are gone.
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    booking_id INTEGER PRIMARY KEY,
+    passenger_id INT,
+    flight_id INT,
+    booking_date DATETIME,
+    status TEXT CHECK (status IN ('Confirmed', 'Cancelled')),
+    seat_no INT,
+    itinerary_id CHAR(36),
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_archive_passenger ON bookings_archive (passenger_id);
+CREATE INDEX IF NOT EXISTS idx_archive_flight ON bookings_archive (flight_id);
+
+CREATE TABLE IF NOT EXISTS booking_audit_log (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    booking_id INT,
+    flight_id INT,              -- copied from the booking so reports need no join back to bookings
+    old_status TEXT CHECK (old_status IN ('Confirmed', 'Cancelled')),
+    new_status TEXT CHECK (new_status IN ('Confirmed', 'Cancelled')),
+    change_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    action_performed VARCHAR(50)
+);
+-- SQLite has no partitioning: audit.AuditLog.purge() deletes old rows in log_id batches
+CREATE INDEX IF NOT EXISTS idx_audit_booking ON booking_audit_log (booking_id, log_id);
+CREATE INDEX IF NOT EXISTS idx_audit_date ON booking_audit_log (change_date, log_id);
+
+-- Per-day, per-flight counts of audit rows removed by retention (audit.AuditLog.purge),
+-- so reports.rebuild_summaries and AuditLog.daily still see the history they summarise.
+CREATE TABLE IF NOT EXISTS booking_audit_daily (
+    day DATE,
+    flight_id INT NOT NULL DEFAULT 0,      -- 0: rows that carried no flight id
+    events INT NOT NULL DEFAULT 0,
+    booked INT NOT NULL DEFAULT 0,         -- entered 'Confirmed'
+    cancelled INT NOT NULL DEFAULT 0,      -- left 'Confirmed'
+    booked_gone INT NOT NULL DEFAULT 0,    -- bookings counted nowhere else: gone when purged, or deleted unlogged
+    PRIMARY KEY (day, flight_id)
+);
+
+-- Report summaries, advanced from booking_audit_log by reports.ReportService.refresh_summaries.
+-- booked counts bookings entering 'Confirmed', cancelled counts confirmed bookings leaving it.
+CREATE TABLE IF NOT EXISTS report_daily_bookings (
+    day DATE PRIMARY KEY,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS report_route_bookings (
+    source VARCHAR(30) COLLATE NOCASE,
+    destination VARCHAR(30) COLLATE NOCASE,
+    booked INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, destination)
+);
+CREATE TABLE IF NOT EXISTS report_state (
+    name VARCHAR(30) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0   -- highest booking_audit_log row folded into the summaries
+);
+INSERT OR IGNORE INTO report_state (name, last_log_id) VALUES ('audit', 0);
+-- Holes in booking_audit_log ids a refresh is waiting on (reports.ReportService._fold_limit)
+CREATE TABLE IF NOT EXISTS report_gaps (
+    log_id INTEGER PRIMARY KEY,
+    first_seen REAL NOT NULL    -- unix time the hole was first seen
+);
+
+-- Double bookings are rejected by uq_bookings_active (no trigger needed).
+
+-- Count a new confirmed booking
+CREATE TRIGGER IF NOT EXISTS after_booking_confirmed
+AFTER INSERT ON bookings
+FOR EACH ROW WHEN NEW.status = 'Confirmed'
+BEGIN
+    UPDATE flights SET seats_booked = seats_booked + 1 WHERE flight_id = NEW.flight_id;
+END;
+
+-- Prevent overbooking (writers already hold SQLite's write lock, so no FOR UPDATE needed)
+CREATE TRIGGER IF NOT EXISTS prevent_overbooking
+BEFORE INSERT ON bookings
+FOR EACH ROW
+WHEN (SELECT seats_booked >= seats + overbook FROM flights WHERE flight_id = NEW.flight_id)
+BEGIN
+    SELECT RAISE(ABORT, 'Cannot complete booking. Flight is fully booked.');
+END;
+
+-- Free the seat on cancellation
+CREATE TRIGGER IF NOT EXISTS after_booking_cancelled
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status = 'Confirmed' AND NEW.status = 'Cancelled'
+BEGIN
+    UPDATE flights SET seats_booked = seats_booked - 1 WHERE flight_id = NEW.flight_id;
+END;
+
+-- Free the seat when a confirmed booking row is removed outright
+CREATE TRIGGER IF NOT EXISTS after_booking_deleted
+AFTER DELETE ON bookings
+FOR EACH ROW WHEN OLD.status = 'Confirmed'
+BEGIN
+    UPDATE flights SET seats_booked = seats_booked - 1 WHERE flight_id = OLD.flight_id;
+END;
+
+-- Audit status changes (connections using audit.AuditWriter create temp table
+-- app_audit and write these rows, and the deletes below, in batches themselves;
+-- pragma_table_info finds temp tables too, unlike sqlite_master in a trigger)
+CREATE TRIGGER IF NOT EXISTS audit_booking_changes
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status IS NOT NEW.status
+    AND NOT EXISTS (SELECT 1 FROM pragma_table_info('app_audit'))
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NEW.status, 'Status Update');
+END;
+
+-- Audit new and removed bookings too, so the log is a complete change stream for the reports
+CREATE TRIGGER IF NOT EXISTS audit_booking_inserts
+AFTER INSERT ON bookings
+FOR EACH ROW
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, change_date, action_performed)
+    VALUES (NEW.booking_id, NEW.flight_id, NULL, NEW.status, COALESCE(NEW.booking_date, CURRENT_TIMESTAMP), 'Booked');
+END;
+
+CREATE TRIGGER IF NOT EXISTS audit_booking_deletes
+AFTER DELETE ON bookings
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM pragma_table_info('app_audit'))
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, flight_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.flight_id, OLD.status, NULL, 'Deleted');
+END;
+
+-- Passenger age must be at least 1
+CREATE TRIGGER IF NOT EXISTS validate_passenger_age
+BEFORE INSERT ON passengers
+FOR EACH ROW WHEN NEW.age < 1
+BEGIN
+    SELECT RAISE(ABORT, 'Passenger age must be at least 1 year.');
+END;
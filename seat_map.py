@@ -0,0 +1,109 @@
+# seat_map.py
+# Per-flight seat inventory as a bitset: bit n-1 is set when seat n is taken.
+#
+# The bitset is stored in flights.seat_map (little-endian bytes) and only
+# changed by BookingService while it holds the flight row lock, next to the
+# seats_booked counter. Seats are numbered 1..capacity, row by row, and shown
+# as "<row><letter>" (1A, 1B, ... 2A).
+SEATS_PER_ROW = 6
+LETTERS = "ABCDEF"
+AISLE_AFTER = 3       # seat-map view draws the aisle after C
+
+
+def seat_label(seat_no):
+    if seat_no is None:
+        return ""
+    row, col = divmod(int(seat_no) - 1, SEATS_PER_ROW)
+    return f"{row + 1}{LETTERS[col]}"
+
+
+def parse_seat(text):
+    """Seat number from "12C" or "67"; None for blank; ValueError if malformed."""
+    text = str(text or "").strip().upper()
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    row, letter = text[:-1], text[-1]
+    if not row.isdigit() or letter not in LETTERS or int(row) < 1:
+        raise ValueError(f"Bad seat {text!r}; use e.g. 12C")
+    return (int(row) - 1) * SEATS_PER_ROW + LETTERS.index(letter) + 1
+
+
+_group_starts = {}   # (capacity, k) -> mask of bit positions where a k-block fits inside one row
+
+
+def _starts_mask(capacity, k):
+    mask = _group_starts.get((capacity, k))
+    if mask is None:
+        mask = 0
+        for i in range(capacity - k + 1):
+            if i % SEATS_PER_ROW + k <= SEATS_PER_ROW:
+                mask |= 1 << i
+        _group_starts[(capacity, k)] = mask
+    return mask
+
+
+class SeatMap:
+    """Free/taken state for one flight. Every query is a few big-int bit operations."""
+
+    __slots__ = ("capacity", "bits")
+
+    def __init__(self, capacity, data=None):
+        self.capacity = int(capacity)
+        self.bits = int.from_bytes(data, "little") if data else 0
+
+    @property
+    def _full(self):
+        return (1 << self.capacity) - 1
+
+    def to_bytes(self):
+        return self.bits.to_bytes((self.capacity + 7) // 8, "little")
+
+    def is_taken(self, seat_no):
+        return bool(self.bits >> (seat_no - 1) & 1)
+
+    def taken_count(self):
+        return bin(self.bits).count("1")
+
+    def free_count(self):
+        return self.capacity - self.taken_count()
+
+    def next_free(self):
+        """Lowest free seat number, or None when full."""
+        free = ~self.bits & self._full
+        return (free & -free).bit_length() or None
+
+    def adjacent(self, k):
+        """First k side-by-side free seats in one row, as a list of seat numbers, or None."""
+        if k < 1 or k > SEATS_PER_ROW:
+            return None
+        free = ~self.bits & self._full
+        runs = free
+        for i in range(1, k):
+            runs &= free >> i          # bit j survives if seats j..j+i are all free
+        runs &= _starts_mask(self.capacity, k)
+        if not runs:
+            return None
+        first = (runs & -runs).bit_length()
+        return list(range(first, first + k))
+
+    def take(self, seat_no):
+        if not 1 <= seat_no <= self.capacity:
+            raise ValueError(f"Seat {seat_label(seat_no)} does not exist on this flight.")
+        if self.is_taken(seat_no):
+            raise ValueError(f"Seat {seat_label(seat_no)} is already taken.")
+        self.bits |= 1 << (seat_no - 1)
+
+    def release(self, seat_no):
+        if seat_no is not None and 1 <= seat_no <= self.capacity:
+            self.bits &= ~(1 << (seat_no - 1))
+
+    def allocate(self, seat_no=None):
+        """Take ``seat_no``, or the next free seat when None; returns the seat number."""
+        if seat_no is None:
+            seat_no = self.next_free()
+            if seat_no is None:
+                raise ValueError("No free seat left on this flight.")
+        self.take(seat_no)
+        return seat_no
@@ -0,0 +1,111 @@
+# seat_map_view.py
+from PyQt5.QtCore import Qt, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter
+from PyQt5.QtWidgets import QWidget
+
+from seat_map import AISLE_AFTER, LETTERS, SEATS_PER_ROW, seat_label
+
+CELL = 22
+GAP = 4
+AISLE = 16
+MARGIN = 30          # room for row numbers (left) and seat letters (top)
+
+FREE = QColor("#c8e6c9")
+TAKEN = QColor("#b0bec5")
+SELECTED = QColor("#1976d2")
+
+
+class SeatMapView(QWidget):
+    """Draws a flight's SeatMap straight from its bitset; click a free seat to pick it.
+
+    Only the rows inside the exposed rectangle are painted, so a long cabin
+    in a scroll area costs the same per repaint as a short one.
+    """
+
+    seat_clicked = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.seat_map = None
+        self.selected = None
+        self.setMouseTracking(True)
+
+    def set_map(self, seat_map):
+        self.seat_map = seat_map
+        if seat_map is None or (self.selected and seat_map.is_taken(self.selected)):
+            self.selected = None
+        self.updateGeometry()
+        self.adjustSize()
+        self.update()
+
+    def set_selected(self, seat_no):
+        self.selected = seat_no
+        self.update()
+
+    # --- geometry ---
+    def _rows(self):
+        return 0 if self.seat_map is None else -(-self.seat_map.capacity // SEATS_PER_ROW)
+
+    def sizeHint(self):
+        width = MARGIN + SEATS_PER_ROW * (CELL + GAP) + AISLE
+        return QSize(width, MARGIN + max(self._rows(), 1) * (CELL + GAP))
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
+
+    def _seat_rect(self, seat_no):
+        row, col = divmod(seat_no - 1, SEATS_PER_ROW)
+        x = MARGIN + col * (CELL + GAP) + (AISLE if col >= AISLE_AFTER else 0)
+        return QRect(x, MARGIN + row * (CELL + GAP), CELL, CELL)
+
+    def seat_at(self, pos):
+        if self.seat_map is None:
+            return None
+        row = (pos.y() - MARGIN) // (CELL + GAP)
+        for col in range(SEATS_PER_ROW):
+            seat_no = row * SEATS_PER_ROW + col + 1
+            if 1 <= seat_no <= self.seat_map.capacity and self._seat_rect(seat_no).contains(pos):
+                return seat_no
+        return None
+
+    # --- painting / input ---
+    def paintEvent(self, event):
+        if self.seat_map is None:
+            return
+        p = QPainter(self)
+        p.setFont(QFont("Segoe UI", 8))
+        p.setPen(QColor("#607d8b"))
+        for col, letter in enumerate(LETTERS):
+            r = self._seat_rect(col + 1)
+            p.drawText(QRect(r.x(), 0, CELL, MARGIN), Qt.AlignCenter, letter)
+        exposed = event.rect()
+        first = max(0, (exposed.top() - MARGIN) // (CELL + GAP))
+        last = min(self._rows() - 1, (exposed.bottom() - MARGIN) // (CELL + GAP))
+        bits = self.seat_map.bits
+        for row in range(first, last + 1):
+            p.setPen(QColor("#607d8b"))
+            p.drawText(QRect(0, MARGIN + row * (CELL + GAP), MARGIN - 4, CELL), Qt.AlignRight | Qt.AlignVCenter,
+                       str(row + 1))
+            p.setPen(Qt.NoPen)
+            for col in range(SEATS_PER_ROW):
+                seat_no = row * SEATS_PER_ROW + col + 1
+                if seat_no > self.seat_map.capacity:
+                    break
+                color = SELECTED if seat_no == self.selected else TAKEN if bits >> (seat_no - 1) & 1 else FREE
+                p.setBrush(color)
+                p.drawRoundedRect(self._seat_rect(seat_no), 4, 4)
+        p.end()
+
+    def mouseMoveEvent(self, event):
+        seat_no = self.seat_at(event.pos())
+        if seat_no is None:
+            self.setToolTip("")
+        else:
+            state = "taken" if self.seat_map.is_taken(seat_no) else "free"
+            self.setToolTip(f"{seat_label(seat_no)} ({state})")
+
+    def mousePressEvent(self, event):
+        seat_no = self.seat_at(event.pos())
+        if seat_no is not None and not self.seat_map.is_taken(seat_no):
+            self.set_selected(seat_no)
+            self.seat_clicked.emit(seat_no)
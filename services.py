@@ -0,0 +1,956 @@
+# services.py
+# GUI-free flight/passenger/booking operations. The manager windows call these
+# on the worker pool; scripts and load tests can call them directly.
+import heapq
+import uuid
+from collections import namedtuple
+from datetime import date, timedelta
+
+from db_utils import get_backend, get_connection
+from instrumentation import timed
+from seat_map import SEATS_PER_ROW, SeatMap, parse_seat
+
+
+class ServiceError(Exception):
+    title = "Error"
+
+    def __init__(self, message, title=None):
+        super().__init__(message)
+        if title is not None:
+            self.title = title
+
+
+class ValidationError(ServiceError):
+    title = "Invalid Input"
+
+
+class BookingRejected(ServiceError):
+    title = "No Seats"
+
+
+SEARCH_LIMIT = 20    # rows returned by prefix searches
+MAX_SEGMENTS = 8     # flights in one itinerary
+DELETE_BATCH = 500   # booking rows cancelled/archived per transaction when deleting flights or passengers
+DELETE_RETRIES = 3   # rounds of cleanup when bookings keep arriving for rows being deleted
+WAITLIST_LIMIT = 200 # entries returned by BookingService.waitlist
+INSERT_BATCH = 200   # rows per multi-row bookings INSERT (SQLite before 3.32 binds at most 999 values)
+
+BookingRequest = namedtuple("BookingRequest", "passenger_id flight_id")
+BookingResult = namedtuple("BookingResult", "request ok booking_id error")
+DeleteImpact = namedtuple("DeleteImpact", "found confirmed cancelled")
+DeleteResult = namedtuple("DeleteResult", "deleted cancelled archived")
+CancelResult = namedtuple("CancelResult", "flight_id promoted reseated")
+WaitlistEntry = namedtuple("WaitlistEntry", "waitlist_id passenger_id flight_id priority position")
+
+# --- change notification ---
+# Listeners are called as fn(table, op, keys) after a write has committed, on
+# whatever thread made the write. op is "insert", "update" or "delete"; keys
+# are primary keys of the affected rows.
+_listeners = []
+
+
+def add_change_listener(fn):
+    _listeners.append(fn)
+
+
+def remove_change_listener(fn):
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+
+def notify_change(table, op, keys):
+    keys = list(keys)
+    if not keys:
+        return
+    for fn in list(_listeners):
+        fn(table, op, keys)
+
+
+# --- app-side audit (audit.AuditWriter) ---
+# With a sink installed, booking status changes and deletes are reported here
+# after commit as (booking_id, flight_id, old_status, new_status, action), and
+# the DB triggers that would log them row by row stand down.
+_audit_sink = None
+
+
+def set_audit_sink(fn):
+    global _audit_sink
+    _audit_sink = fn
+
+
+def _audit(events):
+    if _audit_sink is not None and events:
+        _audit_sink(events)
+
+
+# --- waitlist heaps ---
+# The waitlist table is the record; each process keeps a heap per flight so
+# that promoting the next passenger costs O(log n) however long the list is.
+# A heap is only read or changed while its flight row is locked, and joining
+# a waitlist takes the same lock, so entries arrive in waitlist_id order.
+class WaitlistQueue:
+    """One flight's waitlist as a heap of (-priority, waitlist_id, passenger_id).
+
+    ``high`` is the highest waitlist_id read so far: entries added since
+    (by any process) are pulled in by id. Entries removed elsewhere stay in
+    the heap until promotion reaches them and finds their row gone.
+    """
+    __slots__ = ("heap", "high")
+
+    def __init__(self):
+        self.heap = []
+        self.high = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def extend(self, rows):
+        # rows: (waitlist_id, passenger_id, priority)
+        if not rows:
+            return
+        items = [(-prio, wid, pid) for wid, pid, prio in rows]
+        if self.heap:
+            for item in items:
+                heapq.heappush(self.heap, item)
+        else:
+            heapq.heapify(items)
+            self.heap = items
+        self.high = max(self.high, max(wid for wid, _, _ in rows))
+
+    def pop(self):
+        """(waitlist_id, passenger_id) of the first in line."""
+        _, wid, pid = heapq.heappop(self.heap)
+        return wid, pid
+
+
+_waitlists = {}   # flight_id -> WaitlistQueue, for the database of _waitlists_backend
+_waitlists_backend = None
+
+
+def _waitlist(cur, flight_id):
+    # the flight's heap, caught up with the table; the caller holds the flight row lock
+    global _waitlists_backend
+    if _waitlists_backend is not get_backend():
+        # set_backend() switched databases: the heaps describe the old one
+        _waitlists.clear()
+        _waitlists_backend = get_backend()
+    q = _waitlists.setdefault(flight_id, WaitlistQueue())
+    cur.execute("SELECT waitlist_id, passenger_id, priority FROM waitlist "
+                "WHERE flight_id=%s AND waitlist_id > %s FOR UPDATE", (flight_id, q.high))
+    q.extend(cur.fetchall())
+    return q
+
+
+def _forget_waitlists(flight_ids):
+    # after a rollback the heaps may be ahead of the table: read them again next time
+    for fid in flight_ids:
+        _waitlists.pop(fid, None)
+
+
+def _as_id(value):
+    if isinstance(value, int):
+        return value if value > 0 else None
+    value = str(value).strip()
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+def _marks(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _as_seat(value):
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return parse_seat(value)
+    except ValueError as e:
+        raise ValidationError(str(e))
+
+
+def _allocate(seat_map, seat_no=None):
+    # a seat number, or None for a booking sold on the overbooking allowance
+    # (it gets the next seat that frees up, see BookingService._promote)
+    if seat_no is None and seat_map.next_free() is None:
+        return None
+    return seat_map.allocate(seat_no)
+
+
+def _like_prefix(text):
+    # LIKE 'text%'; wildcards typed by the user are dropped rather than escaped
+    text = str(text or "").strip().replace("%", "").replace("_", "")
+    return text + "%" if text else ""
+
+
+# --- validation shared by the forms, the services and bulk loaders ---
+def validate_flight(flight_number, source, destination, departure, arrival, seats):
+    fn = str(flight_number or "").strip()
+    src = str(source or "").strip()
+    dest = str(destination or "").strip()
+    seats = str(seats if seats is not None else "").strip()
+    if not (fn and src and dest and seats.isdigit()):
+        raise ValidationError("Please fill all fields correctly.")
+    return fn, src, dest, str(departure), str(arrival), int(seats)
+
+
+def validate_passenger(name, gender, age, passport_no):
+    name = str(name or "").strip()
+    gender = str(gender or "").strip()
+    age = str(age if age is not None else "").strip()
+    passport_no = str(passport_no or "").strip()
+    if not (name and gender and age.isdigit() and passport_no):
+        raise ValidationError("Please fill all fields correctly.")
+    return name, gender, int(age), passport_no
+
+
+class FlightService:
+    def __init__(self, connection=get_connection):
+        self.connection = connection
+
+    @timed("flights.add")
+    def add(self, flight_number, source, destination, departure, arrival, seats):
+        values = validate_flight(flight_number, source, destination, departure, arrival, seats)
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("""
+                INSERT INTO flights (flight_number, source, destination, departure_time, arrival_time, seats)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, values)
+            con.commit()
+            flight_id = cur.lastrowid
+        notify_change("flights", "insert", [flight_id])
+        return flight_id
+
+    @timed("flights.delete")
+    def delete(self, flight_id, archive=True):
+        """Delete a flight after cancelling and archiving its bookings; returns a DeleteResult."""
+        return DeletionService(self.connection).delete("flights", [flight_id], archive=archive)
+
+    @timed("flights.set_overbook")
+    def set_overbook(self, flight_id, allowance):
+        """Let a flight sell ``allowance`` bookings beyond its seats; returns the booking ids promoted from its waitlist."""
+        fid = _as_id(flight_id)
+        allowance = str(allowance if allowance is not None else "").strip()
+        if fid is None or not allowance.isdigit():
+            raise ValidationError("Enter a valid Flight ID and a whole number of extra bookings.")
+        allowance = int(allowance)
+        with self.connection() as con:
+            cur = con.cursor()
+            locked = BookingService._lock_flights(cur, [fid])
+            if fid not in locked:
+                raise ServiceError(f"Flight {fid} does not exist.", title="Unknown Flight")
+            cur.execute("SELECT seats, seats_booked FROM flights WHERE flight_id=%s", (fid,))
+            seats, booked = cur.fetchone()
+            if allowance > seats:
+                raise ValidationError(f"Overbooking is limited to the flight's {seats} seats.")
+            if booked > seats + allowance:
+                raise ValidationError(f"{booked} bookings are already confirmed on a {seats}-seat flight; "
+                                      f"cancel some before lowering the allowance that far.")
+            cur.execute("UPDATE flights SET overbook=%s WHERE flight_id=%s", (allowance, fid))
+            maps = {fid: locked[fid][1]}
+            try:
+                promoted, reseated = BookingService._promote(cur, maps)
+                if promoted or reseated:
+                    BookingService._save_seat_maps(cur, maps)
+                con.commit()
+            except BaseException:
+                _forget_waitlists(maps)
+                raise
+        notify_change("bookings", "update", reseated)
+        notify_change("bookings", "insert", promoted)
+        notify_change("flights", "update", [fid])
+        return promoted
+
+    @timed("flights.search")
+    def search(self, source, destination, day, min_seats=1):
+        """Flights on a route departing on ``day`` (a date or 'YYYY-MM-DD') with at least min_seats sellable.
+
+        Sellable counts the overbooking allowance, as booking does.
+        """
+        start = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+        end = start + timedelta(days=1)
+        with self.connection() as con:
+            cur = con.cursor()
+            # served by idx_flights_route (source, destination, departure_time)
+            cur.execute("""
+                SELECT flight_id, flight_number, source, destination, departure_time, arrival_time,
+                       seats, seats_booked, overbook
+                FROM flights
+                WHERE source=%s AND destination=%s
+                  AND departure_time >= %s AND departure_time < %s
+                  AND seats + overbook - seats_booked >= %s
+                ORDER BY departure_time
+            """, (source.strip(), destination.strip(), start.isoformat(), end.isoformat(), min_seats))
+            return cur.fetchall()
+
+
+    @timed("flights.connections")
+    def connections(self, source, destination, departure, max_stops=2):
+        """Itineraries from source to destination leaving at or after ``departure``; see ConnectionFinder.itineraries.
+
+        One per number of stops that arrives earlier than any with fewer, so
+        the last is the earliest arrival. Each can be passed to
+        BookingService.book_itinerary as it is.
+        """
+        from connections import get_finder    # connections imports this module
+        source, destination = str(source or "").strip(), str(destination or "").strip()
+        if not source or not destination:
+            raise ValidationError("Enter both a source and a destination.")
+        if source == destination:
+            raise ValidationError("Source and destination must differ.")
+        if not str(max_stops).isdigit() or int(max_stops) > MAX_SEGMENTS - 1:
+            raise ValidationError(f"Stops must be a whole number up to {MAX_SEGMENTS - 1}.")
+        try:
+            return get_finder().itineraries(source, destination, departure, int(max_stops))
+        except ValueError:
+            raise ValidationError("Departure must be a date/time like 2030-01-01 10:00.")
+
+
+class PassengerService:
+    def __init__(self, connection=get_connection):
+        self.connection = connection
+
+    @timed("passengers.add")
+    def add(self, name, gender, age, passport_no):
+        values = validate_passenger(name, gender, age, passport_no)
+        with self.connection() as con:
+            cur = con.cursor()
+            try:
+                cur.execute("""
+                    INSERT INTO passengers (name, gender, age, passport_no)
+                    VALUES (%s, %s, %s, %s)
+                """, values)
+            except get_backend().integrity_errors:
+                raise ValidationError("A passenger with this passport number already exists.",
+                                      title="Duplicate Passport")
+            con.commit()
+            passenger_id = cur.lastrowid
+        notify_change("passengers", "insert", [passenger_id])
+        return passenger_id
+
+    @timed("passengers.search")
+    def search(self, text, limit=SEARCH_LIMIT):
+        """Passengers whose name or passport number starts with ``text``: (id, name, passport_no) rows."""
+        prefix = _like_prefix(text)
+        if not prefix:
+            return []
+        with self.connection() as con:
+            cur = con.cursor()
+            # two index range scans (idx_passengers_name, uq_passengers_passport), each already sorted
+            cur.execute("SELECT passenger_id, name, passport_no FROM passengers "
+                        "WHERE passport_no LIKE %s ORDER BY passport_no LIMIT %s", (prefix, limit))
+            rows = cur.fetchall()
+            cur.execute("SELECT passenger_id, name, passport_no FROM passengers "
+                        "WHERE name LIKE %s ORDER BY name LIMIT %s", (prefix, limit))
+            seen = {r[0] for r in rows}
+            rows += [r for r in cur.fetchall() if r[0] not in seen]
+        return rows[:limit]
+
+    @timed("passengers.delete")
+    def delete(self, passenger_id, archive=True):
+        """Delete a passenger after cancelling and archiving their bookings; returns a DeleteResult."""
+        return DeletionService(self.connection).delete("passengers", [passenger_id], archive=archive)
+
+
+class BookingService:
+    def __init__(self, connection=get_connection):
+        self.connection = connection
+
+    # --- seat inventory (flights.seat_map, see seat_map.py) ---
+    @staticmethod
+    def _lock_flights(cur, flight_ids):
+        # Lock the flight rows in id order (so two multi-flight transactions
+        # can't deadlock) and keep them locked until commit: nobody can take the
+        # last seat, or the same seat, between our check and our insert.
+        # the first value is what can still be sold, overbooking allowance included
+        cur.execute(f"SELECT flight_id, seats + overbook - seats_booked, seats, seat_map FROM flights "
+                    f"WHERE flight_id IN ({_marks(flight_ids)}) ORDER BY flight_id FOR UPDATE",
+                    tuple(flight_ids))
+        return {fid: (free, SeatMap(seats, data)) for fid, free, seats, data in cur.fetchall()}
+
+    @staticmethod
+    def _save_seat_maps(cur, maps):
+        # one statement however many flights changed
+        items = sorted(maps.items())
+        if not items:
+            return
+        cases = " ".join(["WHEN %s THEN %s"] * len(items))
+        cur.execute(f"UPDATE flights SET seat_map = CASE flight_id {cases} END WHERE flight_id IN ({_marks(items)})",
+                    tuple(v for fid, m in items for v in (fid, m.to_bytes())) + tuple(fid for fid, _ in items))
+
+    @staticmethod
+    def _insert_bookings(cur, rows):
+        # rows: (passenger_id, flight_id, seat_no, itinerary_id); multi-row INSERTs of up to INSERT_BATCH
+        # rows, ids in row order. seats_booked is bumped per row by the after_booking_confirmed trigger.
+        ids = []
+        for start in range(0, len(rows), INSERT_BATCH):
+            chunk = rows[start:start + INSERT_BATCH]
+            cur.execute("INSERT INTO bookings (passenger_id, flight_id, seat_no, itinerary_id) VALUES "
+                        + ", ".join(["(%s, %s, %s, %s)"] * len(chunk)), tuple(v for row in chunk for v in row))
+            ids += get_backend().inserted_ids(cur, len(chunk))
+        return ids
+
+    def seat_map(self, flight_id):
+        """The flight's SeatMap, or None if there is no such flight."""
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT seats, seat_map FROM flights WHERE flight_id=%s", (flight_id,))
+            r = cur.fetchone()
+        return SeatMap(r[0], r[1]) if r else None
+
+    @timed("bookings.book")
+    def book(self, passenger_id, flight_id, return_flight_id=None, seat=None, return_seat=None):
+        """Book one passenger (and optionally the return leg); returns the booking ids.
+
+        ``seat``/``return_seat`` pick a specific seat ("12C" or a number);
+        left out, the lowest free seat is assigned.
+        """
+        if _as_id(passenger_id) is None or _as_id(flight_id) is None:
+            raise ValidationError("Enter valid numeric Passenger ID and Flight ID.")
+        segments = [(flight_id, seat)]
+        if return_flight_id is not None:
+            if _as_id(return_flight_id) is None:
+                raise ValidationError("Enter valid Return Flight ID.")
+            segments.append((return_flight_id, return_seat))
+        return self.book_itinerary(passenger_id, segments)[1]
+
+    @timed("bookings.book_itinerary")
+    def book_itinerary(self, passenger_id, segments, itinerary_id=None):
+        """Book one passenger on every segment, all or nothing; returns (itinerary_id, booking_ids).
+
+        ``segments`` are flight ids or (flight_id, seat) pairs in travel order,
+        or an itinerary found by FlightService.connections.
+        All input is checked before the transaction starts, which is then the
+        same four statements (lock, insert, seat maps, commit) for any number
+        of segments. ``itinerary_id`` is a client-chosen UUID; booking it again
+        returns the bookings it already made instead of failing.
+        """
+        pid = _as_id(passenger_id)
+        if pid is None:
+            raise ValidationError("Enter a valid numeric Passenger ID.")
+        legs = []
+        for n, segment in enumerate(getattr(segments, "legs", segments), 1):
+            if hasattr(segment, "flight_id"):
+                fid, seat = segment.flight_id, None
+            else:
+                fid, seat = segment if isinstance(segment, (tuple, list)) else (segment, None)
+            if _as_id(fid) is None:
+                raise ValidationError(f"Enter a valid Flight ID for segment {n}.")
+            legs.append((_as_id(fid), _as_seat(seat)))
+        if not legs:
+            raise ValidationError("An itinerary needs at least one flight.")
+        if len(legs) > MAX_SEGMENTS:
+            raise ValidationError(f"An itinerary can have at most {MAX_SEGMENTS} flights.")
+        flight_ids = sorted({fid for fid, _ in legs})
+        if len(flight_ids) != len(legs):
+            raise ValidationError("The same flight appears twice in the itinerary.")
+        replayable = itinerary_id is not None
+        try:
+            itinerary_id = str(uuid.UUID(str(itinerary_id))) if replayable else str(uuid.uuid4())
+        except ValueError:
+            raise ValidationError("Itinerary id must be a UUID.")
+
+        with self.connection() as con:
+            cur = con.cursor()
+            # flights in id order (see _lock_flights); the passenger check rides along unlocked
+            cur.execute(f"SELECT flight_id, seats + overbook - seats_booked, seats, seat_map, "
+                        f"(SELECT COUNT(*) FROM passengers WHERE passenger_id=%s) FROM flights "
+                        f"WHERE flight_id IN ({_marks(flight_ids)}) ORDER BY flight_id FOR UPDATE",
+                        (pid,) + tuple(flight_ids))
+            rows = cur.fetchall()
+            locked = {fid: (free, SeatMap(seats, data)) for fid, free, seats, data, _ in rows}
+            for fid in flight_ids:
+                if fid not in locked:
+                    raise BookingRejected(f"Flight {fid} does not exist.", title="Unknown Flight")
+            if not rows[0][4]:
+                raise BookingRejected(f"Passenger {pid} does not exist.", title="Unknown Passenger")
+            try:
+                inserts = []
+                for fid, seat in legs:
+                    free, seat_map = locked[fid]
+                    if free < 1:
+                        raise BookingRejected(f"No seats available on flight {fid}.")
+                    try:
+                        seat_no = _allocate(seat_map, seat)
+                    except ValueError as e:
+                        raise BookingRejected(f"Flight {fid}: {e}", title="Seat Unavailable")
+                    inserts.append((pid, fid, seat_no, itinerary_id))
+                try:
+                    booking_ids = self._insert_bookings(cur, inserts)
+                except get_backend().integrity_errors:
+                    raise BookingRejected("Passenger already has a confirmed booking on one of these flights.",
+                                          title="Already Booked")
+            except BookingRejected:
+                # a retry of an itinerary that did go through finds its own seats taken
+                con.rollback()
+                previous = self._itinerary_bookings(cur, itinerary_id) if replayable else None
+                if previous and sorted(previous) == flight_ids:
+                    return itinerary_id, [previous[fid] for fid, _ in legs]
+                raise
+            self._save_seat_maps(cur, {fid: locked[fid][1] for fid in flight_ids})
+            con.commit()
+        notify_change("bookings", "insert", booking_ids)
+        notify_change("flights", "update", flight_ids)
+        return itinerary_id, booking_ids
+
+    @staticmethod
+    def _itinerary_bookings(cur, itinerary_id):
+        # flight_id -> booking_id of the itinerary's confirmed segments
+        cur.execute("SELECT flight_id, booking_id FROM bookings WHERE itinerary_id=%s AND status='Confirmed'",
+                    (itinerary_id,))
+        return dict(cur.fetchall())
+
+    @timed("bookings.book_group")
+    def book_group(self, passenger_ids, flight_id):
+        """Book several passengers on one flight in side-by-side seats; returns the booking ids."""
+        pids = [_as_id(p) for p in passenger_ids]
+        fid = _as_id(flight_id)
+        if not pids or None in pids or fid is None:
+            raise ValidationError("Enter valid numeric Passenger IDs and Flight ID.")
+        if len(set(pids)) != len(pids):
+            raise ValidationError("A passenger is listed twice.")
+        if len(pids) > SEATS_PER_ROW:
+            raise ValidationError(f"At most {SEATS_PER_ROW} passengers can sit side by side.")
+        with self.connection() as con:
+            cur = con.cursor()
+            locked = self._lock_flights(cur, [fid])
+            if fid not in locked or locked[fid][0] < len(pids):
+                raise BookingRejected("Not enough seats available on this flight.")
+            seat_map = locked[fid][1]
+            seats = seat_map.adjacent(len(pids))
+            if seats is None:
+                raise BookingRejected(f"No {len(pids)} adjacent seats left on this flight.",
+                                      title="Seat Unavailable")
+            for seat_no in seats:
+                seat_map.take(seat_no)
+            try:
+                booking_ids = self._insert_bookings(cur, [(p, fid, n, None) for p, n in zip(pids, seats)])
+            except get_backend().integrity_errors:
+                raise BookingRejected("One of these passengers already has a confirmed booking on this flight.",
+                                      title="Already Booked")
+            self._save_seat_maps(cur, {fid: seat_map})
+            con.commit()
+        notify_change("bookings", "insert", booking_ids)
+        notify_change("flights", "update", [fid])
+        return booking_ids
+
+    @timed("bookings.book_many")
+    def book_many(self, requests):
+        """Book a batch in one transaction; returns one BookingResult per request, in order.
+
+        Rejected items (bad ids, unknown passenger/flight, duplicates, no seats)
+        do not abort the batch.
+        """
+        requests = [r if isinstance(r, BookingRequest) else BookingRequest(*r) for r in requests]
+        results = [None] * len(requests)
+        wanted = []   # (index, passenger_id, flight_id)
+        seen = set()
+        for i, req in enumerate(requests):
+            pid, fid = _as_id(req.passenger_id), _as_id(req.flight_id)
+            if pid is None or fid is None:
+                results[i] = BookingResult(req, False, None, "Invalid passenger or flight id.")
+            elif (pid, fid) in seen:
+                results[i] = BookingResult(req, False, None, "Duplicate request in batch.")
+            else:
+                seen.add((pid, fid))
+                wanted.append((i, pid, fid))
+        if not wanted:
+            return results
+
+        flight_ids = sorted({fid for _, _, fid in wanted})
+        passenger_ids = sorted({pid for _, pid, _ in wanted})
+        with self.connection() as con:
+            cur = con.cursor()
+            # lock every affected flight once, in id order
+            locked = self._lock_flights(cur, flight_ids)
+            seats = {f: n for f, (n, _) in locked.items()}
+            maps = {f: m for f, (_, m) in locked.items()}
+            cur.execute(f"SELECT passenger_id FROM passengers WHERE passenger_id IN ({_marks(passenger_ids)})",
+                        tuple(passenger_ids))
+            known = {r[0] for r in cur.fetchall()}
+            cur.execute(f"SELECT passenger_id, flight_id FROM bookings "
+                        f"WHERE flight_id IN ({_marks(flight_ids)}) AND passenger_id IN ({_marks(passenger_ids)}) "
+                        f"AND status='Confirmed'", tuple(flight_ids) + tuple(passenger_ids))
+            existing = set(cur.fetchall())
+
+            accepted = []
+            taken = {}
+            for i, pid, fid in wanted:
+                req = requests[i]
+                if fid not in seats:
+                    results[i] = BookingResult(req, False, None, "Unknown flight.")
+                elif pid not in known:
+                    results[i] = BookingResult(req, False, None, "Unknown passenger.")
+                elif (pid, fid) in existing:
+                    results[i] = BookingResult(req, False, None, "Passenger already booked on this flight.")
+                elif seats[fid] - taken.get(fid, 0) < 1:
+                    results[i] = BookingResult(req, False, None, "No seats available.")
+                else:
+                    taken[fid] = taken.get(fid, 0) + 1
+                    accepted.append((i, pid, fid, _allocate(maps[fid])))
+            if not accepted:
+                con.rollback()
+                return results
+
+            booking_ids = self._insert_bookings(cur, [(pid, fid, seat_no, None) for _, pid, fid, seat_no in accepted])
+            self._save_seat_maps(cur, {f: maps[f] for f in taken})
+            con.commit()
+
+        for (i, _, _, _), booking_id in zip(accepted, booking_ids):
+            results[i] = BookingResult(requests[i], True, booking_id, None)
+        notify_change("bookings", "insert", booking_ids)
+        notify_change("flights", "update", sorted(taken))
+        return results
+
+    # --- waitlist ---
+    @staticmethod
+    def _promote(cur, locked):
+        """Fill room that opened up on locked flights; returns (promoted booking ids, reseated booking ids).
+
+        ``locked`` maps flight_id -> SeatMap, already updated for the seats
+        this transaction freed. Free seats go first to confirmed bookings
+        sold on the overbooking allowance, then the waitlist is promoted, in
+        priority order, while the flight has room. The caller saves the seat
+        maps when either list is non-empty.
+        """
+        if not locked:
+            return [], []
+        flight_ids = sorted(locked)
+        cur.execute(f"SELECT flight_id, seats + overbook - seats_booked FROM flights "
+                    f"WHERE flight_id IN ({_marks(flight_ids)})", tuple(flight_ids))
+        room = dict(cur.fetchall())
+        promoted, reseated = [], []
+        for fid in flight_ids:
+            seat_map = locked[fid]
+            free = seat_map.free_count()
+            if free:
+                # uq_bookings_seat (flight_id, seat_no, ...): the seatless rows of one flight
+                cur.execute("SELECT booking_id FROM bookings WHERE flight_id=%s AND seat_no IS NULL "
+                            "AND status='Confirmed' ORDER BY booking_id LIMIT %s", (fid, free))
+                for (bid,) in cur.fetchall():
+                    cur.execute("UPDATE bookings SET seat_no=%s WHERE booking_id=%s", (seat_map.allocate(), bid))
+                    reseated.append(bid)
+            if room.get(fid, 0) < 1:
+                continue
+            queue = _waitlist(cur, fid)
+            while room[fid] > 0 and queue:
+                wid, pid = queue.pop()
+                cur.execute("DELETE FROM waitlist WHERE waitlist_id=%s", (wid,))
+                if cur.rowcount == 0:
+                    continue      # left the waitlist, or promoted by another process
+                seat_no = _allocate(seat_map)
+                try:
+                    promoted += BookingService._insert_bookings(cur, [(pid, fid, seat_no, None)])
+                except get_backend().integrity_errors:
+                    seat_map.release(seat_no)
+                    continue      # booked this flight directly while waiting
+                room[fid] -= 1
+        return promoted, reseated
+
+    @timed("bookings.join_waitlist")
+    def join_waitlist(self, passenger_id, flight_id, priority=0):
+        """Queue a passenger for a full flight; returns a WaitlistEntry (position 1 = next to be promoted).
+
+        Higher ``priority`` goes first; equal priorities in the order they joined.
+        """
+        pid, fid = _as_id(passenger_id), _as_id(flight_id)
+        if pid is None or fid is None:
+            raise ValidationError("Enter valid numeric Passenger ID and Flight ID.")
+        try:
+            priority = int(priority)
+        except (TypeError, ValueError):
+            raise ValidationError("Priority must be a whole number.")
+        with self.connection() as con:
+            cur = con.cursor()
+            # the flight lock orders joins against promotions (see WaitlistQueue)
+            locked = self._lock_flights(cur, [fid])
+            if fid not in locked:
+                raise BookingRejected(f"Flight {fid} does not exist.", title="Unknown Flight")
+            if locked[fid][0] > 0:
+                raise BookingRejected(f"Flight {fid} still has seats; book it instead.", title="Seats Available")
+            cur.execute("SELECT (SELECT COUNT(*) FROM passengers WHERE passenger_id=%s), "
+                        "(SELECT COUNT(*) FROM bookings WHERE passenger_id=%s AND flight_id=%s "
+                        "AND status='Confirmed')", (pid, pid, fid))
+            known, booked = cur.fetchone()
+            if not known:
+                raise BookingRejected(f"Passenger {pid} does not exist.", title="Unknown Passenger")
+            if booked:
+                raise BookingRejected("Passenger already has a confirmed booking on this flight.",
+                                      title="Already Booked")
+            try:
+                cur.execute("INSERT INTO waitlist (flight_id, passenger_id, priority) VALUES (%s, %s, %s)",
+                            (fid, pid, priority))
+            except get_backend().integrity_errors:
+                raise BookingRejected("Passenger is already on this flight's waitlist.", title="Already Waitlisted")
+            wid = cur.lastrowid
+            cur.execute("SELECT COUNT(*) FROM waitlist WHERE flight_id=%s "
+                        "AND (priority > %s OR (priority = %s AND waitlist_id < %s))", (fid, priority, priority, wid))
+            ahead = cur.fetchone()[0]
+            con.commit()
+        notify_change("waitlist", "insert", [wid])
+        return WaitlistEntry(wid, pid, fid, priority, ahead + 1)
+
+    @timed("bookings.leave_waitlist")
+    def leave_waitlist(self, passenger_id, flight_id):
+        """Take a passenger off a flight's waitlist; returns whether they were on it."""
+        pid, fid = _as_id(passenger_id), _as_id(flight_id)
+        if pid is None or fid is None:
+            raise ValidationError("Enter valid numeric Passenger ID and Flight ID.")
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT waitlist_id FROM waitlist WHERE passenger_id=%s AND flight_id=%s FOR UPDATE",
+                        (pid, fid))
+            r = cur.fetchone()
+            if r:
+                # the heap entry goes when promotion reaches it
+                cur.execute("DELETE FROM waitlist WHERE waitlist_id=%s", (r[0],))
+            con.commit()
+        if r:
+            notify_change("waitlist", "delete", [r[0]])
+        return r is not None
+
+    def waitlist(self, flight_id, limit=WAITLIST_LIMIT):
+        """The first ``limit`` WaitlistEntry rows of a flight, in promotion order."""
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT waitlist_id, passenger_id, flight_id, priority FROM waitlist WHERE flight_id=%s "
+                        "ORDER BY priority DESC, waitlist_id LIMIT %s", (flight_id, limit))
+            return [WaitlistEntry(*r, n) for n, r in enumerate(cur.fetchall(), 1)]
+
+    @timed("bookings.cancel")
+    def cancel(self, booking_id):
+        """Cancel a booking and give its place to the waitlist; returns a CancelResult."""
+        # a status transition, so after_booking_cancelled frees the seat count and
+        # audit_booking_changes records it; the seat itself is freed in seat_map here
+        with self.connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT flight_id FROM bookings WHERE booking_id=%s", (booking_id,))
+            r = cur.fetchone()
+            if not r:
+                raise ServiceError("Booking not found or already cancelled.")
+            flight_id = r[0]
+            # flight row first, then the booking: the same order book() takes them in
+            maps = {f: m for f, (_, m) in self._lock_flights(cur, [flight_id]).items()}
+            cur.execute("SELECT seat_no FROM bookings WHERE booking_id=%s AND status='Confirmed' FOR UPDATE",
+                        (booking_id,))
+            r = cur.fetchone()
+            if not r:
+                raise ServiceError("Booking not found or already cancelled.")
+            cur.execute("UPDATE bookings SET status='Cancelled' WHERE booking_id=%s", (booking_id,))
+            try:
+                if flight_id in maps:
+                    maps[flight_id].release(r[0])
+                # same transaction: the freed place is never up for grabs
+                promoted, reseated = self._promote(cur, maps)
+                if r[0] is not None or promoted or reseated:
+                    self._save_seat_maps(cur, maps)
+                con.commit()
+            except BaseException:
+                _forget_waitlists(maps)
+                raise
+        _audit([(booking_id, flight_id, "Confirmed", "Cancelled", "Status Update")])
+        notify_change("bookings", "update", [booking_id] + reseated)
+        notify_change("bookings", "insert", promoted)
+        notify_change("flights", "update", [flight_id])
+        return CancelResult(flight_id, promoted, reseated)
+
+    @timed("bookings.cancel_flight")
+    def cancel_flight(self, flight_id):
+        """Cancel every confirmed booking on a flight in one statement, and its waitlist; returns the booking ids."""
+        with self.connection() as con:
+            cur = con.cursor()
+            locked = self._lock_flights(cur, [flight_id])
+            cur.execute("SELECT booking_id FROM bookings WHERE flight_id=%s AND status='Confirmed' FOR UPDATE",
+                        (flight_id,))
+            ids = [r[0] for r in cur.fetchall()]
+            if ids:
+                cur.execute("UPDATE bookings SET status='Cancelled' WHERE flight_id=%s AND status='Confirmed'",
+                            (flight_id,))
+                # every confirmed booking is gone, so every seat is free again
+                self._save_seat_maps(cur, {f: SeatMap(m.capacity) for f, (_, m) in locked.items()})
+            # the flight lock keeps anyone from joining in between (see join_waitlist)
+            cur.execute("SELECT waitlist_id FROM waitlist WHERE flight_id=%s", (flight_id,))
+            waiting = [r[0] for r in cur.fetchall()]
+            if waiting:
+                cur.execute("DELETE FROM waitlist WHERE flight_id=%s", (flight_id,))
+            con.commit()
+        _forget_waitlists([flight_id])
+        _audit([(bid, flight_id, "Confirmed", "Cancelled", "Status Update") for bid in ids])
+        if ids:
+            notify_change("bookings", "update", ids)
+            notify_change("flights", "update", [flight_id])
+        notify_change("waitlist", "delete", waiting)
+        return ids
+
+
+class DeletionService:
+    """Deletes flights or passengers together with the bookings that reference them.
+
+    The bookings go first, ``batch`` rows per transaction: confirmed ones are
+    cancelled (freeing their seats, and audited like any cancellation), then
+    every row is copied to bookings_archive unless ``archive`` is off, and
+    removed. No transaction touches more than ``batch`` bookings, so deleting
+    a busy flight or a frequent flyer never holds locks on a large part of
+    the bookings table. The parent rows are deleted last, ``batch`` at a time.
+    """
+    PARENTS = {"flights": "flight_id", "passengers": "passenger_id"}
+
+    def __init__(self, connection=get_connection, batch=DELETE_BATCH):
+        self.connection = connection
+        self.batch = max(int(batch), 1)
+
+    def _key(self, table):
+        if table not in self.PARENTS:
+            raise ValidationError(f"Cannot delete from {table}.")
+        return self.PARENTS[table]
+
+    @staticmethod
+    def _ids(ids):
+        ids = sorted({_as_id(i) for i in ids} - {None})
+        if not ids:
+            raise ValidationError("Select at least one row to delete.")
+        return ids
+
+    @timed("delete.impact")
+    def impact(self, table, ids):
+        """What deleting ``ids`` from ``table`` would touch: a DeleteImpact of row counts."""
+        key, ids = self._key(table), self._ids(ids)
+        found = confirmed = cancelled = 0
+        with self.connection() as con:
+            cur = con.cursor()
+            for i in range(0, len(ids), self.batch):
+                chunk = ids[i:i + self.batch]
+                cur.execute(f"SELECT COUNT(*) FROM {table} WHERE {key} IN ({_marks(chunk)})", tuple(chunk))
+                found += cur.fetchone()[0]
+                # leading column of idx_bookings_flight_status / uq_bookings_active
+                cur.execute(f"SELECT status, COUNT(*) FROM bookings WHERE {key} IN ({_marks(chunk)}) "
+                            f"GROUP BY status", tuple(chunk))
+                counts = dict(cur.fetchall())
+                confirmed += counts.get("Confirmed", 0)
+                cancelled += counts.get("Cancelled", 0)
+        return DeleteImpact(found, confirmed, cancelled)
+
+    def _clear_bookings(self, cur, key, ids, archive):
+        # one batch: returns (booking ids removed, how many were confirmed, flights whose seats changed,
+        # audit events, bookings promoted from waitlists)
+        cur.execute(f"SELECT booking_id, flight_id FROM bookings WHERE {key} IN ({_marks(ids)}) "
+                    f"ORDER BY booking_id LIMIT %s", tuple(ids) + (self.batch,))
+        rows = cur.fetchall()
+        if not rows:
+            return [], 0, [], [], []
+        booking_ids = [r[0] for r in rows]
+        # flight rows first, then the bookings: the same order book() takes them in
+        locked = BookingService._lock_flights(cur, sorted({r[1] for r in rows}))
+        cur.execute(f"SELECT booking_id, flight_id, seat_no FROM bookings "
+                    f"WHERE booking_id IN ({_marks(booking_ids)}) AND status='Confirmed' FOR UPDATE",
+                    tuple(booking_ids))
+        confirmed = cur.fetchall()
+        changed = {}
+        if confirmed:
+            cur.execute(f"UPDATE bookings SET status='Cancelled' "
+                        f"WHERE booking_id IN ({_marks(confirmed)}) AND status='Confirmed'",
+                        tuple(r[0] for r in confirmed))
+            for _, fid, seat_no in confirmed:
+                if fid in locked and seat_no is not None:
+                    locked[fid][1].release(seat_no)
+                    changed[fid] = locked[fid][1]
+        promoted = []
+        if confirmed and key == "passenger_id":
+            # the seats a deleted passenger held go to the waitlists of their flights
+            freed = {fid for _, fid, _ in confirmed}
+            maps = {fid: m for fid, (_, m) in locked.items() if fid in freed}
+            promoted, reseated = BookingService._promote(cur, maps)
+            if promoted or reseated:
+                changed.update(maps)
+        BookingService._save_seat_maps(cur, changed)
+        if archive:
+            cur.execute(f"INSERT INTO bookings_archive (booking_id, passenger_id, flight_id, booking_date, "
+                        f"status, seat_no, itinerary_id) SELECT booking_id, passenger_id, flight_id, booking_date, "
+                        f"status, seat_no, itinerary_id FROM bookings WHERE booking_id IN ({_marks(booking_ids)})",
+                        tuple(booking_ids))
+        else:
+            self._count_unlogged(cur, booking_ids)
+        cur.execute(f"DELETE FROM bookings WHERE booking_id IN ({_marks(booking_ids)})", tuple(booking_ids))
+        # every row is 'Cancelled' by the time it is deleted
+        events = [(bid, fid, "Confirmed", "Cancelled", "Status Update") for bid, fid, _ in confirmed]
+        events += [(bid, fid, "Cancelled", None, "Deleted") for bid, fid in rows]
+        return booking_ids, len(confirmed), sorted({r[1] for r in confirmed}), events, promoted
+
+    @staticmethod
+    def _count_unlogged(cur, booking_ids):
+        # ReportService.rebuild_summaries() counts a booking by its row, or by its 'Booked' audit row once
+        # the booking is gone. A booking from before the log, or whose audit row audit.AuditLog.purge()
+        # has rolled up, would be counted by neither, so it goes into the daily rollup as it is deleted.
+        cur.execute(f"SELECT DATE(b.booking_date), COALESCE(b.flight_id, 0), COUNT(*) FROM bookings b "
+                    f"WHERE b.booking_id IN ({_marks(booking_ids)}) AND NOT EXISTS (SELECT 1 FROM "
+                    f"booking_audit_log a WHERE a.booking_id = b.booking_id AND a.action_performed = 'Booked') "
+                    f"GROUP BY DATE(b.booking_date), COALESCE(b.flight_id, 0)", tuple(booking_ids))
+        for day, fid, n in cur.fetchall():
+            cur.execute("UPDATE booking_audit_daily SET booked_gone = booked_gone + %s WHERE day=%s AND flight_id=%s",
+                        (n, day, fid))
+            if cur.rowcount == 0:
+                cur.execute("INSERT INTO booking_audit_daily (day, flight_id, booked_gone) VALUES (%s, %s, %s)",
+                            (day, fid, n))
+
+    @staticmethod
+    def _clear_waitlist(cur, key, ids):
+        cur.execute(f"DELETE FROM waitlist WHERE {key} IN ({_marks(ids)})", tuple(ids))
+
+    @timed("delete.run")
+    def delete(self, table, ids, archive=True, progress=None):
+        """Delete ``ids`` from ``table`` ("flights" or "passengers") and their bookings; returns a DeleteResult.
+
+        ``progress(bookings_removed, rows_deleted)`` is called after every
+        committed batch.
+        """
+        key, ids = self._key(table), self._ids(ids)
+        deleted = cancelled = archived = removed = 0
+        for i in range(0, len(ids), self.batch):
+            chunk = ids[i:i + self.batch]
+            # off the waitlists first, so a seat freed below can't be given back to a passenger being deleted
+            with self.connection() as con:
+                self._clear_waitlist(con.cursor(), key, chunk)
+                con.commit()
+            for attempt in range(1, DELETE_RETRIES + 1):
+                while True:
+                    with self.connection() as con:
+                        cur = con.cursor()
+                        try:
+                            booking_ids, n_confirmed, flights, events, promoted = \
+                                self._clear_bookings(cur, key, chunk, archive)
+                            con.commit()
+                        except BaseException:
+                            _forget_waitlists(list(_waitlists))   # whichever heaps the batch popped
+                            raise
+                    if not booking_ids:
+                        break
+                    _audit(events)
+                    notify_change("bookings", "insert", promoted)
+                    removed += len(booking_ids)
+                    cancelled += n_confirmed
+                    archived += len(booking_ids) if archive else 0
+                    notify_change("bookings", "delete", booking_ids)
+                    notify_change("flights", "update", flights)
+                    if progress:
+                        progress(removed, deleted)
+                with self.connection() as con:
+                    cur = con.cursor()
+                    try:
+                        self._clear_waitlist(cur, key, chunk)   # joined while the bookings were cleared
+                        cur.execute(f"DELETE FROM {table} WHERE {key} IN ({_marks(chunk)})", tuple(chunk))
+                    except get_backend().integrity_errors:
+                        # a booking for one of these rows committed after the cleanup: clear it too
+                        con.rollback()
+                        if attempt == DELETE_RETRIES:
+                            raise ServiceError("New bookings keep arriving for the rows being deleted; "
+                                               "try again later.", title="Delete Failed")
+                        continue
+                    n = cur.rowcount
+                    con.commit()
+                deleted += n
+                if table == "flights":
+                    _forget_waitlists(chunk)
+                notify_change(table, "delete", chunk)
+                if progress:
+                    progress(removed, deleted)
+                break
+        return DeleteResult(deleted, cancelled, archived)
@@ -0,0 +1,533 @@
+# table_model.py
+from array import array
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, pyqtSignal
+
+from db_utils import get_connection
+from instrumentation import span
+
+PAGE_SIZE = 500            # rows per keyset page
+MAX_CACHED_ROWS = 5000     # row tuples kept in memory; only the keys of every fetched row are kept
+
+
+def _desc_position(keys, k):
+    # index of k in a descending array, or where it would be inserted
+    lo, hi = 0, len(keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if keys[mid] > k:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Read-only table over one relation, fetched newest-first in keyset pages.
+
+    Only the primary keys of fetched rows are kept for the whole table (8 bytes
+    each); the row tuples themselves live in a bounded LRU cache and are
+    re-read by key when a scrolled-away page comes back into view.
+
+    With an ``executor`` (db_worker.DbExecutor) every query runs off the GUI
+    thread; without one the model fetches synchronously, which is what
+    headless scripts want.
+    """
+
+    first_page_loaded = pyqtSignal()
+    load_failed = pyqtSignal(object)
+
+    def __init__(self, table, columns, headers, key=None, where=None, formatters=None,
+                 page_size=PAGE_SIZE, max_cached_rows=MAX_CACHED_ROWS, executor=None, parent=None):
+        super().__init__(parent)
+        self.table = table
+        self.columns = list(columns)
+        self.headers = list(headers)
+        self.key = key or self.columns[0]
+        self.where = where
+        # column -> fn(value) for display, e.g. seat numbers shown as "12C"
+        self._formatters = {self.columns.index(c): fn for c, fn in (formatters or {}).items()}
+        self.page_size = page_size
+        self.max_cached_rows = max(max_cached_rows, page_size)
+        self.executor = executor
+
+        self._key_col = self.columns.index(self.key)
+        self._select = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+        self._keys = array("q")
+        self._rows = OrderedDict()     # key -> row tuple (LRU)
+        self._exhausted = False
+        self._generation = 0           # bumped on reset so late results are dropped
+        self._page_pending = False
+        self._reloading = set()        # (lo, hi) key ranges being re-read
+        self._watermark = None         # highest key read from the DB so far
+
+    # --- SQL helpers ---
+    def _page_sql(self, after_key):
+        conds = [self.where] if self.where else []
+        if after_key is not None:
+            conds.append(f"{self.key} < %s")
+        sql = self._select
+        if conds:
+            sql += " WHERE " + " AND ".join(conds)
+        return sql + f" ORDER BY {self.key} DESC LIMIT %s"
+
+    def _fetch_page(self, after_key):
+        params = (after_key, self.page_size) if after_key is not None else (self.page_size,)
+        with span(f"{self.table}.fetch_page"), get_connection() as con:
+            cur = con.cursor()
+            cur.execute(self._page_sql(after_key), params)
+            return cur.fetchall()
+
+    def _fetch_since(self, watermark):
+        conds = [self.where] if self.where else []
+        conds.append(f"{self.key} > %s")
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(f"{self._select} WHERE {' AND '.join(conds)} ORDER BY {self.key}", (watermark,))
+            return cur.fetchall()
+
+    def _fetch_keys(self, keys, filtered=False):
+        marks = ", ".join(["%s"] * len(keys))
+        conds = [f"{self.key} IN ({marks})"]
+        if filtered and self.where:
+            conds.append(self.where)
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(f"{self._select} WHERE {' AND '.join(conds)}", tuple(keys))
+            return cur.fetchall()
+
+    def _cache(self, rows):
+        if rows:
+            top = max(row[self._key_col] for row in rows)
+            if self._watermark is None or top > self._watermark:
+                self._watermark = top
+        for row in rows:
+            k = row[self._key_col]
+            self._rows[k] = row
+            self._rows.move_to_end(k)
+        while len(self._rows) > self.max_cached_rows:
+            self._rows.popitem(last=False)
+
+    # --- Qt model API ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return QVariant()
+        row = self.row_values(index.row())
+        if row is None:
+            return "…"
+        fmt = self._formatters.get(index.column())
+        return fmt(row[index.column()]) if fmt else str(row[index.column()])
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        after = self._keys[-1] if self._keys else None
+        if self.executor is None:
+            self._append_page(self._fetch_page(after))
+            return
+        if self._page_pending:
+            return
+        self._page_pending = True
+        gen = self._generation
+        self.executor.submit(
+            self._fetch_page, after, key=("page", id(self)),
+            on_done=lambda rows: self._page_done(gen, rows),
+            on_error=lambda e: self._page_failed(gen, e),
+        )
+
+    def _page_done(self, gen, rows):
+        if gen != self._generation:
+            return
+        self._page_pending = False
+        self._append_page(rows)
+
+    def _page_failed(self, gen, error):
+        if gen != self._generation:
+            return
+        self._page_pending = False
+        self._exhausted = True
+        self.load_failed.emit(error)
+
+    def _append_page(self, rows):
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            if self._watermark is None and not self._keys:
+                self._watermark = 0     # empty relation: everything later is "new"
+                self.first_page_loaded.emit()
+            return
+        first = len(self._keys)
+        with span(f"{self.table}.populate"):     # includes the views' reaction to rowsInserted
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._keys.extend(row[self._key_col] for row in rows)
+            self._cache(rows)
+            self.endInsertRows()
+        if first == 0:
+            self.first_page_loaded.emit()
+
+    # --- convenience for the manager windows ---
+    def is_loading(self):
+        # nothing to show yet and the first page is still on its way
+        return not self._keys and not self._exhausted
+
+    def reset(self):
+        self.beginResetModel()
+        self._generation += 1
+        self._page_pending = False
+        self._reloading.clear()
+        if self.executor is not None:
+            self.executor.cancel(("page", id(self)))
+        self._keys = array("q")
+        self._rows.clear()
+        self._exhausted = False
+        self._watermark = None
+        self.endResetModel()
+        self.fetchMore()
+
+    # --- incremental refresh ---
+    def _run(self, fn, *args, on_done):
+        if self.executor is None:
+            on_done(fn(*args))
+            return
+        gen = self._generation
+
+        def done(result):
+            if gen == self._generation:
+                on_done(result)
+        self.executor.submit(fn, *args, on_done=done, on_error=self.load_failed.emit)
+
+    def upsert_rows(self, rows):
+        """Apply rows known to exist in the DB without re-reading the table."""
+        for row in rows:
+            k = row[self._key_col]
+            pos = _desc_position(self._keys, k)
+            if pos < len(self._keys) and self._keys[pos] == k:
+                self._rows[k] = row
+                self._rows.move_to_end(k)
+                self.dataChanged.emit(self.index(pos, 0), self.index(pos, len(self.columns) - 1))
+            elif pos < len(self._keys) or self._exhausted:
+                # rows below the last fetched page arrive with the next fetchMore
+                self.beginInsertRows(QModelIndex(), pos, pos)
+                self._keys.insert(pos, k)
+                self._rows[k] = row
+                self.endInsertRows()
+        while len(self._rows) > self.max_cached_rows:
+            self._rows.popitem(last=False)
+
+    def remove_keys(self, keys):
+        for k in keys:
+            pos = _desc_position(self._keys, k)
+            if pos < len(self._keys) and self._keys[pos] == k:
+                self.beginRemoveRows(QModelIndex(), pos, pos)
+                del self._keys[pos]
+                self._rows.pop(k, None)
+                self.endRemoveRows()
+
+    def refresh_since(self):
+        """Pull only rows added after the watermark (our own inserts and other clients')."""
+        if self._watermark is None:
+            if not self._keys:
+                self.reset()
+            return
+        self._run(self._fetch_since, self._watermark, on_done=self._since_done)
+
+    def _since_done(self, rows):
+        self._cache(rows)
+        self.upsert_rows(rows)
+
+    def refresh_keys(self, keys):
+        """Re-read specific rows, e.g. a flight whose seat count just changed."""
+        keys = [int(k) for k in keys if k is not None]
+        # rows we have not fetched yet will be read fresh when paged in anyway
+        keys = [k for k in keys if self._has_key(k)]
+        if keys:
+            self._run(self._fetch_keys, keys, True, on_done=lambda rows: self._refresh_done(keys, rows))
+
+    def _refresh_done(self, keys, rows):
+        # rows that vanished (or no longer match the filter) drop out; the rest are patched
+        found = {r[self._key_col] for r in rows}
+        self.remove_keys([k for k in keys if k not in found])
+        shown = [r for r in rows if _desc_position(self._keys, r[self._key_col]) < len(self._keys)]
+        self.upsert_rows(shown)
+
+    def _has_key(self, k):
+        pos = _desc_position(self._keys, k)
+        return pos < len(self._keys) and self._keys[pos] == k
+
+    def row_key(self, row):
+        return self._keys[row]
+
+    def row_values(self, row):
+        k = self._keys[row]
+        values = self._rows.get(k)
+        if values is not None:
+            self._rows.move_to_end(k)
+            return values
+        # evicted: reload the surrounding page by key
+        lo = max(0, row - self.page_size // 2)
+        hi = min(len(self._keys), lo + self.page_size)
+        if self.executor is None:
+            self._cache(self._fetch_keys(self._keys[lo:hi]))
+            return self._rows.get(k)
+        span = (self._keys[lo], self._keys[hi - 1])
+        if not any(a >= k >= b for a, b in self._reloading):
+            self._reloading.add(span)
+            gen = self._generation
+            self.executor.submit(
+                self._fetch_keys, self._keys[lo:hi],
+                on_done=lambda rows: self._reload_done(gen, span, rows),
+                on_error=lambda e: self._reload_done(gen, span, []),
+            )
+        return None
+
+    def _reload_done(self, gen, span, rows):
+        if gen != self._generation:
+            return
+        self._reloading.discard(span)
+        if not rows:
+            return
+        self._cache(rows)
+        self.dataChanged.emit(self.index(0, 0), self.index(len(self._keys) - 1, len(self.columns) - 1))
+
+    def row_value(self, row, column):
+        values = self.row_values(row)
+        return None if values is None else values[self.columns.index(column)]
+
+
+class ListTableModel(QAbstractTableModel):
+    """Small in-memory table for result sets that are already fully loaded (e.g. search hits)."""
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self._rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return QVariant()
+        return str(self._rows[index.row()][index.column()])
+
+    def row_key(self, row):
+        return self._rows[row][0]
+
+    def row_values(self, row):
+        return self._rows[row]
+
+
+class SnapshotTableModel(QAbstractTableModel):
+    """The flights table read zero-copy from a flight_snapshot.FlightSnapshot, newest first.
+
+    Cells are formatted straight from the snapshot's column arrays when a view
+    asks for them; nothing is kept per row. The snapshot is memory-mapped from
+    disk on first use, caught up with the DB in the background, patched by key
+    for the app's own writes and refreshed every ``refresh_ms`` for everyone
+    else's. Each new snapshot is published for flight_search to answer from.
+    """
+
+    first_page_loaded = pyqtSignal()
+    load_failed = pyqtSignal(object)
+    updated = pyqtSignal()           # a newer snapshot is showing
+
+    def __init__(self, headers, executor=None, refresh_ms=None, parent=None):
+        super().__init__(parent)
+        import flight_snapshot      # numpy only once the flights table is shown
+        self._fs = flight_snapshot
+        self.headers = list(headers)
+        self.columns = list(flight_snapshot.COLUMNS)
+        self.executor = executor
+        self.snapshot = None
+        self._failed = False
+        self._unsaved = False
+        self._generation = 0
+        if refresh_ms:
+            from PyQt5.QtCore import QTimer
+            self._timer = QTimer(self)
+            self._timer.timeout.connect(self.refresh_since)
+            self._timer.start(refresh_ms)
+        self.reset()
+
+    def _run(self, fn, *args, on_done):
+        if self.executor is None:
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._load_error(e)
+                return
+            on_done(result)
+            return
+        gen = self._generation
+
+        def done(result):
+            if gen == self._generation:
+                on_done(result)
+        self.executor.submit(fn, *args, on_done=done, on_error=self._load_error)
+
+    def _load_error(self, error):
+        if self.snapshot is None:
+            self._failed = True
+        self.load_failed.emit(error)
+
+    # --- Qt model API ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.snapshot is None else len(self.snapshot)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return QVariant()
+        return str(self.snapshot.value(len(self.snapshot) - 1 - index.row(), self.columns[index.column()]))
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return False
+
+    def fetchMore(self, parent=QModelIndex()):
+        pass
+
+    # --- loading and refreshing ---
+    def is_loading(self):
+        return self.snapshot is None and not self._failed
+
+    def reset(self):
+        """Map the saved snapshot (or build one), show it, then catch it up with the DB."""
+        self._generation += 1
+        self._failed = False
+        self._run(self._open, on_done=self._opened)
+
+    def _open(self):
+        fs = self._fs
+        snap = fs.FlightSnapshot.load()
+        if snap is None:
+            snap = fs.FlightSnapshot.from_db()
+            snap.save()
+        return snap
+
+    def _opened(self, snap):
+        self._show(snap, saved=True)
+        self.first_page_loaded.emit()
+        self.refresh_since()
+
+    def refresh_since(self):
+        """Catch up with every change in the DB, ours or other clients'; saves the result."""
+        if self.snapshot is not None:
+            base = self.snapshot
+            self._run(self._refresh, base, self._unsaved, on_done=lambda snap: self._refreshed(base, snap))
+
+    def _refresh(self, base, unsaved):
+        new, changed = base.refreshed()
+        # a newer snapshot showing means this one is dropped (see _refreshed); don't write it either
+        if (changed or unsaved) and base is self.snapshot:
+            new.save()
+        return new
+
+    def _refreshed(self, base, snap):
+        if base is self.snapshot:
+            self._show(snap, saved=True)
+        else:
+            # patched meanwhile: showing snap would undo the patch, so catch up from the patched one
+            self.refresh_since()
+
+    def refresh_keys(self, keys):
+        """Re-read specific flights, e.g. one whose seat count just changed."""
+        keys = sorted({int(k) for k in keys if k is not None})
+        if keys and self.snapshot is not None:
+            base = self.snapshot
+            self._run(self._patch, base, keys, on_done=lambda snap: self._patched(base, keys, snap))
+
+    @staticmethod
+    def _patch(snap, keys):
+        marks = ", ".join(["%s"] * len(keys))
+        with get_connection() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {', '.join(snap.columns)} FROM flights WHERE flight_id IN ({marks})",
+                        tuple(keys))
+            rows = cur.fetchall()
+        found = {r[0] for r in rows}
+        return snap.patched(rows, [k for k in keys if k not in found])
+
+    def _patched(self, base, keys, snap):
+        if base is self.snapshot:
+            self._show(snap)
+        else:
+            self.refresh_keys(keys)     # re-read them on top of the snapshot that replaced base
+
+    def remove_keys(self, keys):
+        if self.snapshot is not None:
+            self._show(self.snapshot.patched([], [int(k) for k in keys]))
+
+    def _show(self, snap, saved=False):
+        # GUI thread: swap in the new snapshot, keeping views' scroll and selection when rows only changed
+        old = self.snapshot
+        self._unsaved = not saved and (self._unsaved or (old is not None and snap is not old))
+        n_old, n_new = (len(old) if old is not None else 0), len(snap)
+        last_col = len(self.columns) - 1
+        if old is not None and n_old == n_new and (old.ids is snap.ids or (old.ids == snap.ids).all()):
+            self.snapshot = snap
+            if n_new:
+                self.dataChanged.emit(self.index(0, 0), self.index(n_new - 1, last_col))
+        elif old is not None and n_new > n_old and (snap.ids[:n_old] == old.ids).all():
+            # only newer flights were added: they go on top
+            self.beginInsertRows(QModelIndex(), 0, n_new - n_old - 1)
+            self.snapshot = snap
+            self.endInsertRows()
+            if n_old:
+                self.dataChanged.emit(self.index(n_new - n_old, 0), self.index(n_new - 1, last_col))
+        else:
+            self.beginResetModel()
+            self.snapshot = snap
+            self.endResetModel()
+        self._fs.publish(snap)
+        self.updated.emit()
+
+    # --- convenience for the manager windows ---
+    def row_key(self, row):
+        return int(self.snapshot.ids[len(self.snapshot) - 1 - row])
+
+    def row_values(self, row):
+        return self.snapshot.row(len(self.snapshot) - 1 - row)
+
+    def row_value(self, row, column):
+        return self.snapshot.value(len(self.snapshot) - 1 - row, column)
@@ -0,0 +1,69 @@
+# Shared fixtures: every test gets its own SQLite database (schema_sqlite.sql).
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import db_utils  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh SQLite database as the app's backend; yields its path."""
+    path = str(tmp_path / "airline.db")
+    db_utils.set_backend("sqlite", path=path)
+    yield path
+    db_utils.set_backend("sqlite", path=path)    # closes the pool's connections
+
+
+@pytest.fixture
+def flight(db):
+    """factory: flight(seats=3, overbook=0) -> flight_id"""
+    from services import FlightService
+    n = [0]
+
+    def make(seats=3, overbook=0, source="Kathmandu", destination="Delhi", day="2030-01-01"):
+        n[0] += 1
+        fid = FlightService().add(f"T{n[0]}", source, destination, f"{day} 10:00:00", f"{day} 12:00:00", seats)
+        if overbook:
+            FlightService().set_overbook(fid, overbook)
+        return fid
+    return make
+
+
+@pytest.fixture
+def passengers(db):
+    """factory: passengers(n) -> [passenger_id, ...]"""
+    from services import PassengerService
+    n = [0]
+
+    def make(count):
+        ids = []
+        for _ in range(count):
+            n[0] += 1
+            ids.append(PassengerService().add(f"Passenger {n[0]}", "F", 30, f"P{n[0]:06d}"))
+        return ids
+    return make
+
+
+def query(sql, params=()):
+    with db_utils.get_connection() as con:
+        cur = con.cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def seats_of(booking_ids):
+    """seat_no of each booking, in the order given"""
+    marks = ", ".join(["%s"] * len(booking_ids))
+    rows = dict(query(f"SELECT booking_id, seat_no FROM bookings WHERE booking_id IN ({marks})", tuple(booking_ids)))
+    return [rows[b] for b in booking_ids]
+
+
+def booked(flight_id):
+    """flights.seats_booked"""
+    return query("SELECT seats_booked FROM flights WHERE flight_id=%s", (flight_id,))[0][0]
@@ -0,0 +1,96 @@
+-- schema_sqlite.sql as first shipped (SQLite schema version 3, before PRAGMA
+-- user_version was set); tests/test_sqlite_schema.py upgrades a file made from it.
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS flights (
+    flight_id INTEGER PRIMARY KEY AUTOINCREMENT,   -- AUTOINCREMENT: ids are never reused, like MySQL
+    flight_number VARCHAR(10),
+    source VARCHAR(30) COLLATE NOCASE,             -- MySQL's default collation is case-insensitive
+    destination VARCHAR(30) COLLATE NOCASE,
+    departure_time DATETIME,
+    arrival_time DATETIME,
+    seats INT,                  -- capacity; never changed by bookings
+    seats_booked INT DEFAULT 0  -- confirmed bookings, maintained only by the triggers below
+);
+CREATE INDEX IF NOT EXISTS idx_flights_route ON flights (source, destination, departure_time);
+
+CREATE TABLE IF NOT EXISTS passengers (
+    passenger_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50),
+    gender VARCHAR(10),
+    age INT,
+    passport_no VARCHAR(20)
+);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    passenger_id INT REFERENCES passengers(passenger_id),
+    flight_id INT REFERENCES flights(flight_id),
+    booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    status TEXT DEFAULT 'Confirmed' CHECK (status IN ('Confirmed', 'Cancelled')),
+    active_flag INT GENERATED ALWAYS AS (CASE WHEN status = 'Confirmed' THEN 1 END) STORED
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_bookings_active ON bookings (passenger_id, flight_id, active_flag);
+CREATE INDEX IF NOT EXISTS idx_bookings_flight_status ON bookings (flight_id, status);
+CREATE INDEX IF NOT EXISTS idx_bookings_status_id ON bookings (status, booking_id);
+
+CREATE TABLE IF NOT EXISTS booking_audit_log (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    booking_id INT,
+    old_status TEXT CHECK (old_status IN ('Confirmed', 'Cancelled')),
+    new_status TEXT CHECK (new_status IN ('Confirmed', 'Cancelled')),
+    change_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    action_performed VARCHAR(50)
+);
+
+-- Double bookings are rejected by uq_bookings_active (no trigger needed).
+
+-- Count a new confirmed booking
+CREATE TRIGGER IF NOT EXISTS after_booking_confirmed
+AFTER INSERT ON bookings
+FOR EACH ROW WHEN NEW.status = 'Confirmed'
+BEGIN
+    UPDATE flights SET seats_booked = seats_booked + 1 WHERE flight_id = NEW.flight_id;
+END;
+
+-- Prevent overbooking (writers already hold SQLite's write lock, so no FOR UPDATE needed)
+CREATE TRIGGER IF NOT EXISTS prevent_overbooking
+BEFORE INSERT ON bookings
+FOR EACH ROW
+WHEN (SELECT seats_booked >= seats FROM flights WHERE flight_id = NEW.flight_id)
+BEGIN
+    SELECT RAISE(ABORT, 'Cannot complete booking. Flight is fully booked.');
+END;
+
+-- Free the seat on cancellation
+CREATE TRIGGER IF NOT EXISTS after_booking_cancelled
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status = 'Confirmed' AND NEW.status = 'Cancelled'
+BEGIN
+    UPDATE flights SET seats_booked = seats_booked - 1 WHERE flight_id = NEW.flight_id;
+END;
+
+-- Free the seat when a confirmed booking row is removed outright
+CREATE TRIGGER IF NOT EXISTS after_booking_deleted
+AFTER DELETE ON bookings
+FOR EACH ROW WHEN OLD.status = 'Confirmed'
+BEGIN
+    UPDATE flights SET seats_booked = seats_booked - 1 WHERE flight_id = OLD.flight_id;
+END;
+
+-- Audit status changes
+CREATE TRIGGER IF NOT EXISTS audit_booking_changes
+AFTER UPDATE OF status ON bookings
+FOR EACH ROW WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO booking_audit_log (booking_id, old_status, new_status, action_performed)
+    VALUES (OLD.booking_id, OLD.status, NEW.status, 'Status Update');
+END;
+
+-- Passenger age must be at least 1
+CREATE TRIGGER IF NOT EXISTS validate_passenger_age
+BEFORE INSERT ON passengers
+FOR EACH ROW WHEN NEW.age < 1
+BEGIN
+    SELECT RAISE(ABORT, 'Passenger age must be at least 1 year.');
+END;
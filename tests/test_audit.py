@@ -0,0 +1,202 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+import audit
+import db_utils
+import services
+from audit import AuditLog, AuditWriter
+from conftest import query
+from reports import ReportService
+from services import BookingService, DeletionService
+
+OLD = "2020-03-01 09:00:00"
+
+
+def reports():
+    service = ReportService()
+    service.refresh_summaries()
+    daily = service.daily()
+    return ([(str(d), int(b), int(c)) for d, b, c in zip(daily.days, daily.booked, daily.cancelled)],
+            [tuple(r) for r in service.top_routes()],
+            AuditLog().daily("2020-01-01", date.today() + timedelta(days=1)))
+
+
+@pytest.fixture
+def history(flight, passengers):
+    """bookings on two routes: cancelled, deleted, archived and live ones; the Delhi ones dated 2020"""
+    f1, f2 = flight(seats=5), flight(seats=5, destination="Dubai")
+    pids = passengers(6)
+    bookings = BookingService()
+    ids = [bookings.book(p, f1)[0] for p in pids[:4]] + [bookings.book(p, f2)[0] for p in pids[4:]]
+    bookings.cancel(ids[0])
+    bookings.cancel(ids[4])
+    DeletionService().delete("passengers", [pids[1]], archive=False)
+    DeletionService().delete("passengers", [pids[2]])
+    with db_utils.get_connection() as con:
+        cur = con.cursor()
+        cur.execute("UPDATE booking_audit_log SET change_date=%s WHERE flight_id=%s", (OLD, f1))
+        for table in ("bookings", "bookings_archive"):
+            cur.execute(f"UPDATE {table} SET booking_date=%s WHERE flight_id=%s", (OLD, f1))
+        con.commit()
+    return (f1,)
+
+
+def test_purge_rolls_up_old_rows_and_keeps_the_reports(history):
+    before = reports()
+    logged = query("SELECT COUNT(*) FROM booking_audit_log")[0][0]
+    old = query("SELECT COUNT(*) FROM booking_audit_log WHERE flight_id=%s", history)[0][0]
+    r = AuditLog().purge(today=date.today())
+    assert r == (old, [])
+    assert query("SELECT COUNT(*) FROM booking_audit_log WHERE flight_id=%s", history) == [(0,)]
+    assert query("SELECT COUNT(*) FROM booking_audit_log")[0][0] == logged - old
+    # Booked, Cancelled, Deleted and Archived rows of the Delhi flight
+    assert query("SELECT day, events, booked, cancelled, booked_gone FROM booking_audit_daily") \
+        == [("2020-03-01", old, 4, 3, 1)]
+    assert reports() == before
+    ReportService().rebuild_summaries()
+    assert reports() == before
+    assert AuditLog().purge(today=date.today()) == (0, [])
+    assert reports() == before
+
+
+def test_bookings_deleted_after_the_purge_are_still_counted(history):
+    AuditLog().purge(today=date.today())
+    live = query("SELECT passenger_id FROM bookings WHERE flight_id=%s AND status='Confirmed'", history)
+    DeletionService().delete("passengers", [live[0][0]], archive=False)
+    incremental = reports()
+    assert incremental[0][0] == ("2020-03-01", 4, 3)
+    ReportService().rebuild_summaries()
+    assert reports() == incremental
+
+
+def test_purge_leaves_rows_the_reports_have_not_folded_in(history):
+    ReportService().refresh_summaries()
+    top = query("SELECT MAX(log_id) FROM booking_audit_log")[0][0]
+    with db_utils.get_connection() as con:
+        cur = con.cursor()
+        # past a hole the reports still wait for
+        cur.execute("INSERT INTO booking_audit_log (log_id, booking_id, flight_id, old_status, new_status, "
+                    "change_date, action_performed) VALUES (%s, 0, 0, NULL, NULL, %s, 'Test')", (top + 2, OLD))
+        con.commit()
+    r = AuditLog().purge(retain_days=0, today=date.today() + timedelta(days=1))
+    assert r.rows == top
+    assert query("SELECT log_id FROM booking_audit_log") == [(top + 2,)]
+
+
+def test_purge_in_batches(history, monkeypatch):
+    monkeypatch.setattr(audit, "PURGE_BATCH", 2)
+    before = reports()
+    old = query("SELECT COUNT(*) FROM booking_audit_log WHERE flight_id=%s", history)[0][0]
+    assert AuditLog().purge(today=date.today()).rows == old
+    assert query("SELECT SUM(events) FROM booking_audit_daily") == [(old,)]
+    assert reports() == before
+
+
+def test_partitions_are_mysql_only(db):
+    assert AuditLog().ensure_partitions() == []
+
+
+class CountingConnection:
+    """get_connection() that counts the statements run through it, and can fail them"""
+
+    def __init__(self):
+        self.statements = []
+        self.fail = False
+
+    @contextmanager
+    def __call__(self):
+        with db_utils.get_connection() as con:
+            outer = self
+
+            class Cursor:
+                def __init__(self, cur):
+                    self.cur = cur
+
+                def execute(self, sql, params=()):
+                    if outer.fail:
+                        raise sqlite3.OperationalError("disk full")
+                    outer.statements.append(sql)
+                    return self.cur.execute(sql, params)
+
+            class Connection:
+                def cursor(self):
+                    return Cursor(con.cursor())
+
+                def commit(self):
+                    con.commit()
+
+            yield Connection()
+
+
+def events(n, start=1):
+    return [(b, 7, "Confirmed", "Cancelled", "Status Update") for b in range(start, start + n)]
+
+
+def test_writer_flushes_in_multi_row_batches(db):
+    connection = CountingConnection()
+    writer = AuditWriter(connection, flush_rows=2, flush_interval=60)
+    writer.record(events(1))
+    assert not writer._wake.is_set()
+    writer.record(events(4, start=2))
+    assert writer._wake.is_set()        # a full batch wakes the background flush
+    assert writer.flush() == 5
+    assert len(connection.statements) == 3
+    assert query("SELECT booking_id, flight_id, old_status, new_status, action_performed "
+                 "FROM booking_audit_log ORDER BY log_id") == events(5)
+    assert writer.flush() == 0 and len(connection.statements) == 3
+
+
+def test_writer_keeps_events_when_a_flush_fails(db):
+    connection = CountingConnection()
+    writer = AuditWriter(connection, flush_rows=10, flush_interval=60)
+    writer.record(events(2))
+    connection.fail = True
+    with pytest.raises(Exception, match="disk full"):
+        writer.flush()
+    writer.record(events(1, start=3))
+    connection.fail = False
+    assert writer.flush() == 3
+    assert [r[0] for r in query("SELECT booking_id FROM booking_audit_log ORDER BY log_id")] == [1, 2, 3]
+
+
+@pytest.fixture
+def writer(db, monkeypatch):
+    monkeypatch.setattr(db_utils, "_connect_hooks", [])
+    monkeypatch.setattr(audit.atexit, "register", lambda fn: None)
+    w = AuditWriter(flush_interval=60).install()
+    yield w
+    services.set_audit_sink(None)
+    w.close()
+
+
+def test_installed_writer_takes_over_from_the_triggers(writer, flight, passengers):
+    fid = flight()
+    ids = [BookingService().book(p, fid)[0] for p in passengers(3)]
+    BookingService().cancel(ids[0])
+    DeletionService().delete("passengers", [query("SELECT passenger_id FROM bookings WHERE booking_id=%s",
+                                                  (ids[1],))[0][0]], archive=False)
+    logged = "SELECT booking_id, old_status, new_status, action_performed FROM booking_audit_log " \
+             "WHERE action_performed != 'Booked' ORDER BY log_id"
+    assert query(logged) == []
+    writer.close()
+    # the rows the triggers would have written, in the same order
+    assert query(logged) == [(ids[0], "Confirmed", "Cancelled", "Status Update"),
+                             (ids[1], "Confirmed", "Cancelled", "Status Update"),
+                             (ids[1], "Cancelled", None, "Deleted")]
+
+
+def test_writer_refuses_triggers_that_would_also_log(db, monkeypatch):
+    monkeypatch.setattr(db_utils, "_connect_hooks", [])
+    with db_utils.get_connection() as con:
+        cur = con.cursor()
+        cur.execute("DROP TRIGGER audit_booking_deletes")
+        cur.execute("CREATE TRIGGER audit_booking_deletes AFTER DELETE ON bookings BEGIN "
+                    "INSERT INTO booking_audit_log (booking_id, flight_id, action_performed) "
+                    "VALUES (OLD.booking_id, OLD.flight_id, 'Deleted'); END")
+        con.commit()
+    with pytest.raises(services.ServiceError, match="predate the app-side writer"):
+        AuditWriter().install()
+    assert db_utils._connect_hooks == []
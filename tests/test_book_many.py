@@ -0,0 +1,27 @@
+import services
+from conftest import booked, query, seats_of
+from services import BookingRequest, BookingService
+
+
+def test_book_many_rejects_items_without_aborting_the_batch(flight, passengers):
+    fid = flight(seats=2)
+    p1, p2, p3 = passengers(3)
+    results = BookingService().book_many([(p1, fid), (p1, fid), (p2, 999), BookingRequest(p2, fid), (p3, fid)])
+    assert [r.ok for r in results] == [True, False, False, True, False]
+    assert all(r.error for r in results if not r.ok)
+    assert all(r.booking_id for r in results if r.ok)
+    assert booked(fid) == 2
+
+
+def test_book_many_ids_match_their_rows_across_insert_batches(flight, passengers, monkeypatch):
+    monkeypatch.setattr(services, "INSERT_BATCH", 2)
+    a, b = flight(seats=3), flight(seats=3, source="Delhi", destination="Dubai")
+    p = passengers(3)
+    requests = [(p[0], a), (p[0], b), (p[1], b), (p[1], 999), (p[2], a), (p[2], b)]
+    results = BookingService().book_many(requests)
+    ids = [r.booking_id for r in results if r.ok]
+    assert len(ids) == 5 and len(set(ids)) == 5
+    rows = dict((bid, (pid, fid)) for bid, pid, fid in
+                query("SELECT booking_id, passenger_id, flight_id FROM bookings"))
+    assert [rows[r.booking_id] for r in results if r.ok] == [req for req, r in zip(requests, results) if r.ok]
+    assert seats_of(ids) == [1, 1, 2, 2, 3]
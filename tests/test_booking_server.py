@@ -0,0 +1,155 @@
+import asyncio
+import json
+import socket
+import threading
+import uuid
+
+import pytest
+
+from booking_client import BookingClient
+from booking_server import BookingServer, SingleFlight
+from conftest import booked, query
+from services import BookingRejected, FlightService, ServiceError
+
+
+@pytest.fixture
+def server(db):
+    """a BookingServer on a free port, on its own event loop thread; yields (server, port)"""
+    app = BookingServer()
+    started = threading.Event()
+    running = []
+
+    def ready(srv):
+        running.append((asyncio.get_running_loop(), asyncio.current_task(), srv.sockets[0].getsockname()[1]))
+        started.set()
+
+    def run():
+        # asyncio.run also cancels the handlers of keep-alive connections on the way out
+        try:
+            asyncio.run(app.serve("127.0.0.1", 0, ready=ready))
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    loop, task, port = running[0]
+    yield app, port
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+
+
+def raw_request(port, data):
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as s:
+        s.sendall(data)
+        reply = b""
+        while chunk := s.recv(65536):
+            reply += chunk
+    head, _, body = reply.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_single_flight_shares_running_calls():
+    async def scenario():
+        group, calls = SingleFlight(), []
+
+        async def slow():
+            calls.append(1)
+            n = len(calls)
+            await asyncio.sleep(0.05)
+            return n
+
+        first = await asyncio.gather(*(group.do(7, slow) for _ in range(5)), group.do(8, slow))
+        # a caller that gives up does not cancel the query the others wait on
+        waiter = asyncio.ensure_future(group.do(7, slow))
+        other = asyncio.ensure_future(group.do(7, slow))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return first, await other, group
+
+    first, after, group = asyncio.run(scenario())
+    assert first == [1, 1, 1, 1, 1, 2]
+    assert after == 3 and (group.started, group.shared) == (3, 5)
+
+
+def test_availability_counts_overbooking(server, flight, passengers):
+    app, port = server
+    fid = flight(seats=1, overbook=1)
+    client = BookingClient(f"http://127.0.0.1:{port}")
+    client.book(passengers(1)[0], fid)
+    status, d = raw_request(port, f"GET /flights/{fid}/availability HTTP/1.0\r\n\r\n".encode())
+    assert status == 200 and (d["seats"], d["overbook"], d["booked"], d["free"]) == (1, 1, 1, 1)
+    seat_map = client.seat_map(fid)
+    assert seat_map.is_taken(1) and seat_map.taken_count() == 1
+    assert client.seat_map(fid + 1) is None
+
+
+def test_malformed_requests_get_400(server):
+    app, port = server
+    assert raw_request(port, b"GARBAGE\r\n\r\n")[0] == 400
+    status, d = raw_request(port, b"POST /flights HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+    assert status == 400 and d == {"error": "Malformed Content-Length"}
+    status, d = raw_request(port, b"POST /flights HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\n[]")
+    assert status == 400 and d["kind"] == "ValidationError"
+
+
+def test_client_itinerary_retry_is_idempotent(server, flight, passengers):
+    app, port = server
+    out, back = flight(seats=2), flight(seats=2, source="Delhi", destination="Kathmandu")
+    p1, p2 = passengers(2)
+    client = BookingClient(f"http://127.0.0.1:{port}")
+    itinerary = str(uuid.uuid4())
+    first = client.book_itinerary(p1, [(out, "1A"), back], itinerary_id=itinerary)
+    assert client.book_itinerary(p1, [(out, "1A"), back], itinerary_id=itinerary) == first
+    assert (booked(out), booked(back)) == (1, 1)
+    with pytest.raises(BookingRejected) as e:
+        client.book_itinerary(p2, [(out, "1A")])
+    assert e.value.title == "Seat Unavailable"
+    assert query("SELECT COUNT(*) FROM bookings WHERE itinerary_id=%s", (itinerary,)) == [(2,)]
+
+
+def test_client_waitlist_and_cancel(server, flight, passengers):
+    app, port = server
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    client = BookingClient(f"http://127.0.0.1:{port}")
+    booking, = client.book(p1, fid)
+    entry = client.join_waitlist(p2, fid)
+    assert [e.passenger_id for e in client.waitlist(fid)] == [p2] and entry.position == 1
+    result = client.cancel(booking)
+    assert result.flight_id == fid and len(result.promoted) == 1
+    assert client.waitlist(fid) == [] and booked(fid) == 1
+    assert client.leave_waitlist(p2, fid) == 0
+    assert client.cancel_flight(fid) == result.promoted and booked(fid) == 0
+
+
+def test_client_reports_server_errors():
+    # a server that answers with something other than JSON
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+
+    def answer():
+        con, _ = listener.accept()
+        con.recv(65536)
+        con.sendall(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 9\r\nConnection: close\r\n\r\n<html/>!!")
+        con.close()
+
+    threading.Thread(target=answer, daemon=True).start()
+    with pytest.raises(ServiceError) as e:
+        BookingClient(f"http://127.0.0.1:{port}").waitlist(1)
+    assert e.value.title == "Server Error" and "HTTP 502" in str(e.value)
+    listener.close()
+    with pytest.raises(ServiceError) as e:
+        BookingClient(f"http://127.0.0.1:{port}", timeout=2).waitlist(1)
+    assert e.value.title == "Server Unavailable"
+
+
+def test_connections_route(server, db):
+    app, port = server
+    flights = FlightService()
+    a = flights.add("K1", "Kathmandu", "Delhi", "2030-01-01 10:00:00", "2030-01-01 12:00:00", 3)
+    b = flights.add("D1", "Delhi", "Dubai", "2030-01-01 14:00:00", "2030-01-01 17:00:00", 3)
+    status, d = raw_request(port, b"GET /flights/connections?source=Kathmandu&destination=Dubai"
+                                  b"&departure=2030-01-01 HTTP/1.0\r\n\r\n")
+    assert status == 200 and [it["flight_ids"] for it in d["itineraries"]] == [[a, b]]
+    assert d["itineraries"][0]["arrival"] == "2030-01-01 17:00:00"
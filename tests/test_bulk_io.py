@@ -0,0 +1,45 @@
+import json
+
+import bulk_io
+from conftest import query
+
+
+def test_import_rejects_unparsable_lines_and_keeps_going(db, tmp_path):
+    src = tmp_path / "passengers.jsonl"
+    src.write_text("\n".join([
+        json.dumps({"name": "Asha Rai", "gender": "F", "age": 30, "passport_no": "P100001"}),
+        '{"name": "Broken", ',
+        "",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"name": "No Age", "gender": "M", "age": "old", "passport_no": "P100002"}),
+        json.dumps({"name": "Bikash Thapa", "gender": "M", "age": 41, "passport_no": "P100003"}),
+    ]) + "\n", encoding="utf-8")
+    rejects = tmp_path / "passengers.rejects.jsonl"
+
+    report = bulk_io.import_file("passengers", str(src), chunk_size=2, reject_path=str(rejects))
+
+    assert (report.read, report.accepted, report.rejected) == (5, 2, 3)
+    assert query("SELECT passport_no FROM passengers ORDER BY passport_no") == [("P100001",), ("P100003",)]
+    rows = [json.loads(line) for line in rejects.read_text(encoding="utf-8").splitlines()]
+    assert [r["line"] for r in rows] == [2, 4, 5]
+    assert rows[0]["record"] == '{"name": "Broken",' and rows[0]["error"].startswith("Invalid JSON")
+    assert rows[1]["error"] == "Each line must be a JSON object."
+    assert rows[2]["name"] == "No Age"
+
+
+def test_csv_reject_lines_and_export_round_trip(db, tmp_path):
+    src = tmp_path / "flights.csv"
+    src.write_text(
+        "flight_number,source,destination,departure_time,arrival_time,seats\n"
+        "RA101,Kathmandu,Delhi,2030-01-01 10:00:00,2030-01-01 12:00:00,100\n"
+        "RA102,Kathmandu,Delhi,tomorrow,2030-01-01 12:00:00,100\n",
+        encoding="utf-8")
+    rejects = tmp_path / "flights.rejects.csv"
+
+    report = bulk_io.import_file("flights", str(src), reject_path=str(rejects))
+
+    assert (report.read, report.accepted, report.rejected) == (2, 1, 1)
+    assert rejects.read_text(encoding="utf-8").splitlines()[1].startswith("3,RA102,")
+    out = tmp_path / "flights.jsonl"
+    assert bulk_io.export_table("flights", str(out)) == 1
+    assert json.loads(out.read_text(encoding="utf-8"))["flight_number"] == "RA101"
@@ -0,0 +1,28 @@
+import pytest
+
+from conftest import booked, seats_of
+from services import BookingService, ServiceError
+
+
+def test_cancel_frees_the_seat_once(flight, passengers):
+    fid = flight(seats=2)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    b1, = bookings.book(p1, fid)
+    result = bookings.cancel(b1)
+    assert (result.flight_id, result.promoted, result.reseated) == (fid, [], [])
+    assert booked(fid) == 0
+    with pytest.raises(ServiceError):
+        bookings.cancel(b1)
+    assert seats_of(bookings.book(p2, fid)) == [1]
+
+
+def test_cancel_flight_cancels_every_booking(flight, passengers):
+    fid = flight(seats=2)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    ids = bookings.book(p1, fid) + bookings.book(p2, fid)
+    assert sorted(bookings.cancel_flight(fid)) == sorted(ids)
+    assert bookings.cancel_flight(fid) == []
+    assert booked(fid) == 0
+    assert bookings.seat_map(fid).taken_count() == 0
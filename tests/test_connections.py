@@ -0,0 +1,54 @@
+from conftest import booked
+from connections import ConnectionFinder, get_finder
+from services import BookingService, FlightService
+
+H = 3600
+
+
+def stops_and_flights(found):
+    return [(it.stops, [leg.flight_id for leg in it.legs]) for it in found]
+
+
+def test_fewer_stops_only_kept_when_they_arrive_later():
+    finder = ConnectionFinder(min_connection=0)
+    finder.load([(1, "AB", "A", "B", 0, 10 * H),
+                 (2, "AC", "A", "C", 0, 1 * H), (3, "CB", "C", "B", 2 * H, 3 * H)])
+    assert stops_and_flights(finder.itineraries("A", "B", 0)) == [(0, [1]), (1, [2, 3])]
+    assert finder.earliest_arrival("A", "B", 0).arrival == 3 * H
+    finder.remove_flight(3)
+    assert stops_and_flights(finder.itineraries("A", "B", 0)) == [(0, [1])]
+
+
+def test_earlier_arrival_does_not_hide_a_later_one_past_its_layover_cap():
+    # reaching X at 1h leaves the 30h departure out of reach (24h cap);
+    # reaching X at 10h through Y still makes it
+    finder = ConnectionFinder(min_connection=0)
+    finder.load([(1, "AX", "A", "X", 0, 1 * H), (2, "AY", "A", "Y", 0.5 * H, 2 * H),
+                 (3, "YX", "Y", "X", 5 * H, 10 * H), (4, "XB", "X", "B", 30 * H, 32 * H)])
+    assert stops_and_flights(finder.itineraries("A", "B", 0, max_stops=3)) == [(2, [2, 3, 4])]
+    assert finder.itineraries("A", "B", 0, max_stops=1) == []
+
+
+def test_minimum_connection_time():
+    finder = ConnectionFinder()    # 45 minutes
+    finder.load([(1, "AC", "A", "C", 0, 1 * H), (2, "CB", "C", "B", 2 * H, 3 * H),
+                 (3, "CB2", "C", "B", 1.5 * H, 2.5 * H)])
+    assert stops_and_flights(finder.itineraries("A", "B", 0)) == [(1, [1, 2])]
+
+
+def test_service_finds_and_books_a_connection(passengers):
+    flights = FlightService()
+    out = flights.add("K1", "Kathmandu", "Delhi", "2030-01-01 10:00:00", "2030-01-01 12:00:00", 3)
+    assert stops_and_flights(flights.connections("Kathmandu", "Dubai", "2030-01-01")) == []
+    # flights added after the finder loaded are picked up from change notifications
+    on = flights.add("D1", "Delhi", "Dubai", "2030-01-01 14:00:00", "2030-01-01 17:00:00", 3)
+    found = flights.connections("Kathmandu", "Dubai", "2030-01-01")
+    assert stops_and_flights(found) == [(1, [out, on])]
+
+    pid, = passengers(1)
+    itinerary, ids = BookingService().book_itinerary(pid, found[-1])
+    assert len(ids) == 2 and (booked(out), booked(on)) == (1, 1)
+
+    flights.delete(on)
+    assert flights.connections("Kathmandu", "Dubai", "2030-01-01") == []
+    assert len(get_finder()) == 1
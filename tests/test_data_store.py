@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+import data_store
+import flight_snapshot
+from services import BookingService, FlightService, PassengerService, remove_change_listener
+
+# kept for the whole run: the worker thread pool does not outlive the application
+app = QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def store(db):
+    s = data_store.DataStore()
+    s.seen = []
+    s.changed.connect(lambda *change: s.seen.append(change))
+    yield s
+    remove_change_listener(s._on_change)
+    settle(s)
+    flight_snapshot.publish(None)
+
+
+def settle(store, timeout=10):
+    """Deliver queued notifications and wait for every model query they started."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if not store.executor.is_busy():
+            app.processEvents()     # results delivered last may have queued more work
+            if not store.executor.is_busy():
+                return
+        time.sleep(0.005)
+    raise AssertionError("model queries still running")
+
+
+def column(model, name):
+    col = model.columns.index(name)
+    return [model.data(model.index(row, col), Qt.DisplayRole) for row in range(model.rowCount())]
+
+
+def test_one_model_per_table(store):
+    assert store.model("passengers") is store.model("passengers")
+    assert store.model("bookings") is not store.model("passengers")
+
+
+def test_bookings_model_shows_confirmed_bookings_only(store, flight, passengers):
+    fid = flight(seats=3)
+    p1, p2 = passengers(2)
+    model = store.model("bookings")
+    settle(store)
+    assert model.rowCount() == 0
+    bookings = BookingService()
+    b1, = bookings.book(p1, fid)
+    b2, = bookings.book(p2, fid, seat="1C")
+    settle(store)
+    assert column(model, "booking_id") == [str(b2), str(b1)]
+    assert column(model, "seat_no") == ["1C", "1A"]
+
+    bookings.cancel(b1)     # an update that takes the row out of the confirmed filter
+    settle(store)
+    assert column(model, "booking_id") == [str(b2)]
+    assert ("bookings", "update", [b1], store.version("bookings")) in store.seen
+
+
+def test_passenger_inserts_and_deletes_reach_the_model(store):
+    model = store.model("passengers")
+    settle(store)
+    service = PassengerService()
+    a = service.add("Asha", "F", 30, "A1")
+    b = service.add("Bina", "F", 31, "B1")
+    settle(store)
+    assert column(model, "name") == ["Bina", "Asha"]
+    version = store.version("passengers")
+    service.delete(a)
+    settle(store)
+    assert column(model, "passenger_id") == [str(b)]
+    assert store.version("passengers") == version + 1
+    assert store.seen[-1] == ("passengers", "delete", [a], version + 1)
+
+
+@pytest.mark.parametrize("snapshot", [True, False], ids=["snapshot", "paged"])
+def test_flight_seat_counts_follow_bookings(store, flight, passengers, monkeypatch, snapshot):
+    monkeypatch.setattr(data_store, "FLIGHT_SNAPSHOT", snapshot)
+    fid = flight(seats=2)
+    model = store.model("flights")
+    settle(store)
+    assert column(model, "seats_booked") == ["0"]
+
+    BookingService().book(passengers(1)[0], fid)
+    other = FlightService().add("T9", "Delhi", "Dubai", "2030-01-02 10:00:00", "2030-01-02 12:00:00", 5)
+    settle(store)
+    assert column(model, "flight_id") == [str(other), str(fid)]
+    assert column(model, "seats_booked") == ["0", "1"]
+    FlightService().set_overbook(fid, 1)
+    settle(store)
+    assert column(model, "overbook") == ["0", "1"]
+    tables = [table for table, *_ in store.seen]
+    assert tables.count("flights") == store.version("flights") == 4 and "bookings" in tables
@@ -0,0 +1,29 @@
+from conftest import query
+from services import BookingService, DeletionService
+
+
+def test_deleting_a_flight_archives_its_bookings(flight, passengers):
+    fid, other = flight(seats=3), flight(seats=3)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    b1, = bookings.book(p1, fid)
+    b2, = bookings.book(p2, fid)
+    bookings.cancel(b2)
+    bookings.book(p1, other)
+    impact = DeletionService().impact("flights", [fid])
+    assert (impact.confirmed, impact.cancelled) == (1, 1)
+    result = DeletionService().delete("flights", [fid])
+    assert (result.deleted, result.cancelled, result.archived) == (1, 1, 2)
+    assert query("SELECT booking_id, status FROM bookings_archive ORDER BY booking_id") \
+        == [(b1, "Cancelled"), (b2, "Cancelled")]
+    assert query("SELECT flight_id FROM flights") == [(other,)]
+
+
+def test_deleting_a_passenger_frees_their_seats(flight, passengers):
+    fid = flight(seats=2)
+    p1, p2 = passengers(2)
+    BookingService().book(p1, fid)
+    result = DeletionService().delete("passengers", [p1])
+    assert (result.deleted, result.cancelled, result.archived) == (1, 1, 1)
+    assert query("SELECT seats_booked FROM flights") == [(0,)]
+    assert query("SELECT passenger_id FROM passengers") == [(p2,)]
@@ -0,0 +1,91 @@
+import db_utils
+import flight_snapshot
+from flight_search import FlightSearch, SearchCache
+from services import BookingService, FlightService
+
+
+class FakeService:
+    """FlightService.search stand-in; ``during`` runs between the read and the return."""
+
+    def __init__(self):
+        self.seats_booked = 0
+        self.calls = 0
+        self.during = None
+
+    def search(self, source, destination, day, min_seats=1):
+        self.calls += 1
+        rows = [(1, "RA101", source, destination, f"{day} 10:00:00", f"{day} 12:00:00", 2, self.seats_booked, 0)]
+        if self.during:
+            self.during()
+        return rows
+
+
+def test_repeat_search_is_served_from_cache():
+    service = FakeService()
+    search = FlightSearch(service, SearchCache())
+    assert len(search.search("Kathmandu", "Delhi", "2030-01-01")) == 1
+    assert len(search.search("kathmandu ", "Delhi", "2030-01-01", min_seats=2)) == 1
+    assert search.search("Kathmandu", "Delhi", "2030-01-01", min_seats=3) == []
+    assert service.calls == 1
+
+
+def test_result_read_before_an_invalidation_is_not_cached():
+    service, cache = FakeService(), SearchCache()
+    search = FlightSearch(service, cache)
+
+    def booked_meanwhile():
+        service.during = None
+        service.seats_booked = 2
+        search._on_change("flights", "update", [1])
+
+    service.during = booked_meanwhile
+    assert len(search.search("Kathmandu", "Delhi", "2030-01-01")) == 1    # the stale answer, once
+    assert search.cached("Kathmandu", "Delhi", "2030-01-01") is None
+    assert search.search("Kathmandu", "Delhi", "2030-01-01") == []
+    assert service.calls == 2
+
+
+def test_ttl_expiry():
+    now = [0.0]
+    cache = SearchCache(ttl=10, clock=lambda: now[0])
+    cache.put("k", [(1,)])
+    assert cache.get("k") == [(1,)]
+    now[0] = 11
+    assert cache.get("k") is None
+
+
+def test_full_flight_with_an_overbooking_allowance_is_found(flight, passengers, tmp_path):
+    fid = flight(seats=2, day="2030-01-01")
+    for pid in passengers(2):
+        BookingService().book(pid, fid)
+    flights = FlightService()
+    assert flights.search("Kathmandu", "Delhi", "2030-01-01") == []
+    snap = flight_snapshot.FlightSnapshot.from_db()
+    assert snap.search("Kathmandu", "Delhi", "2030-01-01") == []
+
+    flights.set_overbook(fid, 1)
+    assert [r[0] for r in flights.search("Kathmandu", "Delhi", "2030-01-01")] == [fid]
+    assert flights.search("Kathmandu", "Delhi", "2030-01-01", min_seats=2) == []
+    snap, changed = snap.refreshed()
+    assert changed
+    assert snap.search("Kathmandu", "Delhi", "2030-01-01") == flights.search("Kathmandu", "Delhi", "2030-01-01")
+
+    path = str(tmp_path / "flights.snap")
+    snap.save(path)
+    assert flight_snapshot.FlightSnapshot.load(path).row(0) == snap.row(0)
+
+
+def test_snapshot_of_another_database_is_rebuilt(flight, db, tmp_path):
+    fid = flight(seats=2)
+    path = str(tmp_path / "flights.snap")
+    flight_snapshot.open_snapshot(path)
+    assert flight_snapshot.FlightSnapshot.load(path).ids.tolist() == [fid]
+
+    # a second database whose flight ids overlap the first one's
+    db_utils.set_backend("sqlite", path=str(tmp_path / "other.db"))
+    other = FlightService().add("O1", "Pokhara", "Delhi", "2030-02-01 10:00:00", "2030-02-01 12:00:00", 9)
+    assert other == fid
+    assert flight_snapshot.FlightSnapshot.load(path) is None
+    snap = flight_snapshot.open_snapshot(path)
+    assert snap.row(0)[:3] == (other, "O1", "Pokhara") and snap.value(0, "seats") == 9
+    assert flight_snapshot.FlightSnapshot.load(path).row(0) == snap.row(0)
@@ -0,0 +1,115 @@
+import json
+import sqlite3
+
+import pytest
+
+import instrumentation
+from instrumentation import (Histogram, InstrumentedConnection, Metrics, export_metrics, span, statement_key,
+                             timed)
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """a fresh Metrics as the module-wide one"""
+    fresh = Metrics(slow_query_ms=1e9)
+    monkeypatch.setattr(instrumentation, "metrics", fresh)
+    return fresh
+
+
+def test_histogram_counts_and_percentiles():
+    h = Histogram()
+    assert h.percentile(0.5) == 0.0 and h.as_dict()["avg_ms"] == 0.0
+    for _ in range(98):
+        h.add(0.0003)       # the 0.5 ms bucket
+    h.add(3.0)
+    h.add(3.0)              # the 5 s bucket, capped at the largest sample
+    assert h.count == 100 and h.max == 3.0
+    assert h.percentile(0.50) == 0.0005
+    assert h.percentile(0.98) == 0.0005
+    assert h.percentile(0.99) == 3.0
+    d = h.as_dict()
+    assert d["buckets_ms"] == {"0.5": 98, "5000": 2}
+    assert (d["count"], d["p50_ms"], d["p99_ms"], d["max_ms"]) == (100, 0.5, 3000.0, 3000.0)
+    assert d["avg_ms"] == pytest.approx((98 * 0.3 + 6000) / 100)
+
+    h.add(0.0001)           # a bucket bound is inclusive
+    h.add(60.0)             # past the last bound: the open bucket reports the max
+    assert h.counts[0] == 1 and h.counts[-1] == 1
+    assert h.percentile(1.0) == 60.0
+
+
+def test_statement_key_collapses_placeholder_lists():
+    assert statement_key("SELECT *\n  FROM t WHERE id IN (%s, %s,%s)") == "SELECT * FROM t WHERE id IN (%s, …)"
+    assert statement_key("SELECT * FROM t WHERE id IN (%s)") == "SELECT * FROM t WHERE id IN (%s, …)"
+    assert statement_key("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)") \
+        == "INSERT INTO t (a, b) VALUES (%s, %s), …"
+
+
+def test_spans_and_timed_record_every_call(metrics):
+    @timed("work")
+    def work(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+
+    assert work() == 1
+    with pytest.raises(ValueError):
+        work(fail=True)
+    with span("block"):
+        pass
+    spans = metrics.snapshot()["spans"]
+    assert spans["work"]["count"] == 2 and spans["block"]["count"] == 1
+    assert work.__name__ == "work"
+
+
+def test_export_metrics_writes_the_snapshot(metrics, tmp_path):
+    metrics.record_sql("SELECT 1", "execute", 0.002, 1)
+    path = tmp_path / "metrics.json"
+    export_metrics(str(path), pool={"open": 2})
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["pool"] == {"open": 2}
+    assert data["sql"]["count"] == 1 and data["statements"]["SELECT 1"]["rows"] == 1
+    assert data["statements"]["SELECT 1"]["execute"]["p50_ms"] == 2.0     # bucket bound 2.5, capped at the max
+
+
+def test_instrumented_cursor_counts_statements_and_rows(metrics):
+    con = InstrumentedConnection(sqlite3.connect(":memory:"))
+    cur = con.cursor()
+    cur.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    cur.executemany("INSERT INTO t (name) VALUES (?)", ((f"n{i}",) for i in range(2500)))
+    cur.execute("UPDATE t SET name = name || '!' WHERE id <= 10")
+    con.commit()
+    cur.execute("SELECT id FROM t WHERE id <= ?", (3,))
+    assert cur.fetchone() == (1,)
+    assert cur.fetchall() == [(2,), (3,)]
+    cur.execute("SELECT id FROM t")
+    assert len(list(cur)) == 2500
+    assert cur.lastrowid == 2500     # other attributes reach the real cursor
+
+    st = metrics.snapshot()["statements"]
+    assert st["INSERT INTO t (name) VALUES (?)"]["rows"] == 2500
+    assert st["UPDATE t SET name = name || '!' WHERE id <= 10"]["rows"] == 10
+    assert st["COMMIT"]["execute"]["count"] == 1
+    select = st["SELECT id FROM t WHERE id <= ?"]
+    assert select["execute"]["count"] == 1 and select["fetch"]["count"] == 2 and select["rows"] == 3
+    # iteration fetches in chunks of 1000, plus the empty fetch that ends it
+    assert st["SELECT id FROM t"]["fetch"]["count"] == 4 and st["SELECT id FROM t"]["rows"] == 2500
+    assert metrics.snapshot()["sql"]["count"] == sum(s["execute"]["count"] + s["fetch"]["count"]
+                                                     for s in st.values())
+
+
+def test_slow_statements_and_statement_cap(metrics, monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, "MAX_STATEMENTS", 2)
+    metrics.slow_query_ms = 100
+    metrics.record_sql("SELECT 1", "execute", 0.5)
+    metrics.record_sql("SELECT 2", "execute", 0.01)
+    metrics.record_sql("SELECT 3", "execute", 0.01)
+    metrics.record_sql("SELECT 4", "fetch", 0.01, 7)
+    snap = metrics.snapshot()
+    assert snap["slow"] == 1 and snap["statements"]["SELECT 1"]["slow"] == 1
+    assert "slow execute" in caplog.text
+    assert set(snap["statements"]) == {"SELECT 1", "SELECT 2", "<other>"}
+    assert snap["statements"]["<other>"]["rows"] == 7
+    assert metrics.summary().startswith("SQL: 4 calls")
+    metrics.reset()
+    assert metrics.summary() == "SQL: no statements yet"
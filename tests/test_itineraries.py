@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import booked, query, seats_of
+from services import BookingRejected, BookingService
+
+
+def test_itinerary_is_all_or_nothing_and_retry_safe(flight, passengers):
+    out, full = flight(seats=2), flight(seats=1, source="Delhi", destination="Dubai")
+    back = flight(seats=2, source="Delhi", destination="Kathmandu", day="2030-01-05")
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    bookings.book(p2, full)
+    with pytest.raises(BookingRejected):
+        bookings.book_itinerary(p1, [out, full])
+    assert query("SELECT COUNT(*) FROM bookings WHERE passenger_id=%s", (p1,)) == [(0,)]
+    assert booked(out) == 0
+
+    itinerary, ids = bookings.book_itinerary(p1, [(out, "1B"), back])
+    assert seats_of(ids) == [2, 1]
+    assert bookings.book_itinerary(p1, [(out, "1B"), back], itinerary_id=itinerary) == (itinerary, ids)
+    assert (booked(out), booked(back)) == (1, 1)
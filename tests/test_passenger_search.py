@@ -0,0 +1,54 @@
+import passenger_search
+from passenger_search import PassengerIndex, PassengerSearch
+from services import PassengerService
+
+
+def add(name, passport):
+    return PassengerService().add(name, "F", 30, passport)
+
+
+def test_prefix_search_before_and_after_the_index_is_built(db):
+    anna, annie, bob = add("Anna Rai", "NP100"), add("annie Shah", "NP200"), add("Bob Anand", "AN300")
+    search = PassengerSearch(index=PassengerIndex())
+    # SQL until the index is loaded
+    assert {r[0] for r in search.search("ann")} == {anna, annie}
+    search.warm()
+    assert search.index.ready
+    assert [r[0] for r in search.search("ANN")] == [anna, annie]
+    assert [r[0] for r in search.search("an")] == [bob, anna, annie]     # passport hits first
+    assert [r[0] for r in search.search("np", limit=1)] == [anna]
+    assert search.search("  ") == [] and search.search("zz") == []
+    assert search.search("np1") == [(anna, "Anna Rai", "NP100")]
+
+
+def test_inserts_merge_into_the_index(db, monkeypatch):
+    monkeypatch.setattr(passenger_search, "BULK_MERGE", 3)
+    search = PassengerSearch(index=PassengerIndex())
+    first = add("Sita", "S1")
+    search.warm()
+    # one at a time (insort), then in bulk (merge and re-sort); ties stay in id order
+    second = add("Sita", "S2")
+    assert search.index.lookup("sita") == [first, second]
+    bulk = [add("Sita", f"S{n}") for n in range(3, 8)]
+    assert search.index.lookup("sita") == [first, second] + bulk
+    # announcing a row that is already indexed does not duplicate it
+    search.index.on_change("passengers", "insert", [first])
+    assert search.index.lookup("sita", limit=50).count(first) == 1
+    assert len(search.index._names.keys) == 7
+
+
+def test_deleted_passengers_are_skipped_then_pruned(db, monkeypatch):
+    monkeypatch.setattr(passenger_search, "PRUNE_DELETED", 2)
+    search = PassengerSearch(index=PassengerIndex())
+    ids = [add(f"Ram {n}", f"R{n}") for n in range(5)]
+    search.warm()
+    PassengerService().delete(ids[0])
+    PassengerService().delete(ids[1])
+    index = search.index
+    assert index.lookup("ram") == ids[2:]
+    assert index._deleted == {ids[0], ids[1]} and len(index._names.keys) == 5
+    PassengerService().delete(ids[2])
+    assert index.lookup("r") == ids[3:]
+    assert index._deleted == set()
+    assert list(index._names.ids) == ids[3:] and list(index._passports.ids) == ids[3:]
+    assert [r[0] for r in search.search("ram")] == ids[3:]
@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db_utils
+from db_utils import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError("gone")
+
+
+def make_pool(size=1, timeout=2.0, health_check_idle=60):
+    made = []
+
+    def connect():
+        made.append(FakeConnection())
+        return made[-1]
+    return ConnectionPool(connect=connect, size=size, timeout=timeout, health_check_idle=health_check_idle), made
+
+
+def test_reuses_released_connection():
+    pool, made = make_pool()
+    con = pool.acquire()
+    pool.release(con)
+    assert pool.acquire() is con
+    assert len(made) == 1
+
+
+def test_times_out_when_exhausted():
+    pool, _ = make_pool(timeout=0.2)
+    pool.acquire()
+    start = time.perf_counter()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert time.perf_counter() - start >= 0.2
+
+
+def _acquire_in_thread(pool):
+    got = {}
+
+    def run():
+        try:
+            got["con"] = pool.acquire()
+        except Exception as e:
+            got["error"] = e
+    t = threading.Thread(target=run)
+    t.start()
+    time.sleep(0.1)    # blocked waiting by now
+    return t, got
+
+
+def test_waiter_woken_by_release():
+    pool, _ = make_pool()
+    con = pool.acquire()
+    t, got = _acquire_in_thread(pool)
+    pool.release(con)
+    t.join(1)
+    assert got.get("con") is con
+
+
+def test_waiter_woken_by_broken_release():
+    pool, made = make_pool(timeout=5)
+    con = pool.acquire()
+    t, got = _acquire_in_thread(pool)
+    start = time.perf_counter()
+    pool.release(con, broken=True)
+    t.join(5)
+    assert time.perf_counter() - start < 1
+    assert "error" not in got
+    assert got["con"] is made[1] and con.closed
+    assert pool.metrics()["open"] == 1
+
+
+def test_failed_health_check_discards_and_reconnects():
+    pool, made = make_pool(health_check_idle=0)
+    con = pool.acquire()
+    pool.release(con)
+    con.alive = False
+    fresh = pool.acquire()
+    assert fresh is made[1] and con.closed
+    m = pool.metrics()
+    assert (m["open"], m["discarded"], m["reconnects"]) == (1, 1, 1)
+
+
+def test_failed_connect_frees_the_slot():
+    calls = []
+
+    def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("refused")
+        return FakeConnection()
+    pool = ConnectionPool(connect=connect, size=1, timeout=0.5)
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.acquire() is not None
+
+
+def test_set_backend_with_connections_checked_out(db):
+    with db_utils.get_connection() as con:
+        old_pool = db_utils.get_pool()
+        db_utils.set_backend("sqlite", path=db)
+        # the old pool is closed: returning the connection closes it instead of parking it
+        assert db_utils.get_pool() is not old_pool
+    assert old_pool.metrics()["open"] == 0 and old_pool.metrics()["idle"] == 0
+    with db_utils.get_connection() as con:
+        cur = con.cursor(); cur.execute("SELECT 1")
+        assert cur.fetchone() == (1,)
+
+
+def test_sqlite_lock_contention_keeps_the_connection(db):
+    with db_utils.get_connection():
+        pass    # opened (and the schema created) before the database gets locked
+    blocker = sqlite3.connect(db, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        with db_utils.get_connection() as con:
+            con.raw.execute("PRAGMA busy_timeout = 0")
+            cur = con.cursor()
+            cur.execute("UPDATE flights SET seats = seats WHERE flight_id = 1")
+    blocker.execute("ROLLBACK")
+    blocker.close()
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        with db_utils.get_connection() as again:
+            again.cursor().execute("SELECT * FROM no_such_table")
+    assert again is con and db_utils.get_pool().metrics()["discarded"] == 0
+
+    # a connection that is really gone is dropped
+    with pytest.raises(sqlite3.ProgrammingError):
+        with db_utils.get_connection() as con:
+            con.raw.close()
+            con.cursor().execute("SELECT 1")
+    assert db_utils.get_pool().metrics()["discarded"] == 1
+    with db_utils.get_connection() as fresh:
+        assert fresh is not con
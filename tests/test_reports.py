@@ -0,0 +1,64 @@
+import pytest
+
+import reports
+from conftest import query
+from reports import ReportService
+from services import BookingService, DeletionService
+
+
+def summaries():
+    return (query("SELECT day, booked, cancelled FROM report_daily_bookings ORDER BY day"),
+            query("SELECT source, destination, booked, cancelled FROM report_route_bookings ORDER BY 1, 2"))
+
+
+@pytest.fixture
+def activity(flight, passengers):
+    f1, f2 = flight(seats=5), flight(seats=5, destination="Dubai")
+    pids = passengers(6)
+    bookings = BookingService()
+    ids = [bookings.book(p, f1)[0] for p in pids[:4]] + [bookings.book(p, f2)[0] for p in pids[4:]]
+    bookings.cancel(ids[0])
+    bookings.cancel(ids[4])
+    DeletionService().delete("passengers", [pids[1]])
+    return f1, f2
+
+
+def test_incremental_matches_rebuild(activity):
+    service = ReportService()
+    assert service.refresh_summaries() > 0
+    incremental = summaries()
+    assert dict((d, (b, c)) for d, b, c in incremental[0])   # something was counted
+    service.rebuild_summaries()
+    assert summaries() == incremental
+    assert ReportService().refresh_summaries() == 0
+
+
+def _leave_hole():
+    # what a rolled-back MySQL insert leaves behind: an id that never shows up
+    top = query("SELECT MAX(log_id) FROM booking_audit_log")[0][0]
+    with reports.get_connection() as con:
+        cur = con.cursor()
+        cur.execute("INSERT INTO booking_audit_log (log_id, booking_id, flight_id, old_status, new_status, "
+                    "action_performed) VALUES (%s, 0, 0, NULL, NULL, 'Test')", (top + 2,))
+        con.commit()
+    return top
+
+
+def watermark():
+    return query("SELECT last_log_id FROM report_state WHERE name='audit'")[0][0]
+
+
+def test_gap_waited_for_then_skipped_across_instances(activity, monkeypatch):
+    ReportService().refresh_summaries()
+    top = _leave_hole()
+    now = [1000.0]
+    monkeypatch.setattr(reports.time, "time", lambda: now[0])
+    assert ReportService().refresh_summaries() == 0
+    assert watermark() == top
+    now[0] += reports.GAP_GRACE_S - 1
+    ReportService().refresh_summaries()     # a new instance, as every `python reports.py` run is
+    assert watermark() == top
+    now[0] += 2
+    assert ReportService().refresh_summaries() == 1
+    assert watermark() == top + 2
+    assert query("SELECT COUNT(*) FROM report_gaps") == [(0,)]
@@ -0,0 +1,27 @@
+import pytest
+
+from conftest import booked, query
+from services import BookingRejected, BookingService, ValidationError
+
+
+def test_book_rejects_double_bookings_and_full_flights(flight, passengers):
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    bookings.book(p1, fid)
+    with pytest.raises(BookingRejected):
+        bookings.book(p1, fid)
+    with pytest.raises(BookingRejected):
+        bookings.book(p2, fid)
+    with pytest.raises(ValidationError):
+        bookings.book("x", fid)
+    assert booked(fid) == 1
+
+
+def test_seats_booked_matches_the_confirmed_bookings(flight, passengers):
+    fid = flight(seats=5)
+    bookings = BookingService()
+    ids = [bookings.book(p, fid)[0] for p in passengers(4)]
+    bookings.cancel(ids[1])
+    assert booked(fid) == query("SELECT COUNT(*) FROM bookings WHERE flight_id=%s AND status='Confirmed'",
+                                (fid,))[0][0] == 3
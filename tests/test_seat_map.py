@@ -0,0 +1,35 @@
+from conftest import booked, seats_of
+from seat_map import SeatMap, parse_seat, seat_label
+from services import BookingService
+
+
+def test_labels():
+    assert [seat_label(n) for n in (1, 6, 7)] == ["1A", "1F", "2A"]
+    assert parse_seat("12c") == 69 and parse_seat("67") == 67 and parse_seat(" ") is None
+
+
+def test_allocate_release():
+    seats = SeatMap(8)
+    assert [seats.allocate() for _ in range(3)] == [1, 2, 3]
+    seats.release(2)
+    assert seats.next_free() == 2 and seats.free_count() == 6
+    assert SeatMap(8, seats.to_bytes()).taken_count() == 2
+
+
+def test_book_assigns_the_lowest_free_seat_or_the_one_asked_for(flight, passengers):
+    fid = flight(seats=6)
+    p1, p2, p3 = passengers(3)
+    bookings = BookingService()
+    b1, = bookings.book(p1, fid, seat="1C")
+    b2, = bookings.book(p2, fid)
+    b3, = bookings.book(p3, fid)
+    assert seats_of([b1, b2, b3]) == [3, 1, 2]
+    assert booked(fid) == 3
+    assert bookings.seat_map(fid).taken_count() == 3
+
+
+def test_book_group_sits_together(flight, passengers):
+    fid = flight(seats=12)
+    p0, *group = passengers(4)
+    BookingService().book(p0, fid, seat="1C")      # 1A-1B free, but not three side by side
+    assert seats_of(BookingService().book_group(group, fid)) == [4, 5, 6]
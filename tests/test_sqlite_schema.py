@@ -0,0 +1,115 @@
+import os
+import sqlite3
+
+import pytest
+
+import db_utils
+from conftest import query
+from reports import ReportService
+from services import BookingService, PassengerService
+
+V3_SCHEMA = os.path.join(os.path.dirname(__file__), "data", "schema_sqlite_v3.sql")
+
+
+def schema_objects(path):
+    con = sqlite3.connect(path)
+    try:
+        return sorted(con.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+    finally:
+        con.close()
+
+
+def columns(path, table):
+    con = sqlite3.connect(path)
+    try:
+        return [(c[1], c[2]) for c in con.execute(f"PRAGMA table_info({table})")]
+    finally:
+        con.close()
+
+
+def user_version(path):
+    con = sqlite3.connect(path)
+    try:
+        return con.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        con.close()
+
+
+def test_new_file_gets_the_latest_version(db):
+    db_utils.get_backend().init_schema()
+    assert user_version(db) == db_utils.SQLiteBackend.migrations()[-1][0]
+
+
+def test_unversioned_file_is_migrated_to_the_current_schema(tmp_path):
+    fresh = str(tmp_path / "fresh.db")
+    db_utils.set_backend("sqlite", path=fresh)
+    db_utils.get_backend().init_schema()
+
+    old = str(tmp_path / "old.db")
+    con = sqlite3.connect(old)
+    con.executescript(open(V3_SCHEMA, encoding="utf-8").read())
+    con.executescript("""
+        INSERT INTO flights (flight_number, source, destination, departure_time, arrival_time, seats)
+        VALUES ('RA1', 'Kathmandu', 'Delhi', '2030-01-01 10:00:00', '2030-01-01 12:00:00', 10);
+        INSERT INTO passengers (name, gender, age, passport_no) VALUES
+            ('asha rai', 'F', 30, 'p1'), ('Bikash', 'M', 40, 'P2'), ('Chandra', 'M', 50, 'P3'), ('Gone', 'F', 20, 'P4');
+        DELETE FROM passengers WHERE passenger_id = 4;
+        INSERT INTO bookings (passenger_id, flight_id) VALUES (1, 1), (2, 1), (3, 1);
+        UPDATE bookings SET status = 'Cancelled' WHERE booking_id = 2;
+    """)
+    con.close()
+    assert user_version(old) == 0
+
+    db_utils.set_backend("sqlite", path=old)
+    try:
+        assert query("SELECT booking_id, seat_no FROM bookings ORDER BY booking_id") == [(1, 1), (2, None), (3, 2)]
+        assert user_version(old) == user_version(fresh)
+        assert schema_objects(old) == schema_objects(fresh)
+        for table in ("flights", "passengers", "bookings", "booking_audit_log"):
+            assert sorted(columns(old, table)) == sorted(columns(fresh, table))     # added columns go last
+
+        # the data still works with today's code
+        assert [p[0] for p in PassengerService().search("ASHA")] == [1]
+        assert PassengerService().add("Dawa", "F", 25, "P5") == 5       # the deleted passenger's id stays retired
+        booking_id, = BookingService().book(5, 1)
+        assert query("SELECT seat_no FROM bookings WHERE booking_id=%s", (booking_id,)) == [(3,)]
+        assert query("SELECT seats_booked, overbook FROM flights") == [(3, 0)]
+        before = query("SELECT day, booked, cancelled FROM report_daily_bookings")
+        assert sum(r[1] for r in before) == 3        # backfilled, not counting the new booking yet
+        ReportService().refresh_summaries()
+        after = query("SELECT day, booked, cancelled FROM report_daily_bookings")
+        ReportService().rebuild_summaries()
+        assert query("SELECT day, booked, cancelled FROM report_daily_bookings") == after
+        assert sum(r[1] for r in after) == 4 and sum(r[2] for r in after) == 1
+    finally:
+        db_utils.set_backend("sqlite", path=fresh)
+
+
+def test_migrated_file_is_left_alone(db):
+    db_utils.get_backend().init_schema()
+    before = schema_objects(db)
+    db_utils.set_backend("sqlite", path=db)
+    db_utils.get_backend().init_schema()
+    assert schema_objects(db) == before
+
+
+def test_audit_triggers_step_aside_for_app_audit_connections(flight, passengers):
+    fid = flight()
+    ids = [BookingService().book(p, fid)[0] for p in passengers(2)]
+    logged = "SELECT COUNT(*) FROM booking_audit_log WHERE action_performed = 'Status Update'"
+    BookingService().cancel(ids[0])
+    assert query(logged) == [(1,)]
+    with db_utils.get_connection() as con:
+        cur = con.cursor()
+        cur.execute("CREATE TEMP TABLE app_audit (x INT)")    # what audit.AuditWriter does per connection
+        cur.execute("UPDATE bookings SET status='Cancelled' WHERE booking_id=%s", (ids[1],))
+        con.commit()
+        cur.execute("DROP TABLE temp.app_audit")
+    assert query(logged) == [(1,)]
+
+
+def test_old_sqlite_is_refused_clearly(monkeypatch, tmp_path):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", (3, 30, 1))
+    monkeypatch.setattr(sqlite3, "sqlite_version", "3.30.1")
+    with pytest.raises(RuntimeError, match=r"3\.31\.0 or newer is needed; this Python has 3\.30\.1"):
+        db_utils.SQLiteBackend(str(tmp_path / "x.db"))
@@ -0,0 +1,67 @@
+import pytest
+from PyQt5.QtWidgets import QApplication
+
+import flight_snapshot
+from services import BookingService
+from table_model import SnapshotTableModel
+
+
+class ManualExecutor:
+    """Runs each task when submitted but hands the result back only on deliver(), like a slow worker."""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        self.pending.append((on_done, fn(*args)))
+
+    def deliver(self, i=0):
+        on_done, result = self.pending.pop(i)
+        on_done(result)
+
+
+@pytest.fixture
+def model(db):
+    app = QApplication.instance() or QApplication([])    # noqa: F841
+    executor = ManualExecutor()
+    m = SnapshotTableModel(["ID"] * len(flight_snapshot.COLUMNS), executor=executor)
+    yield m, executor
+    flight_snapshot.publish(None)
+
+
+def booked(snap, fid):
+    return snap.value(snap.find(fid), "seats_booked")
+
+
+def test_refresh_started_before_a_patch_does_not_undo_it(flight, passengers, model):
+    fid = flight(seats=3)
+    m, executor = model
+    executor.deliver()                 # opened; its catch-up refresh has read the DB already
+    stale_refresh = executor.pending[0]
+    BookingService().book(passengers(1)[0], fid)
+    m.refresh_keys([fid])
+    executor.deliver(1)                # the patch lands first
+    assert booked(m.snapshot, fid) == 1
+
+    executor.pending.remove(stale_refresh)
+    stale_refresh[0](stale_refresh[1])
+    assert booked(m.snapshot, fid) == 1        # dropped, and a refresh from the patched snapshot queued
+    executor.deliver()
+    assert booked(m.snapshot, fid) == 1 and not executor.pending
+    assert booked(flight_snapshot.FlightSnapshot.load(), fid) == 1
+
+
+def test_patch_read_against_a_replaced_snapshot_is_read_again(flight, passengers, model):
+    f1, f2 = flight(), flight()
+    m, executor = model
+    executor.deliver()
+    executor.deliver()                 # caught up
+    pids = passengers(2)
+    BookingService().book(pids[0], f1)
+    m.refresh_keys([f1])
+    BookingService().book(pids[1], f2)
+    m.refresh_keys([f2])
+    executor.deliver(1)                # f2's patch first
+    executor.deliver(0)                # f1's, built on the snapshot without f2's: re-read instead
+    executor.deliver()
+    assert (booked(m.snapshot, f1), booked(m.snapshot, f2)) == (1, 1)
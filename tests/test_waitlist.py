@@ -0,0 +1,110 @@
+import pytest
+
+import db_utils
+import services
+from conftest import booked, query, seats_of
+from services import BookingRejected, BookingService, FlightService, ValidationError
+
+
+def test_waitlist_promotes_by_priority_then_join_order(flight, passengers):
+    fid = flight(seats=1)
+    holder, first, second, vip = passengers(4)
+    bookings = BookingService()
+    b, = bookings.book(holder, fid)
+    with pytest.raises(BookingRejected):
+        bookings.join_waitlist(holder, fid)         # already booked
+    assert bookings.join_waitlist(first, fid).position == 1
+    assert bookings.join_waitlist(second, fid).position == 2
+    assert bookings.join_waitlist(vip, fid, priority=5).position == 1
+    assert [e.passenger_id for e in bookings.waitlist(fid)] == [vip, first, second]
+
+    promoted = bookings.cancel(b).promoted
+    assert query("SELECT passenger_id, seat_no, status FROM bookings WHERE booking_id=%s", (promoted[0],)) \
+        == [(vip, 1, "Confirmed")]
+    assert bookings.leave_waitlist(first, fid)
+    bookings.cancel(promoted[0])
+    assert query("SELECT passenger_id FROM bookings WHERE status='Confirmed'") == [(second,)]
+    assert bookings.waitlist(fid) == []
+
+
+def test_join_waitlist_needs_a_full_flight(flight, passengers):
+    fid = flight(seats=1)
+    with pytest.raises(BookingRejected):
+        BookingService().join_waitlist(passengers(1)[0], fid)
+
+
+def test_overbooked_bookings_get_the_first_seat_that_frees_up(flight, passengers):
+    fid = flight(seats=1, overbook=1)
+    p1, p2, p3 = passengers(3)
+    bookings = BookingService()
+    b1, = bookings.book(p1, fid)
+    b2, = bookings.book(p2, fid)
+    assert seats_of([b1, b2]) == [1, None] and booked(fid) == 2
+    with pytest.raises(BookingRejected):
+        bookings.book(p3, fid)
+    bookings.join_waitlist(p3, fid)
+    result = bookings.cancel(b1)
+    assert result.reseated == [b2] and seats_of([b2]) == [1]
+    # the allowance still sells one more, so the waitlist moves up too
+    assert query("SELECT passenger_id, seat_no FROM bookings WHERE booking_id=%s", (result.promoted[0],)) \
+        == [(p3, None)]
+
+
+def test_set_overbook_promotes_the_waitlist(flight, passengers):
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    BookingService().book(p1, fid)
+    BookingService().join_waitlist(p2, fid)
+    promoted = FlightService().set_overbook(fid, 1)
+    assert query("SELECT passenger_id FROM bookings WHERE booking_id=%s", (promoted[0],)) == [(p2,)]
+
+
+def test_waitlist_heaps_follow_a_backend_switch(flight, passengers, tmp_path):
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    b, = bookings.book(p1, fid)
+    for n in range(3):      # move the flight's heap past waitlist ids the next database will use
+        bookings.join_waitlist(p2, fid)
+        bookings.leave_waitlist(p2, fid)
+    bookings.join_waitlist(p2, fid)
+    bookings.cancel(b)
+
+    db_utils.set_backend("sqlite", path=str(tmp_path / "second.db"))
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    b, = bookings.book(p1, fid)
+    bookings.join_waitlist(p2, fid)
+    assert bookings.cancel(b).promoted
+
+
+def test_cancel_flight_clears_the_waitlist(flight, passengers):
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    bookings.book(p1, fid)
+    entry = bookings.join_waitlist(p2, fid)
+    changes = []
+    listener = lambda *change: changes.append(change)    # noqa: E731
+    services.add_change_listener(listener)
+    try:
+        bookings.cancel_flight(fid)
+    finally:
+        services.remove_change_listener(listener)
+    assert bookings.waitlist(fid) == []
+    assert query("SELECT COUNT(*) FROM bookings WHERE status='Confirmed'") == [(0,)]
+    assert ("waitlist", "delete", [entry.waitlist_id]) in changes
+
+
+def test_leave_waitlist_validates_ids(flight, passengers):
+    fid = flight(seats=1)
+    p1, p2 = passengers(2)
+    bookings = BookingService()
+    bookings.book(p1, fid)
+    bookings.join_waitlist(p2, fid)
+    for bad in [(p2, "abc"), ("", fid), (p2, -fid), (None, fid)]:
+        with pytest.raises(ValidationError):
+            bookings.leave_waitlist(*bad)
+    assert not bookings.leave_waitlist(p1, fid)
+    assert bookings.leave_waitlist(f" {p2} ", str(fid))
+    assert bookings.waitlist(fid) == []